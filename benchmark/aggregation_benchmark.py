@@ -0,0 +1,91 @@
+import argparse
+import copy
+import logging
+
+from utils import time_it
+
+from fedml_api.model.cv.mobilenet import mobilenet
+from fedml_api.model.cv.resnet import resnet56
+from fedml_core.aggregation.flat_aggregation import FlatAggregator, StreamingAggregator, weighted_average_state_dicts
+
+
+def add_args(parser):
+    parser.add_argument('--model', type=str, default='resnet56', help='resnet56 or mobilenet')
+    parser.add_argument('--client_num', type=int, default=100, help='number of uploaded client models')
+    parser.add_argument('--repeat', type=int, default=3, help='number of timed repetitions')
+    return parser.parse_args()
+
+
+def create_model(model_name):
+    if model_name == "resnet56":
+        return resnet56(class_num=10)
+    elif model_name == "mobilenet":
+        return mobilenet(class_num=10)
+    raise ValueError("unknown model: %s" % model_name)
+
+
+def loop_aggregate(model_list):
+    # the key-by-key, client-by-client loop used by the aggregators before the flat engine
+    training_num = 0
+    for sample_num, _ in model_list:
+        training_num += sample_num
+    (num0, averaged_params) = model_list[0]
+    for k in averaged_params.keys():
+        for i in range(0, len(model_list)):
+            local_sample_number, local_model_params = model_list[i]
+            w = local_sample_number / training_num
+            if i == 0:
+                averaged_params[k] = local_model_params[k] * w
+            else:
+                averaged_params[k] += local_model_params[k] * w
+    return averaged_params
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
+    args = add_args(argparse.ArgumentParser(description="aggregation-benchmark"))
+
+    state_dict = create_model(args.model).state_dict()
+    model_list = []
+    for idx in range(args.client_num):
+        local_params = {k: v.clone() + idx if v.is_floating_point() else v.clone() for k, v in state_dict.items()}
+        model_list.append((idx + 1, local_params))
+
+    def run_loop():
+        loop_aggregate([(n, copy.copy(params)) for n, params in model_list])
+
+    def run_axpy():
+        weighted_average_state_dicts(model_list)
+
+    flat_aggregator = FlatAggregator(args.client_num)
+
+    def run_flat_add():
+        for idx, (n, params) in enumerate(model_list):
+            flat_aggregator.add(idx, params, n)
+
+    run_flat_add()
+
+    def run_flat_aggregate():
+        flat_aggregator.aggregate()
+
+    streaming_aggregator = StreamingAggregator()
+
+    def run_streaming():
+        for idx, (n, params) in enumerate(model_list):
+            streaming_aggregator.add(idx, params, n)
+        streaming_aggregator.aggregate()
+
+    reference = loop_aggregate([(n, copy.copy(params)) for n, params in model_list])
+    averaged = flat_aggregator.aggregate()
+    max_diff = max((reference[k].float() - averaged[k].float()).abs().max().item() for k in reference.keys())
+
+    logging.info("model = %s, client_num = %d, max abs diff = %.3e" % (args.model, args.client_num, max_diff))
+    logging.info("key-by-key loop:                  %.4fs" % time_it(run_loop, args.repeat))
+    logging.info("flat fused axpy (pack + average): %.4fs" % time_it(run_axpy, args.repeat))
+    logging.info("flat matrix: pack on arrival:     %.4fs" % time_it(run_flat_add, args.repeat))
+    logging.info("flat matrix: vector-matrix avg:   %.4fs" % time_it(run_flat_aggregate, args.repeat))
+    logging.info("streaming (fold on arrival):      %.4fs" % time_it(run_streaming, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
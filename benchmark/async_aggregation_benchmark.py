@@ -0,0 +1,137 @@
+"""
+Wall-clock time of synchronous FedAvg vs. buffered asynchronous aggregation (FedBuff) with artificially delayed
+clients, on the MPI backend of the distributed FedAvg:
+
+    mpirun -np 9 python async_aggregation_benchmark.py --mode sync
+    mpirun -np 9 python async_aggregation_benchmark.py --mode async
+
+Every local training sleeps for an exponentially distributed delay first, so each synchronous round waits for its
+slowest worker. Both modes process the same number of client uploads; the server logs the elapsed time and the
+accuracy of the final global model on a held-out synthetic test set before it ends the run (with MPI_Abort, as the
+distributed FedAvg does).
+"""
+
+import argparse
+import logging
+import time
+import types
+
+import numpy as np
+import torch
+from torch.utils import data
+
+import utils  # noqa: F401, puts the repository root on sys.path
+
+from fedml_api.distributed.fedavg.FedAVGAggregator import FedAVGAggregator
+from fedml_api.distributed.fedavg.FedAVGAsyncAggregator import FedAVGAsyncAggregator
+from fedml_api.distributed.fedavg.FedAvgAPI import FedML_init, init_client
+from fedml_api.distributed.fedavg.FedAvgAsyncServerManager import FedAVGAsyncServerManager
+from fedml_api.distributed.fedavg.FedAvgServerManager import FedAVGServerManager
+from fedml_api.model.linear.lr import LogisticRegression
+from fedml_api.standalone.fedavg.my_model_trainer_classification import MyModelTrainer
+
+
+def add_args(parser):
+    parser.add_argument('--mode', type=str, default='sync', help='sync or async')
+    parser.add_argument('--comm_round', type=int, default=10, help='synchronous rounds')
+    parser.add_argument('--async_buffer_size', type=int, default=0, help='0 uses half of the workers')
+    parser.add_argument('--client_num_in_total', type=int, default=100)
+    parser.add_argument('--mean_delay', type=float, default=0.5, help='mean of the exponential client delay (s)')
+    return parser.parse_args()
+
+
+class DelayedModelTrainer(MyModelTrainer):
+    """Sleeps for a random delay before each local training, like a client on a slow device or link."""
+
+    def __init__(self, model, mean_delay, seed):
+        super().__init__(model)
+        self.mean_delay = mean_delay
+        self.rng = np.random.RandomState(seed)
+
+    def train(self, train_data, device, args):
+        time.sleep(self.rng.exponential(self.mean_delay))
+        super().train(train_data, device, args)
+
+    def test_on_the_server(self, train_data_local_dict, test_data_local_dict, device, args=None) -> bool:
+        # no evaluation during the timed run
+        return True
+
+
+def timed_server_manager(server_manager_class, test_data):
+    class TimedServerManager(server_manager_class):
+        def send_init_msg(self):
+            self.start_time = time.time()
+            super().send_init_msg()
+
+        def finish(self):
+            cost = time.time() - self.start_time
+            logging.disable(logging.NOTSET)
+            metrics = self.aggregator.trainer.test(test_data, torch.device("cpu"), self.args)
+            logging.info("%s: %d global model updates in %.2fs, test accuracy %.4f" % (
+                self.args.mode, self.round_num, cost, metrics['test_correct'] / metrics['test_total']))
+            super().finish()
+
+    return TimedServerManager
+
+
+def synthetic_clients(client_num, rng):
+    """Linearly separable 10-class data, 50 examples per client."""
+    true_weights = rng.randn(20, 10)
+    x = rng.randn(client_num * 50 + 2000, 20).astype(np.float32)
+    y = np.argmax(x @ true_weights, axis=1)
+    train_data_local_dict = {
+        client_idx: data.DataLoader(data.TensorDataset(torch.from_numpy(x[client_idx * 50:(client_idx + 1) * 50]),
+                                                       torch.from_numpy(y[client_idx * 50:(client_idx + 1) * 50])),
+                                    batch_size=10, shuffle=True)
+        for client_idx in range(client_num)}
+    test_data = data.DataLoader(data.TensorDataset(torch.from_numpy(x[-2000:]), torch.from_numpy(y[-2000:])),
+                                batch_size=500)
+    return train_data_local_dict, test_data
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
+    comm, process_id, worker_number = FedML_init()
+    bench_args = add_args(argparse.ArgumentParser(description="async-aggregation-benchmark"))
+    worker_num = worker_number - 1
+    buffer_size = bench_args.async_buffer_size or max(1, worker_num // 2)
+    async_aggregation = 1 if bench_args.mode == 'async' else 0
+    args = types.SimpleNamespace(
+        mode=bench_args.mode, is_mobile=0, backend="MPI", dataset="synthetic", ci=0,
+        client_num_in_total=bench_args.client_num_in_total, client_num_per_round=worker_num,
+        # both modes process comm_round * worker_num uploads
+        comm_round=bench_args.comm_round * worker_num // buffer_size if async_aggregation else bench_args.comm_round,
+        frequency_of_the_test=1, batch_size=10, client_optimizer="sgd", lr=1.0, wd=0, epochs=1,
+        async_aggregation=async_aggregation, async_buffer_size=buffer_size)
+
+    train_data_local_dict, test_data = synthetic_clients(args.client_num_in_total, np.random.RandomState(0))
+    train_data_local_num_dict = {client_idx: 50 for client_idx in train_data_local_dict}
+    torch.manual_seed(0)
+    model_trainer = DelayedModelTrainer(LogisticRegression(20, 10), bench_args.mean_delay, process_id)
+    device = torch.device("cpu")
+
+    # silences the per-message logging of the managers
+    logging.disable(logging.INFO)
+    if process_id == 0:
+        if async_aggregation:
+            aggregator_class, server_manager_class = FedAVGAsyncAggregator, FedAVGAsyncServerManager
+        else:
+            aggregator_class, server_manager_class = FedAVGAggregator, FedAVGServerManager
+        model_trainer.set_id(-1)
+        aggregator = aggregator_class(None, test_data, args.client_num_in_total * 50, train_data_local_dict,
+                                      train_data_local_dict, train_data_local_num_dict, worker_num, device, args,
+                                      model_trainer)
+        server_manager = timed_server_manager(server_manager_class, test_data)(args, aggregator, comm, process_id,
+                                                                              worker_number, args.backend)
+        server_manager.send_init_msg()
+        server_manager.run()
+    else:
+        # synchronous clients end the run (MPI_Abort) after their last round, possibly before the server has logged
+        # its result; here the server ends it in both modes
+        args.comm_round += 1
+        init_client(args, device, comm, process_id, worker_number, model_trainer.model, args.client_num_in_total * 50,
+                    train_data_local_num_dict, train_data_local_dict, train_data_local_dict, model_trainer)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+import argparse
+import logging
+
+import numpy as np
+import torch
+
+from utils import time_it
+
+from fedml_api.data_preprocessing import batch_transforms
+from fedml_api.data_preprocessing.cifar10.data_loader import _data_transforms_cifar10
+from fedml_api.data_preprocessing.fed_cifar100 import utils as fed_cifar100_utils
+
+
+def add_args(parser):
+    parser.add_argument('--image_num', type=int, default=2048, help='number of synthetic 32x32 RGB images')
+    parser.add_argument('--batch_size', type=int, default=64)
+    parser.add_argument('--repeat', type=int, default=3, help='number of timed repetitions')
+    return parser.parse_args()
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
+    args = add_args(argparse.ArgumentParser(description="batch-augmentation-benchmark"))
+    torch.set_num_threads(1)
+
+    imgs = np.random.RandomState(0).randint(0, 256, (args.image_num, 32, 32, 3)).astype(np.uint8)
+    batches = [imgs[i:i + args.batch_size] for i in range(0, args.image_num, args.batch_size)]
+    uint8_batches = [[(batch_transforms.to_uint8_tensor(img), 0) for img in batch] for batch in batches]
+
+    pil_train, _ = _data_transforms_cifar10()
+    batch_train, _ = _data_transforms_cifar10(batch=True)
+    fed_cifar100_train = fed_cifar100_utils.cifar100_batch_transform(train=True)
+
+    cases = [
+        ("cifar10 train, per-image PIL", lambda: [torch.stack([pil_train(img) for img in batch]) for batch in batches]),
+        ("cifar10 train, batched uint8 collate", lambda: [batch_train(batch) for batch in uint8_batches]),
+        ("fed_cifar100 train, preprocess_cifar_img", lambda: [
+            fed_cifar100_utils.preprocess_cifar_img(torch.from_numpy(batch), train=True) for batch in batches]),
+        ("fed_cifar100 train, batched uint8 collate", lambda: [fed_cifar100_train(batch) for batch in uint8_batches]),
+    ]
+    logging.info("%d images, batch size %d, 1 thread" % (args.image_num, args.batch_size))
+    for name, fn in cases:
+        cost = time_it(fn, args.repeat)
+        logging.info("%s: %.3fs (%.0f images/s)" % (name, cost, args.image_num / cost))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+import argparse
+import logging
+import threading
+import time
+
+import numpy as np
+
+import utils  # noqa: F401, puts the repository root on sys.path
+
+from fedml_core.distributed.communication.message import Message
+from fedml_core.distributed.communication.observer import Observer
+
+MSG_TYPE_PING = 1
+MSG_TYPE_PONG = 2
+
+
+def add_args(parser):
+    parser.add_argument('--backend', type=str, default='GRPC', help='GRPC, MPI or TRPC')
+    parser.add_argument('--round_num', type=int, default=200, help='number of timed ping-pong round trips')
+    parser.add_argument('--warmup_num', type=int, default=10, help='number of untimed round trips')
+    parser.add_argument('--payload_size', type=int, default=0,
+                        help='number of float32 values attached to each message (0 = control message only)')
+    parser.add_argument('--grpc_ipconfig_path', type=str, default="grpc_ipconfig.csv",
+                        help='receiver_id,ip table listing receivers 0 and 1 (GRPC only)')
+    parser.add_argument('--trpc_master_config_path', type=str, default="trpc_master_config.csv",
+                        help='master_ip,master_port of rank 0 (TRPC only)')
+    return parser.parse_args()
+
+
+class PingPongObserver(Observer):
+    """Rank 1 echoes every ping back; rank 0 wakes up the timing loop on every pong."""
+
+    def __init__(self, rank, com_manager, payload):
+        self.rank = rank
+        self.com_manager = com_manager
+        self.payload = payload
+        self.pong_event = threading.Event()
+
+    def receive_message(self, msg_type, msg_params) -> None:
+        if msg_type == MSG_TYPE_PING:
+            self.com_manager.send_message(build_message(MSG_TYPE_PONG, self.rank, 0, self.payload))
+        elif msg_type == MSG_TYPE_PONG:
+            self.pong_event.set()
+
+    def ping(self):
+        self.pong_event.clear()
+        self.com_manager.send_message(build_message(MSG_TYPE_PING, self.rank, 1, self.payload))
+        self.pong_event.wait()
+
+
+def build_message(msg_type, sender_id, receiver_id, payload):
+    message = Message(msg_type, sender_id, receiver_id)
+    if payload is not None:
+        message.add_params(Message.MSG_ARG_KEY_MODEL_PARAMS, payload)
+    return message
+
+
+def create_com_manager(args, rank, comm=None):
+    if args.backend == "GRPC":
+        from fedml_core.distributed.communication.gRPC.grpc_comm_manager import GRPCCommManager
+        # GRPCCommManager sends to port 8888 + receiver_id
+        return GRPCCommManager("0.0.0.0", 8888 + rank, ip_config_path=args.grpc_ipconfig_path,
+                               client_id=rank, client_num=1)
+    elif args.backend == "MPI":
+        from fedml_core.distributed.communication.mpi.com_manager import MpiCommunicationManager
+        return MpiCommunicationManager(comm, rank, 2, node_type="server" if rank == 0 else "client")
+    elif args.backend == "TRPC":
+        from fedml_core.distributed.communication.trpc.trpc_comm_manager import TRPCCommManager
+        return TRPCCommManager(args.trpc_master_config_path, process_id=rank, world_size=2)
+    raise ValueError("unknown backend: %s" % args.backend)
+
+
+def start_rank(args, rank, comm=None):
+    payload = None
+    if args.payload_size > 0:
+        payload = np.ones(args.payload_size, dtype=np.float32)
+    com_manager = create_com_manager(args, rank, comm)
+    observer = PingPongObserver(rank, com_manager, payload)
+    com_manager.add_observer(observer)
+    # MPI handles messages in the calling thread, GRPC/TRPC start their own handler thread
+    threading.Thread(target=com_manager.handle_receive_message, daemon=True).start()
+    return com_manager, observer
+
+
+def measure(args, observer):
+    for _ in range(args.warmup_num):
+        observer.ping()
+    latencies = []
+    for _ in range(args.round_num):
+        start_time = time.perf_counter()
+        observer.ping()
+        latencies.append(time.perf_counter() - start_time)
+    latencies = np.array(latencies) * 1000.0
+    logging.info("backend = %s, payload_size = %d, round_num = %d" % (args.backend, args.payload_size,
+                                                                      args.round_num))
+    logging.info("round trip latency: mean %.3fms, p50 %.3fms, p99 %.3fms" % (
+        latencies.mean(), np.percentile(latencies, 50), np.percentile(latencies, 99)))
+
+
+def run_trpc_worker(rank, args):
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
+    com_manager, observer = start_rank(args, rank)
+    if rank == 0:
+        measure(args, observer)
+    # rpc.shutdown() in stop_receive_message waits for the other worker, so rank 1 keeps echoing until rank 0 is done
+    com_manager.stop_receive_message()
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
+    args = add_args(argparse.ArgumentParser(description="comm-latency-benchmark"))
+
+    if args.backend == "GRPC":
+        # both endpoints live in this process, each with its own server and handler thread
+        com_managers = []
+        for rank in [1, 0]:
+            com_manager, observer = start_rank(args, rank)
+            com_managers.append(com_manager)
+        measure(args, observer)
+        for com_manager in com_managers:
+            com_manager.stop_receive_message()
+    elif args.backend == "MPI":
+        # mpirun -np 2 python comm_latency_benchmark.py --backend MPI
+        from mpi4py import MPI
+        comm = MPI.COMM_WORLD
+        com_manager, observer = start_rank(args, comm.Get_rank(), comm)
+        if comm.Get_rank() == 0:
+            measure(args, observer)
+        comm.Barrier()
+        com_manager.stop_receive_message()
+    elif args.backend == "TRPC":
+        import torch.multiprocessing as mp
+        mp.spawn(run_trpc_worker, args=(args,), nprocs=2, join=True)
+    else:
+        raise ValueError("unknown backend: %s" % args.backend)
+
+
+if __name__ == "__main__":
+    main()
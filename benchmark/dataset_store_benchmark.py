@@ -0,0 +1,88 @@
+import argparse
+import logging
+import multiprocessing
+import resource
+import time
+
+import utils  # noqa: F401, puts the repository root on sys.path
+
+
+def add_args(parser):
+    parser.add_argument('--dataset', type=str, default='cifar10', help='cifar10 or cifar100')
+    parser.add_argument('--data_dir', type=str, default='./../data/cifar10',
+                        help='directory holding the torchvision python version of the dataset')
+    parser.add_argument('--client_num_list', type=str, default='100,1000', help='comma separated client numbers')
+    parser.add_argument('--partition_method', type=str, default='homo', help='homo or hetero')
+    parser.add_argument('--partition_alpha', type=float, default=0.5)
+    parser.add_argument('--batch_size', type=int, default=64)
+    parser.add_argument('--modes', type=str, default='per_client_copy,store',
+                        help='per_client_copy (one dataset load and slice copy per client, as before the store), '
+                             'store and store_mmap (needs --dataset_mmap_dir)')
+    parser.add_argument('--dataset_mmap_dir', type=str, default='',
+                        help='directory of the memory-mapped .npy files of the store_mmap mode')
+    return parser.parse_args()
+
+
+def load_per_client_copies(args, client_num):
+    """What every client dataset did before the dataset store: reload the train and test sets and copy its slice."""
+    import numpy as np
+    from torchvision.datasets import CIFAR10, CIFAR100
+    dataset_cls = CIFAR10 if args.dataset == "cifar10" else CIFAR100
+    idxs = np.array_split(np.random.permutation(len(dataset_cls(args.data_dir, True).data)), client_num)
+    client_datasets = []
+    for client_idx in range(client_num):
+        train_dataobj = dataset_cls(args.data_dir, True)
+        test_dataobj = dataset_cls(args.data_dir, False)
+        client_datasets.append((train_dataobj.data[idxs[client_idx]],
+                                np.array(train_dataobj.targets)[idxs[client_idx]],
+                                test_dataobj.data, np.array(test_dataobj.targets)))
+    return client_datasets
+
+
+def load_with_store(args, client_num):
+    from fedml_api.data_preprocessing import dataset_store
+    if args.dataset == "cifar10":
+        from fedml_api.data_preprocessing.cifar10.data_loader import load_partition_data_cifar10 as data_loader
+    else:
+        from fedml_api.data_preprocessing.cifar100.data_loader import load_partition_data_cifar100 as data_loader
+    dataset_store.set_mmap_dir(args.dataset_mmap_dir if args.mode == "store_mmap" else None)
+    return data_loader(args.dataset, args.data_dir, args.partition_method, args.partition_alpha, client_num,
+                       args.batch_size)
+
+
+def run(args, client_num, queue):
+    logging.disable(logging.INFO)
+    start_time = time.time()
+    result = load_per_client_copies(args, client_num) if args.mode == "per_client_copy" else \
+        load_with_store(args, client_num)
+    # ru_maxrss is in KB on Linux
+    queue.put((time.time() - start_time, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0))
+    del result
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
+    args = add_args(argparse.ArgumentParser(description="dataset-store-benchmark"))
+
+    modes = args.modes.split(",")
+    if "store_mmap" in modes:
+        # the first store_mmap run writes the .npy files, the later ones only map them
+        modes.append("store_mmap")
+    context = multiprocessing.get_context("spawn")
+    for client_num in [int(n) for n in args.client_num_list.split(",")]:
+        for mode in modes:
+            # a fresh process per measurement, so peak RSS is not inherited from an earlier run
+            args.mode = mode
+            queue = context.Queue()
+            process = context.Process(target=run, args=(args, client_num, queue))
+            process.start()
+            process.join()
+            if process.exitcode != 0:
+                raise RuntimeError("%s benchmark process failed with exit code %d" % (mode, process.exitcode))
+            cost, peak_rss_mb = queue.get()
+            logging.info("dataset = %s, client_num = %d, mode = %s: startup %.2fs, peak RSS %.1f MB" % (
+                args.dataset, client_num, mode, cost, peak_rss_mb))
+
+
+if __name__ == "__main__":
+    main()
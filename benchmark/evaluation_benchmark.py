@@ -0,0 +1,71 @@
+import argparse
+import logging
+import time
+import types
+
+import numpy as np
+import torch
+from torch.utils import data
+
+import utils  # noqa: F401, puts the repository root on sys.path
+
+from fedml_api.model.cv.cnn import CNN_DropOut
+from fedml_api.model.linear.lr import LogisticRegression
+from fedml_api.standalone.fedavg.my_model_trainer_classification import MyModelTrainer
+from fedml_core.trainer.evaluation import evaluate_clients, stratified_client_sample
+
+
+def add_args(parser):
+    parser.add_argument('--client_num', type=int, default=3400, help='number of synthetic FEMNIST-like clients')
+    parser.add_argument('--mean_sample_num', type=int, default=20, help='mean number of examples of a client')
+    parser.add_argument('--batch_size', type=int, default=20, help='batch size of the client DataLoaders')
+    parser.add_argument('--eval_batch_size', type=int, default=1024)
+    parser.add_argument('--eval_client_fraction', type=float, default=0.1)
+    parser.add_argument('--gpu', type=int, default=-1, help='cuda device index, -1 for the cpu')
+    return parser.parse_args()
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
+    args = add_args(argparse.ArgumentParser(description="evaluation-benchmark"))
+    device = torch.device("cuda:%d" % args.gpu if args.gpu >= 0 else "cpu")
+
+    rng = np.random.RandomState(0)
+    dataloaders = []
+    for _ in range(args.client_num):
+        sample_num = max(1, rng.poisson(args.mean_sample_num))
+        dataset = data.TensorDataset(torch.from_numpy(rng.rand(sample_num, 28, 28).astype(np.float32)),
+                                     torch.from_numpy(rng.randint(0, 62, sample_num)))
+        dataloaders.append(data.DataLoader(dataset, batch_size=args.batch_size, shuffle=True))
+    sample_nums = {client_idx: len(dl.dataset) for client_idx, dl in enumerate(dataloaders)}
+    logging.info("%d clients, %d examples, device %s" % (args.client_num, sum(sample_nums.values()), device))
+
+    for model_name, model in [("lr", LogisticRegression(28 * 28, 62)), ("cnn", CNN_DropOut(False))]:
+        if model_name == "lr":
+            model = torch.nn.Sequential(torch.nn.Flatten(), model)
+        trainer = MyModelTrainer(model)
+        results = {}
+        for name, batched in [("serial", 0), ("batched", 1)]:
+            eval_args = types.SimpleNamespace(batched_evaluation=batched, eval_batch_size=args.eval_batch_size)
+            start_time = time.time()
+            metrics = evaluate_clients(trainer, dataloaders, device, eval_args)
+            cost = time.time() - start_time
+            results[name] = metrics
+            logging.info("%s, %s evaluation of all clients: %.2fs" % (model_name, name, cost))
+        max_diff = max(abs(serial['test_loss'] - batched['test_loss'])
+                       for serial, batched in zip(results["serial"], results["batched"]))
+        logging.info("%s, largest per-client loss difference: %.2e" % (model_name, max_diff))
+
+        client_idxs = stratified_client_sample(range(args.client_num), sample_nums, args.eval_client_fraction)
+        start_time = time.time()
+        metrics = evaluate_clients(trainer, [dataloaders[client_idx] for client_idx in client_idxs], device,
+                                   types.SimpleNamespace(batched_evaluation=1, eval_batch_size=args.eval_batch_size))
+        cost = time.time() - start_time
+        full_acc = sum(m['test_correct'] for m in results["batched"]) / sum(m['test_total'] for m in results["batched"])
+        sampled_acc = sum(m['test_correct'] for m in metrics) / sum(m['test_total'] for m in metrics)
+        logging.info("%s, batched evaluation of a stratified %.0f%% of the clients: %.2fs, accuracy %.4f (all: %.4f)"
+                     % (model_name, args.eval_client_fraction * 100, cost, sampled_acc, full_acc))
+
+
+if __name__ == "__main__":
+    main()
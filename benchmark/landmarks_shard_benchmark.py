@@ -0,0 +1,82 @@
+import argparse
+import csv
+import logging
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+from torch.utils.data import DataLoader
+
+from utils import time_it
+
+from fedml_api.data_preprocessing.Landmarks import shard_cache
+from fedml_api.data_preprocessing.Landmarks.data_loader import _data_transforms_landmarks, get_mapping_per_user
+from fedml_api.data_preprocessing.Landmarks.datasets import Landmarks, LandmarksShards
+
+
+def add_args(parser):
+    parser.add_argument('--image_num', type=int, default=1000, help='number of synthetic JPEG files')
+    parser.add_argument('--client_num', type=int, default=10)
+    parser.add_argument('--batch_size', type=int, default=32)
+    parser.add_argument('--repeat', type=int, default=2, help='number of timed repetitions')
+    return parser.parse_args()
+
+
+def write_synthetic_landmarks(data_dir, image_num, client_num):
+    """JPEG files of typical gld size (max side 800) and a user mapping csv."""
+    rng = np.random.RandomState(0)
+    rows = []
+    for idx in range(image_num):
+        # smooth random images, so the JPEG files have a realistic size
+        small = rng.randint(0, 256, (15, 20, 3)).astype(np.uint8)
+        Image.fromarray(small).resize((800, 600), Image.BILINEAR).save(os.path.join(data_dir, "%d.jpg" % idx))
+        rows.append({'user_id': idx % client_num, 'image_id': idx, 'class': rng.randint(0, 100)})
+    map_file = os.path.join(data_dir, "train.csv")
+    with open(map_file, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=['user_id', 'image_id', 'class'])
+        writer.writeheader()
+        writer.writerows(rows)
+    return map_file
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
+    args = add_args(argparse.ArgumentParser(description="landmarks-shard-benchmark"))
+
+    data_dir = tempfile.mkdtemp()
+    try:
+        map_file = write_synthetic_landmarks(data_dir, args.image_num, args.client_num)
+        files, _, net_dataidx_map = get_mapping_per_user(map_file)
+        transform_train, _ = _data_transforms_landmarks()
+
+        start_time = time.time()
+        shard_cache.build_shards(data_dir, files, os.path.join(data_dir, "shards"), map_file)
+        logging.info("%d 800x600 JPEG files, %d clients, batch size %d; one-time shard build: %.2fs" % (
+            args.image_num, args.client_num, args.batch_size, time.time() - start_time))
+        images, labels = shard_cache.load_shards(data_dir, files, os.path.join(data_dir, "shards"), map_file)
+
+        for name, make_dataset in [
+            ("JPEG files", lambda dataidxs, transform: Landmarks(data_dir, files, dataidxs=dataidxs,
+                                                                 transform=transform)),
+            ("decoded shards", lambda dataidxs, transform: LandmarksShards(images, labels, dataidxs=dataidxs,
+                                                                           transform=transform))]:
+            for transform_name, transform in [("no transform", np.asarray), ("train transform", transform_train)]:
+                loaders = [DataLoader(make_dataset(net_dataidx_map[client_idx], transform), batch_size=args.batch_size,
+                                      shuffle=True) for client_idx in range(args.client_num)]
+
+                def epoch():
+                    for loader in loaders:
+                        for _ in loader:
+                            pass
+                cost = time_it(epoch, args.repeat)
+                logging.info("%s, %s: %.2fs per epoch of all clients (%.0f images/s)" % (
+                    name, transform_name, cost, args.image_num / cost))
+    finally:
+        shutil.rmtree(data_dir)
+
+
+if __name__ == "__main__":
+    main()
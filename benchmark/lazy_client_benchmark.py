@@ -0,0 +1,92 @@
+import argparse
+import logging
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+import h5py
+import numpy as np
+
+import utils  # noqa: F401, puts the repository root on sys.path
+
+from fedml_api.data_preprocessing import lazy_client_dict
+from fedml_api.data_preprocessing.fed_cifar100 import data_loader as fed_cifar100
+
+
+def add_args(parser):
+    parser.add_argument('--client_num_per_round', type=int, default=10)
+    parser.add_argument('--comm_round', type=int, default=20)
+    parser.add_argument('--max_cached_clients', type=int, default=50)
+    parser.add_argument('--mode', type=str, default='', help='eager or lazy; empty runs both in subprocesses')
+    return parser.parse_args()
+
+
+def write_synthetic_fed_cifar100(data_dir):
+    """fed_cifar100 h5 files of the real shape: 500 train clients with 100 images, 100 test clients with 100 images."""
+    rng = np.random.RandomState(0)
+    for file_name, client_num in [(fed_cifar100.DEFAULT_TRAIN_FILE, 500), (fed_cifar100.DEFAULT_TEST_FILE, 100)]:
+        with h5py.File(os.path.join(data_dir, file_name), 'w') as h5:
+            for client_idx in range(client_num):
+                group = h5.create_group('examples/%d' % client_idx)
+                group['image'] = rng.randint(0, 256, (100, 32, 32, 3)).astype(np.uint8)
+                group['label'] = rng.randint(0, 100, (100, 1)).astype(np.int64)
+
+
+def eager_load(data_dir, batch_size):
+    """The DataLoaders of all clients, built up front as load_partition_data_federated_cifar100 did before."""
+    result = list(fed_cifar100.load_partition_data_federated_cifar100(None, data_dir, batch_size))
+    result[6] = {client_idx: result[6][client_idx] for client_idx in range(fed_cifar100.DEFAULT_TRAIN_CLIENTS_NUM)}
+    result[7] = {client_idx: result[7][client_idx] for client_idx in range(fed_cifar100.DEFAULT_TRAIN_CLIENTS_NUM)}
+    return result
+
+
+def run(args, data_dir):
+    lazy_client_dict.set_max_clients(args.max_cached_clients if args.mode == 'lazy' else None)
+    # silences the per-client logging of the loader
+    logging.disable(logging.INFO)
+    start_time = time.time()
+    if args.mode == 'eager':
+        result = eager_load(data_dir, 20)
+    else:
+        result = fed_cifar100.load_partition_data_federated_cifar100(None, data_dir, 20)
+    startup = time.time() - start_time
+    train_data_local_dict = result[6]
+
+    rng = np.random.RandomState(0)
+    start_time = time.time()
+    for _ in range(args.comm_round):
+        for client_idx in rng.choice(len(train_data_local_dict), args.client_num_per_round, replace=False):
+            for _ in train_data_local_dict[client_idx]:
+                pass
+    rounds = time.time() - start_time
+    logging.disable(logging.NOTSET)
+    logging.info("%s: startup %.2fs, %d rounds of %d clients %.2fs, peak RSS %.0f MB" % (
+        args.mode, startup, args.comm_round, args.client_num_per_round, rounds,
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024))
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
+    args = add_args(argparse.ArgumentParser(description="lazy-client-benchmark"))
+
+    if args.mode:
+        run(args, os.environ["LAZY_CLIENT_BENCHMARK_DIR"])
+        return
+    data_dir = tempfile.mkdtemp()
+    try:
+        write_synthetic_fed_cifar100(data_dir)
+        # separate processes, so each peak RSS only counts its own mode
+        for mode in ['eager', 'lazy']:
+            os.system("LAZY_CLIENT_BENCHMARK_DIR=%s %s %s --mode %s --client_num_per_round %d --comm_round %d "
+                      "--max_cached_clients %d" % (data_dir, sys.executable, os.path.abspath(__file__), mode,
+                                                   args.client_num_per_round, args.comm_round,
+                                                   args.max_cached_clients))
+    finally:
+        shutil.rmtree(data_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import argparse
+import io
+import logging
+import os
+import pickle
+import shutil
+import tempfile
+
+import lmdb
+import numpy as np
+from PIL import Image
+from torch.utils.data import DataLoader
+
+from utils import time_it
+
+from fedml_api.data_preprocessing.covid.datasets import ImageFolderLMDB
+from fedml_api.data_preprocessing.lmdb_dataset import write_lmdb
+
+
+def add_args(parser):
+    parser.add_argument('--image_num', type=int, default=5000, help='number of synthetic RGB images')
+    parser.add_argument('--image_size', type=int, default=64, help='height and width of the images')
+    parser.add_argument('--batch_size', type=int, default=64)
+    parser.add_argument('--num_workers', type=int, default=0, help='DataLoader workers')
+    parser.add_argument('--repeat', type=int, default=3, help='number of timed repetitions')
+    return parser.parse_args()
+
+
+def write_jpeg_pickle_lmdb(lmdb_path, imgs, labels):
+    """The layout of the previous folder2lmdb: pickled (encoded image file, label) records and pickled keys."""
+    db = lmdb.open(lmdb_path, subdir=False, map_size=1 << 34)
+    with db.begin(write=True) as txn:
+        for idx, (img, label) in enumerate(zip(imgs, labels)):
+            buf = io.BytesIO()
+            Image.fromarray(img).save(buf, format='JPEG')
+            txn.put(u'{}'.format(idx).encode('ascii'), pickle.dumps((buf.getvalue(), int(label))))
+        keys = [u'{}'.format(idx).encode('ascii') for idx in range(len(labels))]
+        txn.put(b'__keys__', pickle.dumps(list(zip(keys, labels))))
+        txn.put(b'__len__', pickle.dumps(len(keys)))
+    db.close()
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
+    args = add_args(argparse.ArgumentParser(description="lmdb-benchmark"))
+
+    rng = np.random.RandomState(0)
+    imgs = rng.randint(0, 256, (args.image_num, args.image_size, args.image_size, 3)).astype(np.uint8)
+    labels = rng.randint(0, 3, args.image_num)
+    data_dir = tempfile.mkdtemp()
+    try:
+        write_jpeg_pickle_lmdb(os.path.join(data_dir, "jpeg_pickle.lmdb"), imgs, labels)
+        write_lmdb(os.path.join(data_dir, "raw.lmdb"), ((img.transpose(2, 0, 1), label)
+                                                        for img, label in zip(imgs, labels)))
+        logging.info("%d images of %dx%d, batch size %d, %d workers" % (
+            args.image_num, args.image_size, args.image_size, args.batch_size, args.num_workers))
+
+        for name in ["jpeg_pickle", "raw"]:
+            dataset = ImageFolderLMDB(os.path.join(data_dir, name))
+
+            def per_item():
+                for idx in range(len(dataset)):
+                    dataset[idx]
+            cost = time_it(per_item, args.repeat)
+            logging.info("%s, __getitem__ (one transaction per image): %.0f images/s" % (name, args.image_num / cost))
+
+            loader = DataLoader(dataset, batch_size=args.batch_size, shuffle=True, num_workers=args.num_workers)
+
+            def epoch():
+                for _ in loader:
+                    pass
+            cost = time_it(epoch, args.repeat)
+            logging.info("%s, DataLoader with __getitems__ (one transaction per batch): %.0f images/s" % (
+                name, args.image_num / cost))
+    finally:
+        shutil.rmtree(data_dir)
+
+
+if __name__ == "__main__":
+    main()
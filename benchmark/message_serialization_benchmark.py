@@ -0,0 +1,58 @@
+import argparse
+import copy
+import logging
+
+from utils import time_it
+
+from fedml_api.distributed.fedavg.utils import transform_list_to_tensor, transform_tensor_to_list
+from fedml_api.model.cv.mobilenet import mobilenet
+from fedml_api.model.cv.resnet import resnet56
+from fedml_core.distributed.communication.message import Message
+
+
+def add_args(parser):
+    parser.add_argument('--repeat', type=int, default=3, help='number of timed repetitions')
+    return parser.parse_args()
+
+
+def build_message(model_params):
+    message = Message(2, 0, 1)
+    message.add_params(Message.MSG_ARG_KEY_MODEL_PARAMS, model_params)
+    message.add_params("client_idx", "3")
+    return message
+
+
+def json_round_trip(state_dict):
+    message = build_message(transform_tensor_to_list(copy.copy(state_dict)))
+    payload = message.to_json()
+    received = Message()
+    received.init_from_json_string(payload)
+    transform_list_to_tensor(received.get(Message.MSG_ARG_KEY_MODEL_PARAMS))
+    return len(payload.encode("utf-8"))
+
+
+def binary_round_trip(state_dict):
+    payload = build_message(state_dict).to_bytes()
+    received = Message()
+    received.init_from_bytes(payload)
+    return len(payload)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
+    args = add_args(argparse.ArgumentParser(description="message-serialization-benchmark"))
+
+    for model_name, model in [("resnet56", resnet56(class_num=10)), ("mobilenet", mobilenet(class_num=10))]:
+        state_dict = model.state_dict()
+        raw_size = sum(v.numel() * v.element_size() for v in state_dict.values())
+        json_size = json_round_trip(state_dict)
+        json_cost = time_it(lambda: json_round_trip(state_dict), args.repeat)
+        binary_size = binary_round_trip(state_dict)
+        binary_cost = time_it(lambda: binary_round_trip(state_dict), args.repeat)
+        logging.info("%s: raw tensors %.2f MB" % (model_name, raw_size / 1e6))
+        logging.info("  JSON   round trip %.4fs, payload %.2f MB" % (json_cost, json_size / 1e6))
+        logging.info("  binary round trip %.4fs, payload %.2f MB" % (binary_cost, binary_size / 1e6))
+
+
+if __name__ == "__main__":
+    main()
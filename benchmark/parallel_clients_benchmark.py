@@ -0,0 +1,108 @@
+import argparse
+import copy
+import logging
+import os
+import time
+import types
+
+import numpy as np
+import torch
+from torch.utils import data
+
+import utils  # noqa: F401, puts the repository root on sys.path
+
+from fedml_api.model.cv.cnn import CNN_DropOut
+from fedml_api.standalone.fedavg.client import Client
+from fedml_api.standalone.fedavg.my_model_trainer_classification import MyModelTrainer
+from fedml_api.standalone.fedavg.parallel_client_executor import ParallelClientExecutor
+from fedml_core.aggregation.flat_aggregation import weighted_average_state_dicts
+
+
+def add_args(parser):
+    parser.add_argument('--client_num_in_total', type=int, default=200)
+    parser.add_argument('--client_num_per_round', type=int, default=20)
+    parser.add_argument('--comm_round', type=int, default=2)
+    parser.add_argument('--sample_num', type=int, default=100, help='examples of every synthetic client')
+    parser.add_argument('--max_process_num', type=int, default=os.cpu_count(),
+                        help='the scaling runs use 1, 2, 4, ... up to this many worker processes')
+    return parser.parse_args()
+
+
+def sequential_rounds(args, model_trainer, train_data_local_dict, train_data_local_num_dict, rounds):
+    """The client loop of FedAvgAPI.train before the executor."""
+    w_global = model_trainer.get_model_params()
+    client = Client(0, None, None, 0, args, torch.device("cpu"), model_trainer)
+    for client_indexes in rounds:
+        w_locals = []
+        for client_idx in client_indexes:
+            client.update_local_dataset(client_idx, train_data_local_dict[client_idx], None,
+                                        train_data_local_num_dict[client_idx])
+            w = client.train(copy.deepcopy(w_global))
+            w_locals.append((client.get_sample_number(), copy.deepcopy(w)))
+        w_global = weighted_average_state_dicts(w_locals)
+        model_trainer.set_model_params(w_global)
+    return w_global
+
+
+def parallel_rounds(args, process_num, model_trainer, train_data_local_dict, train_data_local_num_dict, rounds):
+    w_global = model_trainer.get_model_params()
+    executor = ParallelClientExecutor(process_num, model_trainer, train_data_local_dict, train_data_local_num_dict,
+                                      args, torch.device("cpu"))
+    try:
+        start_time = time.time()
+        for round_idx, client_indexes in enumerate(rounds):
+            w_global = executor.train(round_idx, client_indexes, w_global)
+        cost = time.time() - start_time
+    finally:
+        executor.close()
+    return w_global, cost
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
+    args = add_args(argparse.ArgumentParser(description="parallel-clients-benchmark"))
+    train_args = types.SimpleNamespace(client_num_in_total=args.client_num_in_total,
+                                       client_num_per_round=args.client_num_per_round,
+                                       client_optimizer="sgd", lr=0.03, wd=0, epochs=1)
+
+    rng = np.random.RandomState(0)
+    train_data_local_dict = {}
+    for client_idx in range(args.client_num_in_total):
+        dataset = data.TensorDataset(torch.from_numpy(rng.rand(args.sample_num, 28, 28).astype(np.float32)),
+                                     torch.from_numpy(rng.randint(0, 62, args.sample_num)))
+        train_data_local_dict[client_idx] = data.DataLoader(dataset, batch_size=20, shuffle=True)
+    train_data_local_num_dict = {client_idx: args.sample_num for client_idx in range(args.client_num_in_total)}
+    rounds = [rng.choice(args.client_num_in_total, args.client_num_per_round, replace=False)
+              for _ in range(args.comm_round)]
+    torch.manual_seed(0)
+    model_trainer = MyModelTrainer(CNN_DropOut(False))
+    logging.info("%d rounds of %d clients with %d examples, %d cpus" % (
+        args.comm_round, args.client_num_per_round, args.sample_num, os.cpu_count()))
+
+    # silences the per-epoch logging of the trainer
+    logging.disable(logging.INFO)
+    start_time = time.time()
+    sequential_rounds(train_args, copy.deepcopy(model_trainer), train_data_local_dict, train_data_local_num_dict,
+                      rounds)
+    sequential = time.time() - start_time
+    logging.disable(logging.NOTSET)
+    logging.info("sequential: %.2fs" % sequential)
+
+    process_nums = sorted(set([2 ** i for i in range(args.max_process_num.bit_length())] + [args.max_process_num]))
+    results = {}
+    for process_num in process_nums:
+        logging.disable(logging.INFO)
+        w_global, cost = parallel_rounds(train_args, process_num, copy.deepcopy(model_trainer),
+                                         train_data_local_dict, train_data_local_num_dict, rounds)
+        logging.disable(logging.NOTSET)
+        results[process_num] = w_global
+        logging.info("%d worker processes: %.2fs, speedup %.2fx over sequential" % (
+            process_num, cost, sequential / cost))
+    # the seed of a client does not depend on the worker running it
+    max_diff = max((results[process_num][k] - results[1][k]).abs().max().item()
+                   for process_num in process_nums for k in results[1])
+    logging.info("largest weight difference to 1 worker process: %.2e" % max_diff)
+
+
+if __name__ == "__main__":
+    main()
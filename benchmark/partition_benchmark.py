@@ -0,0 +1,71 @@
+import argparse
+import logging
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+import utils  # noqa: F401, puts the repository root on sys.path
+
+from fedml_api.data_preprocessing import partition_cache
+from fedml_core.non_iid_partition import noniid_partition
+
+
+def add_args(parser):
+    parser.add_argument('--sample_num', type=int, default=1000000, help='number of synthetic labels')
+    parser.add_argument('--class_num', type=int, default=100)
+    parser.add_argument('--client_num_list', type=str, default="100,1000,10000,100000")
+    parser.add_argument('--alpha', type=float, default=0.5)
+    parser.add_argument('--list_max_client_num', type=int, default=10000,
+                        help='skip the per-client list implementation above this client number')
+    return parser.parse_args()
+
+
+def list_partition(label_list, client_num, class_num, alpha):
+    """The per-client list implementation the loaders used before the vectorized engine (one pass, no resampling)."""
+    idx_batch = [[] for _ in range(client_num)]
+    for k in range(class_num):
+        idx_k = np.where(label_list == k)[0]
+        idx_batch, _ = noniid_partition.partition_class_samples_with_dirichlet_distribution(
+            len(label_list), alpha, client_num, idx_batch, idx_k)
+    for i in range(client_num):
+        np.random.shuffle(idx_batch[i])
+    return {i: idx_batch[i] for i in range(client_num)}
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
+    args = add_args(argparse.ArgumentParser(description="partition-benchmark"))
+
+    labels = np.random.RandomState(0).randint(0, args.class_num, args.sample_num)
+    cache_dir = tempfile.mkdtemp()
+    try:
+        for client_num in [int(c) for c in args.client_num_list.split(",")]:
+            if client_num <= args.list_max_client_num:
+                start_time = time.time()
+                list_partition(labels, client_num, args.class_num, args.alpha)
+                logging.info("%d clients, per-client lists: %.3fs" % (client_num, time.time() - start_time))
+
+            start_time = time.time()
+            noniid_partition.dirichlet_partition(noniid_partition.class_indices(labels, args.class_num),
+                                                 args.sample_num, client_num, args.alpha)
+            logging.info("%d clients, vectorized: %.3fs" % (client_num, time.time() - start_time))
+
+            def partition_fn(rng):
+                return noniid_partition.dirichlet_partition(noniid_partition.class_indices(labels, args.class_num),
+                                                            args.sample_num, client_num, args.alpha, rng=rng)
+            partition_cache.set_cache_dir(cache_dir, seed=0)
+            partition_cache.get_net_dataidx_map("synthetic", "hetero", args.alpha, args.sample_num, client_num,
+                                                partition_fn)
+            start_time = time.time()
+            partition_cache.get_net_dataidx_map("synthetic", "hetero", args.alpha, args.sample_num, client_num,
+                                                partition_fn)
+            logging.info("%d clients, cached CSR load: %.3fs" % (client_num, time.time() - start_time))
+    finally:
+        partition_cache.set_cache_dir(None)
+        shutil.rmtree(cache_dir)
+
+
+if __name__ == "__main__":
+    main()
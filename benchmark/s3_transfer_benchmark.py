@@ -0,0 +1,59 @@
+import argparse
+import logging
+import uuid
+
+from utils import time_it
+
+from fedml_api.model.cv.mobilenet import mobilenet
+from fedml_api.model.cv.resnet import resnet56
+from fedml_core.distributed.communication import tensor_serializer
+from fedml_core.distributed.communication.mqtt_s3.remote_storage import S3Storage
+
+
+def add_args(parser):
+    parser.add_argument('--s3_config_path', type=str,
+                        default="../fedml_experiments/distributed/fedavg_cross_silo/s3_config.yaml",
+                        help='S3 config; set S3_ENDPOINT_URL to benchmark against a local stand-in (e.g. moto_server)')
+    parser.add_argument('--model', type=str, default='resnet56', help='resnet56 or mobilenet')
+    parser.add_argument('--repeat', type=int, default=3, help='number of timed repetitions')
+    return parser.parse_args()
+
+
+def create_model(model_name):
+    if model_name == "resnet56":
+        return resnet56(class_num=10)
+    elif model_name == "mobilenet":
+        return mobilenet(class_num=10)
+    raise ValueError("unknown model: %s" % model_name)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
+    args = add_args(argparse.ArgumentParser(description="s3-transfer-benchmark"))
+
+    state_dict = create_model(args.model).state_dict()
+    storage = S3Storage(args.s3_config_path)
+    message_key = "fedml_s3_transfer_benchmark_" + str(uuid.uuid4())
+
+    def single_stream_put():
+        # one put_object of the joined payload and one streaming get_object, as before the multipart path
+        storage.s3.put_object(Body=tensor_serializer.dumps(state_dict), Bucket=storage.bucket_name, Key=message_key)
+        tensor_serializer.loads(storage.s3.get_object(Bucket=storage.bucket_name, Key=message_key)['Body'].read())
+
+    def multipart_round_trip():
+        storage.write_model(message_key, state_dict)
+        storage.read_model(message_key)
+
+    logging.info("model = %s, raw tensors %.2f MB, max_concurrency = %d, part size = %d MB" % (
+        args.model, sum(v.numel() * v.element_size() for v in state_dict.values()) / 1e6,
+        storage.max_concurrency, storage.multipart_chunksize // (1024 * 1024)))
+    logging.info("single stream put_object/get_object: %.4fs" % time_it(single_stream_put, args.repeat))
+    for compression in [None, "zlib"]:
+        storage.compression = compression
+        logging.info("write_model/read_model (compression = %s): %.4fs" % (
+            compression, time_it(multipart_round_trip, args.repeat)))
+    storage.s3.delete_object(Bucket=storage.bucket_name, Key=message_key)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import argparse
+import json
+import logging
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from utils import time_it
+
+from fedml_api.data_preprocessing.shakespeare import data_loader
+from fedml_api.data_preprocessing.shakespeare.language_utils import ALL_LETTERS
+
+
+def add_args(parser):
+    parser.add_argument('--client_num', type=int, default=700, help='number of synthetic LEAF clients')
+    parser.add_argument('--sample_num_per_client', type=int, default=500)
+    parser.add_argument('--seq_len', type=int, default=80)
+    parser.add_argument('--batch_size', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=3, help='number of timed repetitions')
+    return parser.parse_args()
+
+
+def write_leaf_json(data_dir, args):
+    rng = random.Random(0)
+    for split, sample_num in [("train", args.sample_num_per_client), ("test", max(1, args.sample_num_per_client // 5))]:
+        os.makedirs(os.path.join(data_dir, split))
+        users = ["client_%05d" % i for i in range(args.client_num)]
+        user_data = {u: {"x": ["".join(rng.choice(ALL_LETTERS) for _ in range(args.seq_len))
+                               for _ in range(sample_num)],
+                         "y": [rng.choice(ALL_LETTERS) for _ in range(sample_num)]} for u in users}
+        with open(os.path.join(data_dir, split, "all_data.json"), 'w') as f:
+            json.dump({"users": users, "num_samples": [sample_num] * len(users), "user_data": user_data}, f)
+
+
+def json_startup(train_path, test_path, batch_size):
+    """The loader before the packed cache: parse the json and convert every batch to tensors up front."""
+    users, _, train_data, test_data = data_loader.read_data(train_path, test_path)
+    train_data_local_dict = {idx: data_loader.batch_data(train_data[u], batch_size) for idx, u in enumerate(users)}
+    test_data_local_dict = {idx: data_loader.batch_data(test_data[u], batch_size) for idx, u in enumerate(users)}
+    return train_data_local_dict, test_data_local_dict
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
+    args = add_args(argparse.ArgumentParser(description="shakespeare-packed-benchmark"))
+
+    data_dir = tempfile.mkdtemp()
+    try:
+        write_leaf_json(data_dir, args)
+        train_path = os.path.join(data_dir, "train")
+        test_path = os.path.join(data_dir, "test")
+        packed_dir = os.path.join(data_dir, "packed")
+        logging.info("%d clients x %d train examples of %d characters" % (
+            args.client_num, args.sample_num_per_client, args.seq_len))
+
+        cost = time_it(lambda: json_startup(train_path, test_path, args.batch_size), args.repeat)
+        logging.info("json + batch_data startup: %.3fs" % cost)
+
+        start_time = time.time()
+        data_loader.load_partition_data_shakespeare(args.batch_size, train_path, test_path, packed_dir)
+        logging.info("first run, packing included: %.3fs" % (time.time() - start_time))
+
+        def packed_startup():
+            data_loader.load_partition_data_shakespeare(args.batch_size, train_path, test_path, packed_dir)
+        logging.info("packed startup: %.3fs" % time_it(packed_startup, args.repeat))
+
+        train_data_local_dict = data_loader.load_partition_data_shakespeare(
+            args.batch_size, train_path, test_path, packed_dir)[6]
+
+        def packed_epoch():
+            for client_idx in range(min(args.client_num, 100)):
+                for x, y in train_data_local_dict[client_idx]:
+                    pass
+        cost = time_it(packed_epoch, args.repeat)
+        logging.info("packed batch slicing: %.2fus per batch" % (
+            cost * 1e6 / sum(len(train_data_local_dict[i]) for i in range(min(args.client_num, 100)))))
+    finally:
+        shutil.rmtree(data_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import argparse
+import collections
+import logging
+
+import numpy as np
+import torch
+
+from utils import time_it
+
+from fedml_api.data_preprocessing.stackoverflow_lr import utils
+from fedml_api.model.linear.lr import LogisticRegression
+
+
+def add_args(parser):
+    parser.add_argument('--sample_num', type=int, default=2000, help='number of examples of the client shard')
+    parser.add_argument('--sentence_len', type=int, default=40, help='number of words per example')
+    parser.add_argument('--vocab_size', type=int, default=10000)
+    parser.add_argument('--tag_size', type=int, default=500)
+    parser.add_argument('--batch_size', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=3, help='number of timed repetitions')
+    return parser.parse_args()
+
+
+def dense_one_hot_mean(sentence, data_dir):
+    """The per-example preprocessing before the vectorized path: a dense (tokens, vocab + 1) one-hot matrix."""
+    vocab_size = len(utils.get_word_dict(data_dir))
+    tokens = [utils.get_word_dict(data_dir).get(word, vocab_size) for word in sentence.split(' ')]
+    onehot = np.zeros((len(tokens), vocab_size + 1))
+    onehot[np.arange(len(tokens)), tokens] = 1
+    return np.mean(onehot, axis=0, dtype=np.float32)[:vocab_size]
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
+    args = add_args(argparse.ArgumentParser(description="stackoverflow-lr-preprocess-benchmark"))
+
+    # a synthetic vocabulary stands in for the word/tag count files, so no dataset download is needed
+    utils.word_dict = collections.OrderedDict(("w%d" % i, i) for i in range(args.vocab_size))
+    utils.tag_dict = collections.OrderedDict(("t%d" % i, i) for i in range(args.tag_size))
+    rng = np.random.RandomState(0)
+    # ~10% of the words are out of vocabulary, as rare words are in StackOverflow
+    sentences = [' '.join("w%d" % w for w in rng.zipf(1.3, args.sentence_len) % (args.vocab_size * 11 // 10))
+                 for _ in range(args.sample_num)]
+    tags = ['|'.join("t%d" % t for t in rng.randint(0, args.tag_size, 3)) for _ in range(args.sample_num)]
+
+    def per_example_dense():
+        [dense_one_hot_mean(sentence, None) for sentence in sentences]
+
+    def per_example_bincount():
+        [utils.preprocess_input(sentence, None) for sentence in sentences]
+        [utils.preprocess_target(tag, None) for tag in tags]
+
+    def bulk_csr():
+        word_ids, word_lengths = utils.sentences_to_ids(sentences, None)
+        utils.bag_of_words_csr(word_ids, word_lengths, args.vocab_size)
+        tag_ids, tag_lengths = utils.tags_to_ids(tags, None)
+        utils.bag_of_words_csr(tag_ids, tag_lengths, args.tag_size, normalize=False)
+
+    logging.info("client shard: %d examples x %d words, vocab %d" % (args.sample_num, args.sentence_len,
+                                                                     args.vocab_size))
+    for name, fn in [("per-example dense one-hot (inputs only)", per_example_dense),
+                     ("per-example bincount", per_example_bincount),
+                     ("bulk ids + CSR", bulk_csr)]:
+        cost = time_it(fn, args.repeat)
+        logging.info("%s: %.4fs (%.0f examples/s)" % (name, cost, args.sample_num / cost))
+
+    word_ids, word_lengths = utils.sentences_to_ids(sentences[:args.batch_size], None)
+    indptr, indices, values = utils.bag_of_words_csr(word_ids, word_lengths, args.vocab_size)
+    rows = np.repeat(np.arange(args.batch_size), np.diff(indptr))
+    sparse_x = torch.sparse_coo_tensor(torch.from_numpy(np.stack([rows, indices])), torch.from_numpy(values),
+                                       (args.batch_size, args.vocab_size)).coalesce()
+    dense_x = sparse_x.to_dense()
+    target = torch.zeros(args.batch_size, args.tag_size)
+    model = LogisticRegression(args.vocab_size, args.tag_size)
+    criterion = torch.nn.BCELoss(reduction='sum')
+
+    for name, x in [("dense", dense_x), ("sparse", sparse_x)]:
+        def train_step():
+            for _ in range(100):
+                model.zero_grad()
+                criterion(model(x), target).backward()
+        cost = time_it(train_step, args.repeat)
+        logging.info("LogisticRegression forward+backward, %s input: %.2fms per batch of %d" % (
+            name, cost * 10.0, args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
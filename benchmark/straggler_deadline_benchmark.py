@@ -0,0 +1,150 @@
+"""
+Round wall-clock time of the synchronous distributed FedAvg with heterogeneous client speeds, without and with the
+round deadline, over-selection and latency-biased client sampling, on the MPI backend:
+
+    mpirun -np 9 python straggler_deadline_benchmark.py
+    mpirun -np 9 python straggler_deadline_benchmark.py --round_deadline 1 --over_selection_rate 0.3
+    mpirun -np 9 python straggler_deadline_benchmark.py --round_deadline 1 --over_selection_rate 0.3 --latency_bias 2
+
+A fixed fraction of the clients is slow: each of their local trainings sleeps `slow_delay` seconds, the others
+sleep `fast_delay`, both with exponential jitter. The server logs the mean round time, the mean number of models
+aggregated per round and the accuracy of the final global model on a held-out synthetic test set before it ends the
+run (with MPI_Abort, as the distributed FedAvg does).
+"""
+
+import argparse
+import logging
+import time
+import types
+
+import numpy as np
+import torch
+from torch.utils import data
+
+import utils  # noqa: F401, puts the repository root on sys.path
+
+from fedml_api.distributed.fedavg.FedAVGAggregator import FedAVGAggregator
+from fedml_api.distributed.fedavg.FedAvgAPI import FedML_init, init_client
+from fedml_api.distributed.fedavg.FedAvgServerManager import FedAVGServerManager
+from fedml_api.model.linear.lr import LogisticRegression
+from fedml_api.standalone.fedavg.my_model_trainer_classification import MyModelTrainer
+
+
+def add_args(parser):
+    parser.add_argument('--comm_round', type=int, default=11, help='the first round is not timed')
+    parser.add_argument('--client_num_in_total', type=int, default=100)
+    parser.add_argument('--slow_client_fraction', type=float, default=0.2)
+    parser.add_argument('--fast_delay', type=float, default=0.2, help='mean delay of a fast client (s)')
+    parser.add_argument('--slow_delay', type=float, default=2.0, help='mean delay of a slow client (s)')
+    parser.add_argument('--round_deadline', type=float, default=0)
+    parser.add_argument('--over_selection_rate', type=float, default=0)
+    parser.add_argument('--latency_bias', type=float, default=0)
+    return parser.parse_args()
+
+
+class HeterogeneousModelTrainer(MyModelTrainer):
+    """Sleeps before each local training for a delay that depends on the client owning the data."""
+
+    def __init__(self, model, client_delays, seed):
+        super().__init__(model)
+        # DataLoader id -> mean delay of its client
+        self.client_delays = client_delays
+        self.rng = np.random.RandomState(seed)
+
+    def train(self, train_data, device, args):
+        mean_delay = self.client_delays[id(train_data)]
+        time.sleep(mean_delay * (0.5 + 0.5 * self.rng.exponential()))
+        super().train(train_data, device, args)
+
+    def test_on_the_server(self, train_data_local_dict, test_data_local_dict, device, args=None) -> bool:
+        # no evaluation during the timed run
+        return True
+
+
+class TimedServerManager(FedAVGServerManager):
+    """Times the rounds after the first one, which mostly measures the start-up of the worker processes."""
+
+    def __init__(self, args, aggregator, comm, rank, size, backend, test_data):
+        super().__init__(args, aggregator, comm, rank, size, backend)
+        self.test_data = test_data
+        self.aggregated_model_num = 0
+
+    def _finish_round(self):
+        if self.round_idx == 0:
+            self.start_time = time.time()
+        else:
+            self.aggregated_model_num += len(self.aggregator.received_indexes())
+        super()._finish_round()
+
+    def finish(self):
+        cost = time.time() - self.start_time
+        timed_round_num = self.round_num - 1
+        logging.disable(logging.NOTSET)
+        metrics = self.aggregator.trainer.test(self.test_data, torch.device("cpu"), self.args)
+        logging.info("deadline %.1fs, over-selection %.1f, latency bias %.1f: %.2fs per round, %.1f of %d models "
+                     "aggregated per round, test accuracy %.4f" % (
+                         self.args.round_deadline, self.args.over_selection_rate, self.args.latency_bias,
+                         cost / timed_round_num, self.aggregated_model_num / timed_round_num, self.size - 1,
+                         metrics['test_correct'] / metrics['test_total']))
+        super().finish()
+
+
+def synthetic_clients(client_num, rng):
+    """Linearly separable 10-class data, 50 examples per client."""
+    true_weights = rng.randn(20, 10)
+    x = rng.randn(client_num * 50 + 2000, 20).astype(np.float32)
+    y = np.argmax(x @ true_weights, axis=1)
+    train_data_local_dict = {
+        client_idx: data.DataLoader(data.TensorDataset(torch.from_numpy(x[client_idx * 50:(client_idx + 1) * 50]),
+                                                       torch.from_numpy(y[client_idx * 50:(client_idx + 1) * 50])),
+                                    batch_size=10, shuffle=True)
+        for client_idx in range(client_num)}
+    test_data = data.DataLoader(data.TensorDataset(torch.from_numpy(x[-2000:]), torch.from_numpy(y[-2000:])),
+                                batch_size=500)
+    return train_data_local_dict, test_data
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
+    comm, process_id, worker_number = FedML_init()
+    bench_args = add_args(argparse.ArgumentParser(description="straggler-deadline-benchmark"))
+    worker_num = worker_number - 1
+    args = types.SimpleNamespace(
+        is_mobile=0, backend="MPI", dataset="synthetic", ci=0,
+        client_num_in_total=bench_args.client_num_in_total, client_num_per_round=worker_num,
+        comm_round=bench_args.comm_round, frequency_of_the_test=1, batch_size=10, client_optimizer="sgd", lr=1.0,
+        wd=0, epochs=1, round_deadline=bench_args.round_deadline,
+        over_selection_rate=bench_args.over_selection_rate, latency_bias=bench_args.latency_bias)
+
+    rng = np.random.RandomState(0)
+    train_data_local_dict, test_data = synthetic_clients(args.client_num_in_total, rng)
+    train_data_local_num_dict = {client_idx: 50 for client_idx in train_data_local_dict}
+    slow = rng.rand(args.client_num_in_total) < bench_args.slow_client_fraction
+    client_delays = {id(train_data_local_dict[client_idx]):
+                     bench_args.slow_delay if slow[client_idx] else bench_args.fast_delay
+                     for client_idx in train_data_local_dict}
+    torch.manual_seed(0)
+    model_trainer = HeterogeneousModelTrainer(LogisticRegression(20, 10), client_delays, process_id)
+    device = torch.device("cpu")
+
+    # silences the per-message logging of the managers
+    logging.disable(logging.INFO)
+    if process_id == 0:
+        model_trainer.set_id(-1)
+        aggregator = FedAVGAggregator(None, test_data, args.client_num_in_total * 50, train_data_local_dict,
+                                      train_data_local_dict, train_data_local_num_dict, worker_num, device, args,
+                                      model_trainer)
+        server_manager = TimedServerManager(args, aggregator, comm, process_id, worker_number, args.backend,
+                                            test_data)
+        server_manager.send_init_msg()
+        server_manager.run()
+    else:
+        # clients end the run (MPI_Abort) after their last round, possibly before the server has logged its result;
+        # here the server ends it
+        args.comm_round += 1
+        init_client(args, device, comm, process_id, worker_number, model_trainer.model, args.client_num_in_total * 50,
+                    train_data_local_num_dict, train_data_local_dict, train_data_local_dict, model_trainer)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+"""
+Shared by the benchmark scripts: importing this module puts the repository root on sys.path, so that the scripts
+can import fedml_api and fedml_core.
+"""
+
+import os
+import sys
+import time
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+
+def time_it(fn, repeat):
+    """Best wall-clock time of `repeat` calls of fn()."""
+    best = float('inf')
+    for _ in range(repeat):
+        start_time = time.time()
+        fn()
+        best = min(best, time.time() - start_time)
+    return best
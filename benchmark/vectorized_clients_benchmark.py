@@ -0,0 +1,97 @@
+import argparse
+import copy
+import logging
+import time
+import types
+
+import numpy as np
+import torch
+from torch.utils import data
+
+import utils  # noqa: F401, puts the repository root on sys.path
+
+from fedml_api.model.cv.cnn import CNN_DropOut
+from fedml_api.model.linear.lr import LogisticRegression
+from fedml_api.standalone.fedavg.client import Client
+from fedml_api.standalone.fedavg.my_model_trainer_classification import MyModelTrainer
+from fedml_api.standalone.fedavg.vectorized_client_trainer import VectorizedClientTrainer
+from fedml_core.aggregation.flat_aggregation import weighted_average_state_dicts
+
+
+def add_args(parser):
+    parser.add_argument('--client_num_per_round', type=int, default=1000, help='synthetic FEMNIST-like clients')
+    parser.add_argument('--mean_sample_num', type=int, default=20, help='mean number of examples of a client')
+    parser.add_argument('--batch_size', type=int, default=10)
+    parser.add_argument('--epochs', type=int, default=1)
+    parser.add_argument('--vectorized_client_nums', type=str, default='16,64')
+    parser.add_argument('--gpu', type=int, default=-1, help='cuda device index, -1 for the cpu')
+    return parser.parse_args()
+
+
+def sequential_round(args, model_trainer, train_data_local_dict, train_data_local_num_dict, device):
+    """The client loop of FedAvgAPI.train."""
+    # get_model_params returns the live parameters, which the clients' training overwrites
+    w_global = copy.deepcopy(model_trainer.get_model_params())
+    client = Client(0, None, None, 0, args, device, model_trainer)
+    w_locals = []
+    for client_idx in range(args.client_num_per_round):
+        client.update_local_dataset(client_idx, train_data_local_dict[client_idx], None,
+                                    train_data_local_num_dict[client_idx])
+        w = client.train(copy.deepcopy(w_global))
+        w_locals.append((client.get_sample_number(), copy.deepcopy(w)))
+    return weighted_average_state_dicts(w_locals)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
+    args = add_args(argparse.ArgumentParser(description="vectorized-clients-benchmark"))
+    device = torch.device("cuda:%d" % args.gpu if args.gpu >= 0 else "cpu")
+    train_args = types.SimpleNamespace(client_num_in_total=args.client_num_per_round,
+                                       client_num_per_round=args.client_num_per_round,
+                                       client_optimizer="sgd", lr=0.03, wd=0, epochs=args.epochs)
+
+    rng = np.random.RandomState(0)
+    train_data_local_dict = {}
+    for client_idx in range(args.client_num_per_round):
+        sample_num = max(1, rng.poisson(args.mean_sample_num))
+        dataset = data.TensorDataset(torch.from_numpy(rng.rand(sample_num, 28, 28).astype(np.float32)),
+                                     torch.from_numpy(rng.randint(0, 62, sample_num)))
+        # no shuffling, so the sequential and vectorized updates see the same batches
+        train_data_local_dict[client_idx] = data.DataLoader(dataset, batch_size=args.batch_size, shuffle=False)
+    train_data_local_num_dict = {client_idx: len(dl.dataset) for client_idx, dl in train_data_local_dict.items()}
+    logging.info("one round of %d clients, %d examples, device %s" % (
+        args.client_num_per_round, sum(train_data_local_num_dict.values()), device))
+
+    torch.manual_seed(0)
+    for model_name, model in [("lr", LogisticRegression(28 * 28, 62)), ("cnn", CNN_DropOut(False))]:
+        if model_name == "lr":
+            model = torch.nn.Sequential(torch.nn.Flatten(), model)
+        model_trainer = MyModelTrainer(model)
+        w_global = copy.deepcopy(model_trainer.get_model_params())
+
+        # silences the per-epoch logging of the trainer
+        logging.disable(logging.INFO)
+        start_time = time.time()
+        w_sequential = sequential_round(train_args, copy.deepcopy(model_trainer), train_data_local_dict,
+                                        train_data_local_num_dict, device)
+        sequential = time.time() - start_time
+        logging.disable(logging.NOTSET)
+        logging.info("%s, sequential clients: %.2fs" % (model_name, sequential))
+
+        for vectorized_client_num in [int(k) for k in args.vectorized_client_nums.split(',')]:
+            trainer = VectorizedClientTrainer(vectorized_client_num, copy.deepcopy(model_trainer),
+                                              train_data_local_dict, train_data_local_num_dict, train_args, device)
+            client_indexes = list(range(args.client_num_per_round))
+            # the first call traces the vmapped gradient
+            trainer.train(0, client_indexes[:vectorized_client_num], w_global)
+            start_time = time.time()
+            w_vectorized = trainer.train(0, client_indexes, w_global)
+            cost = time.time() - start_time
+            # equal up to the dropout masks of the cnn
+            max_diff = max((w_vectorized[k] - w_sequential[k]).abs().max().item() for k in w_sequential)
+            logging.info("%s, %d vectorized clients: %.2fs, speedup %.1fx, largest difference of the averaged "
+                         "weights %.2e" % (model_name, vectorized_client_num, cost, sequential / cost, max_diff))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import argparse
+import copy
+import logging
+import types
+
+import torch
+from torch.utils import data
+
+from utils import time_it
+
+from fedml_api.model.cv.cnn import CNN_DropOut
+from fedml_api.model.cv.resnet import resnet56
+from fedml_api.model.linear.lr import LogisticRegression
+from fedml_api.standalone.fedavg.my_model_trainer_classification import MyModelTrainer
+from fedml_core.aggregation.flat_aggregation import FlatAggregator, weighted_average_state_dicts
+
+
+def add_args(parser):
+    parser.add_argument('--client_num', type=int, default=20, help='clients per measured round')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--gpu', type=int, default=-1, help='cuda device index, -1 for the cpu')
+    return parser.parse_args()
+
+
+def deepcopy_round(trainer, w_global, train_data, device, args, client_num):
+    """The weight handling of Client.train and FedAvgAPI.train before the resident model."""
+    w_locals = []
+    for _ in range(client_num):
+        trainer.set_model_params(copy.deepcopy(w_global))
+        if train_data is None:
+            trainer.model.to(device)
+        else:
+            trainer.train(train_data, device, args)
+        w = trainer.get_model_params()
+        w_locals.append((1, copy.deepcopy(w)))
+    return weighted_average_state_dicts(w_locals)
+
+
+def resident_round(trainer, aggregator, w_global, train_data, device, args, client_num):
+    for idx in range(client_num):
+        trainer.load_model_params(w_global, device)
+        if train_data is not None:
+            trainer.train(train_data, device, args)
+        aggregator.add(idx, trainer.snapshot_model_params(), 1)
+    return aggregator.aggregate()
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
+    args = add_args(argparse.ArgumentParser(description="weight-management-benchmark"))
+    device = torch.device("cuda:%d" % args.gpu if args.gpu >= 0 else "cpu")
+    train_args = types.SimpleNamespace(client_optimizer="sgd", lr=0.01, wd=0, epochs=1)
+
+    models = [("lr", torch.nn.Sequential(torch.nn.Flatten(), LogisticRegression(28 * 28, 62)), (1, 28, 28)),
+              ("cnn", CNN_DropOut(False), (28, 28)),
+              ("resnet56", resnet56(10), (3, 32, 32))]
+    for model_name, model, input_shape in models:
+        # one batch of 10 examples per client, so the training itself is as small as in cross-device simulations
+        dataset = data.TensorDataset(torch.rand((10,) + input_shape), torch.randint(0, 10, (10,)))
+        train_data = data.DataLoader(dataset, batch_size=10)
+        trainer = MyModelTrainer(model)
+        w_global = copy.deepcopy(trainer.get_model_params())
+        aggregator = FlatAggregator(args.client_num)
+        logging.disable(logging.INFO)
+        results = {}
+        for name, batches in [("weights only", None), ("with one training step", train_data)]:
+            before = time_it(lambda: deepcopy_round(trainer, w_global, batches, device, train_args, args.client_num),
+                             args.repeat)
+            after = time_it(lambda: resident_round(trainer, aggregator, w_global, batches, device, train_args,
+                                                   args.client_num), args.repeat)
+            results[name] = (before, after)
+        logging.disable(logging.NOTSET)
+        for name, (before, after) in results.items():
+            logging.info("%s, %s: %.2f ms per client with deepcopies, %.2f ms resident (%.1fx)" % (
+                model_name, name, before / args.client_num * 1000, after / args.client_num * 1000, before / after))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 import logging
+import math
 import os
 
 import h5py
@@ -6,6 +7,8 @@ import numpy as np
 import torch
 import torch.utils.data as data
 
+from ..lazy_client_dict import lazy_client_dicts
+
 #logging.basicConfig()
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -44,9 +47,9 @@ def get_dataloader(dataset, data_dir, train_bs, test_bs, client_idx=None):
 
     # load data in numpy format from h5 file
     train_x = np.vstack([train_h5[_EXAMPLE][client_id][_IMGAE][()] for client_id in train_ids])
-    train_y = np.vstack([train_h5[_EXAMPLE][client_id][_LABEL][()] for client_id in train_ids]).squeeze()
+    train_y = np.concatenate([train_h5[_EXAMPLE][client_id][_LABEL][()].reshape(-1) for client_id in train_ids])
     test_x = np.vstack([test_h5[_EXAMPLE][client_id][_IMGAE][()] for client_id in test_ids])
-    test_y = np.vstack([test_h5[_EXAMPLE][client_id][_LABEL][()] for client_id in test_ids]).squeeze()
+    test_y = np.concatenate([test_h5[_EXAMPLE][client_id][_LABEL][()].reshape(-1) for client_id in test_ids])
 
     # dataloader
     train_ds = data.TensorDataset(torch.tensor(train_x), torch.tensor(train_y, dtype=torch.long))
@@ -112,32 +115,22 @@ def load_partition_data_federated_emnist(dataset, data_dir, batch_size=DEFAULT_B
 
     # local dataset
     data_local_num_dict = dict()
-    train_data_local_dict = dict()
-    test_data_local_dict = dict()
-
-    for client_idx in range(DEFAULT_TRAIN_CLIENTS_NUM):
-        train_data_local, test_data_local = get_dataloader(dataset, data_dir, batch_size, batch_size, client_idx)
-        local_data_num = len(train_data_local) + len(test_data_local)
-        data_local_num_dict[client_idx] = local_data_num
-        # logging.info("client_idx = %d, local_sample_number = %d" % (client_idx, local_data_num))
-        # logging.info("client_idx = %d, batch_num_train_local = %d, batch_num_test_local = %d" % (
-        #     client_idx, len(train_data_local), len(test_data_local)))
-        train_data_local_dict[client_idx] = train_data_local
-        test_data_local_dict[client_idx] = test_data_local
+    with h5py.File(train_file_path, 'r') as train_h5, h5py.File(test_file_path, 'r') as test_h5:
+        train_examples, test_examples = train_h5[_EXAMPLE], test_h5[_EXAMPLE]
+        for client_idx in range(DEFAULT_TRAIN_CLIENTS_NUM):
+            # len(train_data_local) + len(test_data_local), from the h5 shapes without loading the client
+            train_num = train_examples[client_ids_train[client_idx]][_LABEL].shape[0]
+            test_num = test_examples[client_ids_test[client_idx]][_LABEL].shape[0]
+            data_local_num_dict[client_idx] = math.ceil(train_num / batch_size) + math.ceil(test_num / batch_size)
+
+    # the client DataLoaders are built on first access
+    train_data_local_dict, test_data_local_dict = lazy_client_dicts(
+        range(DEFAULT_TRAIN_CLIENTS_NUM),
+        lambda client_idx: get_dataloader(dataset, data_dir, batch_size, batch_size, client_idx))
 
     # global dataset
-    train_data_global = data.DataLoader(
-                data.ConcatDataset(
-                    list(dl.dataset for dl in list(train_data_local_dict.values()))
-                ),
-                batch_size=batch_size, shuffle=True)
+    train_data_global, test_data_global = get_dataloader(dataset, data_dir, batch_size, batch_size)
     train_data_num = len(train_data_global.dataset)
-    
-    test_data_global = data.DataLoader(
-                data.ConcatDataset(
-                    list(dl.dataset for dl in list(test_data_local_dict.values()) if dl is not None)
-                ),
-                batch_size=batch_size, shuffle=True)
     test_data_num = len(test_data_global.dataset)
     
     # class number
@@ -7,6 +7,12 @@ import torch.utils.data as data
 import torchvision.transforms as transforms
 from torch.utils.data.distributed import DistributedSampler
 
+try:
+    from fedml_core.non_iid_partition import noniid_partition
+except ImportError:
+    from FedML.fedml_core.non_iid_partition import noniid_partition
+
+from .. import partition_cache
 
 from .datasets import ImageNet
 from .datasets import ImageNet_truncated
@@ -66,36 +72,25 @@ def _data_transforms_ImageNet():
 
     return train_transform, valid_transform
 
-def partition_data(net_dataidx_map_origin, partition, n_nets, alpha):
+def partition_data(net_dataidx_map_origin, partition, n_nets, alpha, min_require_size=0):
     logging.info("*********partition data***************")
 
     if partition == "homo":
         total_num = net_dataidx_map_origin[len(net_dataidx_map_origin)-1][-1]
-        idxs = np.random.permutation(total_num)
-        batch_idxs = np.array_split(idxs, n_nets)
-        net_dataidx_map = {i: batch_idxs[i] for i in range(n_nets)}
+        net_dataidx_map = partition_cache.get_net_dataidx_map(
+            "ImageNet", partition, None, total_num, n_nets,
+            lambda rng: noniid_partition.homo_partition(total_num, n_nets, rng))
 
     elif partition == "hetero":
         K = len(net_dataidx_map_origin)
         N = net_dataidx_map_origin[len(net_dataidx_map_origin)-1][-1]
         logging.info("N = " + str(N))
-        net_dataidx_map = {}
-        idx_batch = [[] for _ in range(n_nets)]
-        # for each class in the dataset
-        for k in range(K):
-            (begin, end) = net_dataidx_map_origin[k]
-            idx_k = np.arange(begin,end)
-            np.random.shuffle(idx_k)
-            proportions = np.random.dirichlet(np.repeat(alpha, n_nets))
-            ## Balance
-            proportions = np.array([p * (len(idx_j) < N / n_nets) for p, idx_j in zip(proportions, idx_batch)])
-            proportions = proportions / proportions.sum()
-            proportions = (np.cumsum(proportions) * len(idx_k)).astype(int)[:-1]
-            idx_batch = [idx_j + idx.tolist() for idx_j, idx in zip(idx_batch, np.split(idx_k, proportions))]
-
-        for j in range(n_nets):
-            np.random.shuffle(idx_batch[j])
-            net_dataidx_map[j] = idx_batch[j]
+        # the samples of class k are the range net_dataidx_map_origin[k] = (begin, end)
+        class_idxs = [np.arange(*net_dataidx_map_origin[k]) for k in range(K)]
+        net_dataidx_map = partition_cache.get_net_dataidx_map(
+            "ImageNet", partition, alpha, N, n_nets,
+            lambda rng: noniid_partition.dirichlet_partition(class_idxs, N, n_nets, alpha,
+                                                             min_require_size=min_require_size, rng=rng))
 
     return net_dataidx_map
 
@@ -314,15 +309,10 @@ def get_client_idxes_dict(data_dir, partition_method, partition_alpha, client_nu
                                 train=False,
                                 classes=[]) #x for x in range(100)
 
-    min_size = 0
-
-    while min_size < 100:
-
-        net_dataidx_map = train_dataset_global.get_net_dataidx_map()
-
-        net_dataidx_map_new = partition_data(net_dataidx_map_origin=net_dataidx_map,partition=partition_method,n_nets=client_number,alpha=partition_alpha)
+    net_dataidx_map = train_dataset_global.get_net_dataidx_map()
 
-        min_size = min([len(idx_j) for idx_j in net_dataidx_map_new.values()])
+    # the hetero partition is resampled until every client has 100 samples
+    net_dataidx_map_new = partition_data(net_dataidx_map_origin=net_dataidx_map,partition=partition_method,n_nets=client_number,alpha=partition_alpha,min_require_size=100)
 
     class_num = len(net_dataidx_map)
     
@@ -10,7 +10,9 @@ import torch
 import torch.utils.data as data
 import torchvision.transforms as transforms
 
-from .datasets import Landmarks
+from . import shard_cache
+from ..lazy_client_dict import lazy_client_dicts
+from .datasets import Landmarks, LandmarksShards
 
 
 def _read_csv(path: str):
@@ -158,22 +160,36 @@ def get_mapping_per_user(fn):
 
 
 # for centralized training
-def get_dataloader(dataset, datadir, train_files, test_files, train_bs, test_bs, dataidxs=None):
-    return get_dataloader_Landmarks(datadir, train_files, test_files, train_bs, test_bs, dataidxs)
+def get_dataloader(dataset, datadir, train_files, test_files, train_bs, test_bs, dataidxs=None, shards=None):
+    return get_dataloader_Landmarks(datadir, train_files, test_files, train_bs, test_bs, dataidxs, shards)
 
 
 # for local devices
-def get_dataloader_test(dataset, datadir, train_files, test_files, train_bs, test_bs, dataidxs_train, dataidxs_test):
-    return get_dataloader_test_Landmarks(datadir, train_files, test_files, train_bs, test_bs, dataidxs_train, dataidxs_test)
+def get_dataloader_test(dataset, datadir, train_files, test_files, train_bs, test_bs, dataidxs_train, dataidxs_test,
+                        shards=None):
+    return get_dataloader_test_Landmarks(datadir, train_files, test_files, train_bs, test_bs, dataidxs_train, dataidxs_test,
+                                         shards)
 
 
-def get_dataloader_Landmarks(datadir, train_files, test_files, train_bs, test_bs, dataidxs=None):
-    dl_obj = Landmarks
-
+def _datasets(datadir, train_files, test_files, dataidxs_train, dataidxs_test, shards):
     transform_train, transform_test = _data_transforms_landmarks()
 
-    train_ds = dl_obj(datadir, train_files, dataidxs=dataidxs, train=True, transform=transform_train, download=True)
-    test_ds = dl_obj(datadir, test_files, dataidxs=None, train=False, transform=transform_test, download=True)
+    if shards is None:
+        train_ds = Landmarks(datadir, train_files, dataidxs=dataidxs_train, train=True, transform=transform_train,
+                             download=True)
+        test_ds = Landmarks(datadir, test_files, dataidxs=dataidxs_test, train=False, transform=transform_test,
+                            download=True)
+    else:
+        (train_images, train_labels), (test_images, test_labels) = shards
+        train_ds = LandmarksShards(train_images, train_labels, dataidxs=dataidxs_train, train=True,
+                                   transform=transform_train)
+        test_ds = LandmarksShards(test_images, test_labels, dataidxs=dataidxs_test, train=False,
+                                  transform=transform_test)
+    return train_ds, test_ds
+
+
+def get_dataloader_Landmarks(datadir, train_files, test_files, train_bs, test_bs, dataidxs=None, shards=None):
+    train_ds, test_ds = _datasets(datadir, train_files, test_files, dataidxs, None, shards)
 
     train_dl = data.DataLoader(dataset=train_ds, batch_size=train_bs, shuffle=True, drop_last=False)
     test_dl = data.DataLoader(dataset=test_ds, batch_size=test_bs, shuffle=False, drop_last=False)
@@ -181,13 +197,9 @@ def get_dataloader_Landmarks(datadir, train_files, test_files, train_bs, test_bs
     return train_dl, test_dl
 
 
-def get_dataloader_test_Landmarks(datadir, train_files, test_files, train_bs, test_bs, dataidxs_train=None, dataidxs_test=None):
-    dl_obj = Landmarks
-
-    transform_train, transform_test = _data_transforms_landmarks()
-
-    train_ds = dl_obj(datadir, train_files, dataidxs=dataidxs_train, train=True, transform=transform_train, download=True)
-    test_ds = dl_obj(datadir, test_files, dataidxs=dataidxs_test, train=False, transform=transform_test, download=True)
+def get_dataloader_test_Landmarks(datadir, train_files, test_files, train_bs, test_bs, dataidxs_train=None, dataidxs_test=None,
+                                  shards=None):
+    train_ds, test_ds = _datasets(datadir, train_files, test_files, dataidxs_train, dataidxs_test, shards)
 
     train_dl = data.DataLoader(dataset=train_ds, batch_size=train_bs, shuffle=True, drop_last=False)
     test_dl = data.DataLoader(dataset=test_ds, batch_size=test_bs, shuffle=False, drop_last=False)
@@ -196,40 +208,38 @@ def get_dataloader_test_Landmarks(datadir, train_files, test_files, train_bs, te
 
 
 def load_partition_data_landmarks(dataset, data_dir, fed_train_map_file, fed_test_map_file, 
-                            partition_method=None, partition_alpha=None, client_number=233, batch_size=10):
+                            partition_method=None, partition_alpha=None, client_number=233, batch_size=10,
+                            shard_dir=None, shard_image_size=256):
+    """
+    With a shard_dir, the images are decoded once into the memory-mapped shards of `shard_cache` and read from there.
+    """
 
     train_files, data_local_num_dict, net_dataidx_map = get_mapping_per_user(fed_train_map_file)
     test_files = _read_csv(fed_test_map_file)
 
+    shards = None
+    if shard_dir is not None:
+        shards = (shard_cache.load_shards(data_dir, train_files, shard_dir, fed_train_map_file, shard_image_size),
+                  shard_cache.load_shards(data_dir, test_files, shard_dir, fed_test_map_file, shard_image_size))
+
     class_num = len(np.unique([item['class'] for item in train_files]))
     # logging.info("traindata_cls_counts = " + str(traindata_cls_counts))
     train_data_num = len(train_files)
 
-    train_data_global, test_data_global = get_dataloader(dataset, data_dir, train_files, test_files, batch_size, batch_size)
+    train_data_global, test_data_global = get_dataloader(dataset, data_dir, train_files, test_files, batch_size, batch_size,
+                                                         shards=shards)
     # logging.info("train_dl_global number = " + str(len(train_data_global)))
     # logging.info("test_dl_global number = " + str(len(test_data_global)))
     test_data_num = len(test_files)
 
     # get local dataset
-    data_local_num_dict = data_local_num_dict
-    train_data_local_dict = dict()
-    test_data_local_dict = dict()
-
-
-    for client_idx in range(client_number):
-        dataidxs = net_dataidx_map[client_idx]
-        # local_data_num = len(dataidxs)
-        local_data_num = dataidxs[1] - dataidxs[0]
-        # data_local_num_dict[client_idx] = local_data_num
-        # logging.info("client_idx = %d, local_sample_number = %d" % (client_idx, local_data_num))
-
+    def get_client_dataloaders(client_idx):
         # training batch size = 64; algorithms batch size = 32
-        train_data_local, test_data_local = get_dataloader(dataset, data_dir, train_files, test_files, batch_size, batch_size,
-                                                 dataidxs)
-        # logging.info("client_idx = %d, batch_num_train_local = %d, batch_num_test_local = %d" % (
-        #     client_idx, len(train_data_local), len(test_data_local)))
-        train_data_local_dict[client_idx] = train_data_local
-        test_data_local_dict[client_idx] = test_data_local
+        return get_dataloader(dataset, data_dir, train_files, test_files, batch_size, batch_size,
+                              net_dataidx_map[client_idx], shards)
+
+    # the client DataLoaders are built on first access
+    train_data_local_dict, test_data_local_dict = lazy_client_dicts(range(client_number), get_client_dataloaders)
 
     # logging("data_local_num_dict: %s" % data_local_num_dict)
     return train_data_num, test_data_num, train_data_global, test_data_global, \
@@ -1,6 +1,7 @@
 import logging
 import os
 
+import numpy as np
 import torch.utils.data as data
 from PIL import Image
 from torchvision import transforms
@@ -62,3 +63,34 @@ class Landmarks(data.Dataset):
             label = self.target_transform(label)
 
         return image, label
+
+
+class LandmarksShards(data.Dataset):
+
+    def __init__(self, images, labels, dataidxs=None, train=True, transform=None, target_transform=None):
+        """
+        images, labels are the arrays of `shard_cache.load_shards`, in the order of allfiles of `Landmarks`
+        """
+        if dataidxs == None:
+            self.images, self.labels = images, labels
+        else:
+            self.images, self.labels = images[dataidxs[0]: dataidxs[1]], labels[dataidxs[0]: dataidxs[1]]
+        self.dataidxs = dataidxs
+        self.transform = transform
+        self.target_transform = target_transform
+
+    def __len__(self):
+        return len(self.labels)
+
+    def __getitem__(self, idx):
+        # the image is already decoded, the PIL image keeps the transforms of `Landmarks`
+        image = Image.fromarray(np.asarray(self.images[idx]))
+        label = int(self.labels[idx])
+
+        if self.transform:
+            image = self.transform(image)
+
+        if self.target_transform:
+            label = self.target_transform(label)
+
+        return image, label
@@ -0,0 +1,106 @@
+"""
+Decoded-image shard cache of the Landmarks datasets (gld23k, gld160k).
+
+`build_shards` decodes the images of a user mapping csv once, resizes their shorter side to `image_size`, center
+crops them to a square and writes
+
+    <shard_dir>/<csv name>_<image_size>_images.npy   uint8 (image_num, image_size, image_size, 3) RGB images
+    <shard_dir>/<csv name>_<image_size>_labels.npy   int64 (image_num,) classes
+
+in the order of the file list. For the train csv this is the order of `get_mapping_per_user`, so the images of each
+client are one contiguous range of the array, the (start, end) of `net_dataidx_map`. `load_shards` memory-maps the
+files, so the processes on one host share the pages and an epoch reads no JPEG. When several processes (e.g. the
+ranks of a distributed run) miss the cache together, the one that takes `<labels file>.lock` builds the shards and
+the others wait for its labels file.
+"""
+
+import logging
+import os
+import time
+import uuid
+from multiprocessing import Pool
+
+import numpy as np
+from PIL import Image
+
+
+def shard_paths(shard_dir, map_file, image_size):
+    name = "%s_%d" % (os.path.splitext(os.path.basename(map_file))[0], image_size)
+    return os.path.join(shard_dir, name + "_images.npy"), os.path.join(shard_dir, name + "_labels.npy")
+
+
+def decode_image(path, image_size):
+    """uint8 (image_size, image_size, 3) RGB array of the center square of the image, shorter side resized."""
+    with Image.open(path) as image:
+        image = image.convert('RGB')
+        width, height = image.size
+        scale = image_size / min(width, height)
+        width, height = max(image_size, round(width * scale)), max(image_size, round(height * scale))
+        image = image.resize((width, height), Image.BILINEAR)
+        left, top = (width - image_size) // 2, (height - image_size) // 2
+        return np.asarray(image.crop((left, top, left + image_size, top + image_size)), dtype=np.uint8)
+
+
+def _decode(args):
+    return decode_image(*args)
+
+
+def build_shards(data_dir, files, shard_dir, map_file, image_size=256, num_workers=8):
+    """Decode the images of `files` (rows of the mapping csv `map_file`) from `data_dir` into the shards."""
+    images_path, labels_path = shard_paths(shard_dir, map_file, image_size)
+    os.makedirs(shard_dir, exist_ok=True)
+    # write private temp files and rename them, so a reader never sees partial shards
+    tmp_path = images_path + ".tmp_" + uuid.uuid4().hex
+    images = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.uint8,
+                                       shape=(len(files), image_size, image_size, 3))
+    jobs = [(os.path.join(data_dir, str(row['image_id']) + ".jpg"), image_size) for row in files]
+    with Pool(max(1, num_workers)) as pool:
+        for idx, image in enumerate(pool.imap(_decode, jobs, chunksize=64)):
+            images[idx] = image
+    images.flush()
+    del images
+    os.replace(tmp_path, images_path)
+
+    # the labels file is written last and marks complete shards
+    tmp_path = labels_path + ".tmp_" + uuid.uuid4().hex
+    with open(tmp_path, 'wb') as f:
+        np.save(f, np.array([int(row['class']) for row in files], dtype=np.int64))
+    os.replace(tmp_path, labels_path)
+    logging.info("decoded %d landmarks images of %s into %s" % (len(files), map_file, shard_dir))
+
+
+def _build_shards_once(data_dir, files, shard_dir, map_file, image_size, wait_interval=5):
+    """Builds the shards in the one process that creates the lock file; the other callers wait for the labels."""
+    _, labels_path = shard_paths(shard_dir, map_file, image_size)
+    lock_path = labels_path + ".lock"
+    os.makedirs(shard_dir, exist_ok=True)
+    waited = 0
+    while not os.path.exists(labels_path):
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            if waited % 60 == 0:
+                logging.info("waiting for another process to decode %s into %s (remove %s if none is running)"
+                             % (map_file, shard_dir, lock_path))
+            time.sleep(wait_interval)
+            waited += wait_interval
+            continue
+        try:
+            # the previous holder of the lock may have finished in the meantime
+            if not os.path.exists(labels_path):
+                build_shards(data_dir, files, shard_dir, map_file, image_size)
+        finally:
+            os.close(fd)
+            os.remove(lock_path)
+
+
+def load_shards(data_dir, files, shard_dir, map_file, image_size=256):
+    """(images, labels) of the shards of `map_file`, memory-mapped read-only; builds them on the first call."""
+    images_path, labels_path = shard_paths(shard_dir, map_file, image_size)
+    if not os.path.exists(labels_path):
+        _build_shards_once(data_dir, files, shard_dir, map_file, image_size)
+    labels = np.load(labels_path)
+    if len(labels) != len(files):
+        raise ValueError("%s has %d images but %s lists %d, remove the stale shards"
+                         % (labels_path, len(labels), map_file, len(files)))
+    return np.load(images_path, mmap_mode='r'), labels
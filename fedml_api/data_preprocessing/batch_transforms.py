@@ -0,0 +1,131 @@
+"""
+Tensor-native image augmentation applied to whole mini-batches in the DataLoader collate_fn.
+
+The per-sample torchvision pipelines convert every image to PIL and back. Here a dataset only turns its image into a
+uint8 CHW tensor (`to_uint8_tensor`) and `BatchTransform`, used as the collate_fn, stacks the batch and runs the
+random crop / flip / normalization / cutout on the (N, C, H, W) tensor, with independent random parameters per image.
+The transforms run every time a batch is drawn, so the augmentation differs between epochs.
+"""
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+from torch.utils.data.dataloader import default_collate
+
+
+def to_uint8_tensor(img):
+    """Per-sample transform: HWC uint8 numpy array or PIL image to a CHW uint8 tensor."""
+    if isinstance(img, torch.Tensor):
+        return img
+    return torch.from_numpy(np.ascontiguousarray(np.asarray(img, dtype=np.uint8).transpose(2, 0, 1)))
+
+
+def _crop(imgs, top, left, height, width):
+    # gathers one (height, width) window per image, at its own (top, left) offset
+    rows = (top.unsqueeze(1) + torch.arange(height)).view(-1, 1, height, 1)
+    cols = (left.unsqueeze(1) + torch.arange(width)).view(-1, 1, 1, width)
+    batch = torch.arange(imgs.size(0)).view(-1, 1, 1, 1)
+    channels = torch.arange(imgs.size(1)).view(1, -1, 1, 1)
+    return imgs[batch, channels, rows, cols]
+
+
+class RandomCrop(object):
+    def __init__(self, size, padding=0):
+        self.size = (size, size) if isinstance(size, int) else tuple(size)
+        self.padding = padding
+
+    def __call__(self, imgs):
+        if self.padding > 0:
+            imgs = F.pad(imgs, (self.padding,) * 4)
+        height, width = self.size
+        top = torch.randint(0, imgs.size(2) - height + 1, (imgs.size(0),))
+        left = torch.randint(0, imgs.size(3) - width + 1, (imgs.size(0),))
+        return _crop(imgs, top, left, height, width)
+
+
+class CenterCrop(object):
+    def __init__(self, size):
+        self.size = (size, size) if isinstance(size, int) else tuple(size)
+
+    def __call__(self, imgs):
+        height, width = self.size
+        top = int(round((imgs.size(2) - height) / 2.0))
+        left = int(round((imgs.size(3) - width) / 2.0))
+        return imgs[:, :, top:top + height, left:left + width]
+
+
+class RandomHorizontalFlip(object):
+    def __init__(self, p=0.5):
+        self.p = p
+
+    def __call__(self, imgs):
+        flip = (torch.rand(imgs.size(0)) < self.p).view(-1, 1, 1, 1)
+        return torch.where(flip, imgs.flip(3), imgs)
+
+
+class ReverseChannels(object):
+    def __call__(self, imgs):
+        return imgs.flip(1)
+
+
+class ToFloat(object):
+    """uint8 [0, 255] to float32 [0, 1], like ToTensor."""
+
+    def __call__(self, imgs):
+        return imgs.float().div_(255.0)
+
+
+class Normalize(object):
+    def __init__(self, mean, std):
+        self.mean = torch.tensor(mean, dtype=torch.float32).view(1, -1, 1, 1)
+        self.std = torch.tensor(std, dtype=torch.float32).view(1, -1, 1, 1)
+
+    def __call__(self, imgs):
+        return (imgs - self.mean) / self.std
+
+
+class PerImageStandardization(object):
+    """Normalizes each image with the mean and std of all of its pixels and channels."""
+
+    def __call__(self, imgs):
+        flat = imgs.reshape(imgs.size(0), -1)
+        mean = flat.mean(dim=1).view(-1, 1, 1, 1)
+        std = flat.std(dim=1).view(-1, 1, 1, 1)
+        return (imgs - mean) / std
+
+
+class Cutout(object):
+    """Zeroes a length x length square (clipped at the border) around a random center of each image."""
+
+    def __init__(self, length):
+        self.length = length
+
+    def __call__(self, imgs):
+        n, _, h, w = imgs.shape
+        y = torch.randint(0, h, (n, 1))
+        x = torch.randint(0, w, (n, 1))
+        rows = torch.arange(h).unsqueeze(0)
+        cols = torch.arange(w).unsqueeze(0)
+        row_mask = (rows >= y - self.length // 2) & (rows < y + self.length // 2)
+        col_mask = (cols >= x - self.length // 2) & (cols < x + self.length // 2)
+        mask = row_mask.view(n, 1, h, 1) & col_mask.view(n, 1, 1, w)
+        return imgs.masked_fill(mask, 0.0)
+
+
+class BatchTransform(object):
+    """DataLoader collate_fn applying `transforms` to the stacked images of the batch. The dataset must return
+    uint8 CHW tensors, i.e. use `sample_transform` as its transform."""
+
+    sample_transform = staticmethod(to_uint8_tensor)
+
+    def __init__(self, transforms):
+        self.transforms = transforms
+
+    def apply(self, imgs):
+        for t in self.transforms:
+            imgs = t(imgs)
+        return imgs
+
+    def __call__(self, batch):
+        imgs, targets = default_collate(batch)
+        return self.apply(imgs), targets
@@ -5,6 +5,13 @@ import torch
 import torch.utils.data as data
 import torchvision.transforms as transforms
 
+try:
+    from fedml_core.non_iid_partition import noniid_partition
+except ImportError:
+    from FedML.fedml_core.non_iid_partition import noniid_partition
+
+from .. import batch_transforms, partition_cache
+from ..lazy_client_dict import lazy_client_dicts
 from .datasets import CIFAR10_truncated
 
 # logging.basicConfig()
@@ -77,10 +84,25 @@ class Cutout(object):
         return img
 
 
-def _data_transforms_cifar10():
+def _data_transforms_cifar10(batch=False):
     CIFAR_MEAN = [0.49139968, 0.48215827, 0.44653124]
     CIFAR_STD = [0.24703233, 0.24348505, 0.26158768]
 
+    if batch:
+        # uint8 images, augmented per batch in the DataLoader collate_fn
+        train_transform = batch_transforms.BatchTransform([
+            batch_transforms.RandomCrop(32, padding=4),
+            batch_transforms.RandomHorizontalFlip(),
+            batch_transforms.ToFloat(),
+            batch_transforms.Normalize(CIFAR_MEAN, CIFAR_STD),
+            batch_transforms.Cutout(16),
+        ])
+        valid_transform = batch_transforms.BatchTransform([
+            batch_transforms.ToFloat(),
+            batch_transforms.Normalize(CIFAR_MEAN, CIFAR_STD),
+        ])
+        return train_transform, valid_transform
+
     train_transform = transforms.Compose([
         transforms.ToPILImage(),
         transforms.RandomCrop(32, padding=4),
@@ -129,74 +151,26 @@ def partition_data(dataset, datadir, partition, n_nets, alpha):
     # n_test = X_test.shape[0]
 
     if partition == "homo":
-        total_num = n_train
-        idxs = np.random.permutation(total_num)
-        batch_idxs = np.array_split(idxs, n_nets)
-        net_dataidx_map = {i: batch_idxs[i] for i in range(n_nets)}
+        net_dataidx_map = partition_cache.get_net_dataidx_map(
+            "cifar10", partition, None, n_train, n_nets,
+            lambda rng: noniid_partition.homo_partition(n_train, n_nets, rng))
 
     elif partition == "hetero":
-        min_size = 0
         K = 10
         N = y_train.shape[0]
         logging.info("N = " + str(N))
-        net_dataidx_map = {}
-
-        while min_size < 64:
-            idx_batch = [[] for _ in range(n_nets)]
-            # for each class in the dataset
-            for k in range(K):
-                idx_k = np.where(y_train == k)[0]
-                np.random.shuffle(idx_k)
-                proportions = np.random.dirichlet(np.repeat(alpha, n_nets))
-                # Balance
-                proportions = np.array(
-                    [p * (len(idx_j) < N / n_nets) for p, idx_j in zip(proportions, idx_batch)])
-                proportions = proportions / proportions.sum()
-                proportions = (np.cumsum(proportions) *
-                               len(idx_k)).astype(int)[:-1]
-                idx_batch = [idx_j + idx.tolist() for idx_j,
-                             idx in zip(idx_batch, np.split(idx_k, proportions))]
-                min_size = min([len(idx_j) for idx_j in idx_batch])
-
-        for j in range(n_nets):
-            np.random.shuffle(idx_batch[j])
-            net_dataidx_map[j] = idx_batch[j]
+        net_dataidx_map = partition_cache.get_net_dataidx_map(
+            "cifar10", partition, alpha, N, n_nets,
+            lambda rng: noniid_partition.dirichlet_partition(noniid_partition.class_indices(y_train, K), N, n_nets,
+                                                             alpha, min_require_size=64, rng=rng))
 
     elif "label" in partition:
         num = eval(partition[5:])
         K = 10
-        if num == 10:
-            net_dataidx_map = {i: np.ndarray(
-                0, dtype=np.int64) for i in range(n_nets)}
-            for i in range(10):
-                idx_k = np.where(y_train == i)[0]
-                np.random.shuffle(idx_k)
-                split = np.array_split(idx_k, n_nets)
-                for j in range(n_nets):
-                    net_dataidx_map[j] = np.append(
-                        net_dataidx_map[j], split[j])
-        else:
-            net_dataidx_map = {i: np.ndarray(
-                0, dtype=np.int64) for i in range(n_nets)}
-            classes_nets = []
-            classes_count = [0]*K
-            for i in range(n_nets):
-                temp = np.random.choice(K, size=num, replace=False, p=None)
-                for j in temp:
-                    classes_count[j] += 1
-                classes_nets.append(temp)
-            for index, clss_partition in enumerate(classes_count):
-                if clss_partition == 0:
-                    continue
-                idx_k = np.where(y_train == index)[0]
-                np.random.shuffle(idx_k)
-                split = np.array_split(idx_k, clss_partition)
-                index_in = 0
-                for net_idx in range(n_nets):
-                    if index in classes_nets[net_idx]:
-                        net_dataidx_map[net_idx] = np.append(
-                            net_dataidx_map[net_idx], split[index_in])
-                        index_in += 1
+        net_dataidx_map = partition_cache.get_net_dataidx_map(
+            "cifar10", partition, None, n_train, n_nets,
+            lambda rng: noniid_partition.label_k_partition(noniid_partition.class_indices(y_train, K), n_nets, num,
+                                                           rng))
     elif partition == "hetero-fix":
         dataidx_map_file_path = './data_preprocessing/non-iid-distribution/CIFAR10/net_dataidx_map.txt'
         net_dataidx_map = read_net_dataidx_map(dataidx_map_file_path)
@@ -211,8 +185,8 @@ def partition_data(dataset, datadir, partition, n_nets, alpha):
 
 
 # for centralized training
-def get_dataloader(dataset, datadir, train_bs, test_bs, dataidxs=None):
-    return get_dataloader_CIFAR10(datadir, train_bs, test_bs, dataidxs)
+def get_dataloader(dataset, datadir, train_bs, test_bs, dataidxs=None, batch_transform=False):
+    return get_dataloader_CIFAR10(datadir, train_bs, test_bs, dataidxs, batch_transform)
 
 
 # for local devices
@@ -220,10 +194,15 @@ def get_dataloader_test(dataset, datadir, train_bs, test_bs, dataidxs_train, dat
     return get_dataloader_test_CIFAR10(datadir, train_bs, test_bs, dataidxs_train, dataidxs_test)
 
 
-def get_dataloader_CIFAR10(datadir, train_bs, test_bs, dataidxs=None):
+def get_dataloader_CIFAR10(datadir, train_bs, test_bs, dataidxs=None, batch_transform=False):
     dl_obj = CIFAR10_truncated
 
-    transform_train, transform_test = _data_transforms_cifar10()
+    transform_train, transform_test = _data_transforms_cifar10(batch=batch_transform)
+    train_collate = test_collate = None
+    if batch_transform:
+        # the datasets only convert the images to uint8 tensors, the augmentation runs in the collate_fn
+        train_collate, test_collate = transform_train, transform_test
+        transform_train = transform_test = batch_transforms.to_uint8_tensor
 
     train_ds = dl_obj(datadir, dataidxs=dataidxs, train=True,
                       transform=transform_train, download=False)
@@ -231,9 +210,9 @@ def get_dataloader_CIFAR10(datadir, train_bs, test_bs, dataidxs=None):
                      transform=transform_test, download=False)
 
     train_dl = data.DataLoader(
-        dataset=train_ds, batch_size=train_bs, shuffle=True, drop_last=True)
+        dataset=train_ds, batch_size=train_bs, shuffle=True, drop_last=True, collate_fn=train_collate)
     test_dl = data.DataLoader(
-        dataset=test_ds, batch_size=test_bs, shuffle=False, drop_last=True)
+        dataset=test_ds, batch_size=test_bs, shuffle=False, drop_last=True, collate_fn=test_collate)
 
     return train_dl, test_dl
 
@@ -257,7 +236,7 @@ def get_dataloader_test_CIFAR10(datadir, train_bs, test_bs, dataidxs_train=None,
 
 
 def load_partition_data_distributed_cifar10(process_id, dataset, data_dir, partition_method, partition_alpha,
-                                            client_number, batch_size):
+                                            client_number, batch_size, batch_transform=False):
     X_train, y_train, X_test, y_test, net_dataidx_map, traindata_cls_counts = partition_data(dataset,
                                                                                              data_dir,
                                                                                              partition_method,
@@ -271,7 +250,7 @@ def load_partition_data_distributed_cifar10(process_id, dataset, data_dir, parti
     # get global test data
     if process_id == 0:
         train_data_global, test_data_global = get_dataloader(
-            dataset, data_dir, batch_size, batch_size)
+            dataset, data_dir, batch_size, batch_size, batch_transform=batch_transform)
         logging.info("train_dl_global number = " + str(len(train_data_global)))
         logging.info("test_dl_global number = " + str(len(test_data_global)))
         train_data_local = None
@@ -285,7 +264,7 @@ def load_partition_data_distributed_cifar10(process_id, dataset, data_dir, parti
                      (process_id, local_data_num))
         # training batch size = 64; algorithms batch size = 32
         train_data_local, test_data_local = get_dataloader(dataset, data_dir, batch_size, batch_size,
-                                                           dataidxs)
+                                                           dataidxs, batch_transform=batch_transform)
         logging.info("process_id = %d, batch_num_train_local = %d, batch_num_test_local = %d" % (
             process_id, len(train_data_local), len(test_data_local)))
         train_data_global = None
@@ -293,7 +272,7 @@ def load_partition_data_distributed_cifar10(process_id, dataset, data_dir, parti
     return train_data_num, train_data_global, test_data_global, local_data_num, train_data_local, test_data_local, class_num
 
 
-def load_partition_data_cifar10(dataset, data_dir, partition_method, partition_alpha, client_number, batch_size, silo_proc_num=0):
+def load_partition_data_cifar10(dataset, data_dir, partition_method, partition_alpha, client_number, batch_size, silo_proc_num=0, batch_transform=False):
     X_train, y_train, X_test, y_test, net_dataidx_map, traindata_cls_counts = partition_data(dataset,
                                                                                              data_dir,
                                                                                              partition_method,
@@ -305,30 +284,29 @@ def load_partition_data_cifar10(dataset, data_dir, partition_method, partition_a
                          for r in range(client_number)])
 
     train_data_global, test_data_global = get_dataloader(
-        dataset, data_dir, batch_size, batch_size)
+        dataset, data_dir, batch_size, batch_size, batch_transform=batch_transform)
     logging.info("train_dl_global number = " + str(len(train_data_global)))
     logging.info("test_dl_global number = " + str(len(test_data_global)))
     test_data_num = len(test_data_global)
 
     # get local dataset
     data_local_num_dict = dict()
-    train_data_local_dict = dict()
-    test_data_local_dict = dict()
-
     for client_idx in range(client_number):
-        dataidxs = net_dataidx_map[client_idx]
-        local_data_num = len(dataidxs)
+        local_data_num = len(net_dataidx_map[client_idx])
         data_local_num_dict[client_idx] = local_data_num
         logging.info("client_idx = %d, local_sample_number = %d" %
                      (client_idx, local_data_num))
 
+    def get_client_dataloaders(client_idx):
         # training batch size = 64; algorithms batch size = 32
         train_data_local, test_data_local = get_dataloader(dataset, data_dir, batch_size, batch_size,
-                                                           dataidxs)
+                                                           net_dataidx_map[client_idx], batch_transform=batch_transform)
         logging.info("client_idx = %d, batch_num_train_local = %d, batch_num_test_local = %d" % (
             client_idx, len(train_data_local), len(test_data_local)))
-        train_data_local_dict[client_idx] = train_data_local
-        test_data_local_dict[client_idx] = test_data_local
+        return train_data_local, test_data_local
+
+    # the client DataLoaders are built on first access
+    train_data_local_dict, test_data_local_dict = lazy_client_dicts(range(client_number), get_client_dataloaders)
     return train_data_num, test_data_num, train_data_global, test_data_global, \
         data_local_num_dict, train_data_local_dict, test_data_local_dict, class_num
 
@@ -5,6 +5,12 @@ import torch
 import torch.utils.data as data
 import torchvision.transforms as transforms
 
+try:
+    from fedml_core.non_iid_partition import noniid_partition
+except ImportError:
+    from FedML.fedml_core.non_iid_partition import noniid_partition
+
+from .. import batch_transforms, partition_cache
 from .datasets import CIFAR100_truncated
 
 #logging.basicConfig()
@@ -76,7 +82,7 @@ class Cutout(object):
         return img
 
 
-def _data_transforms_cifar100():
+def _data_transforms_cifar100(batch=False):
     CIFAR_MEAN = [0.5071, 0.4865, 0.4409]
     CIFAR_STD = [0.2673, 0.2564, 0.2762]
 
@@ -89,6 +95,21 @@ def _data_transforms_cifar100():
 
     """
 
+    if batch:
+        # uint8 images, augmented per batch in the DataLoader collate_fn
+        train_transform = batch_transforms.BatchTransform([
+            batch_transforms.RandomCrop(32, padding=4),
+            batch_transforms.RandomHorizontalFlip(),
+            batch_transforms.ToFloat(),
+            batch_transforms.Normalize(CIFAR_MEAN, CIFAR_STD),
+            batch_transforms.Cutout(16),
+        ])
+        valid_transform = batch_transforms.BatchTransform([
+            batch_transforms.ToFloat(),
+            batch_transforms.Normalize(CIFAR_MEAN, CIFAR_STD),
+        ])
+        return train_transform, valid_transform
+
     train_transform = transforms.Compose([
         transforms.ToPILImage(),
         transforms.RandomCrop(32, padding=4),
@@ -125,36 +146,18 @@ def partition_data(dataset, datadir, partition, n_nets, alpha):
     # n_test = X_test.shape[0]
 
     if partition == "homo":
-        total_num = n_train
-        idxs = np.random.permutation(total_num)
-        batch_idxs = np.array_split(idxs, n_nets)
-        net_dataidx_map = {i: batch_idxs[i] for i in range(n_nets)}
+        net_dataidx_map = partition_cache.get_net_dataidx_map(
+            "cifar100", partition, None, n_train, n_nets,
+            lambda rng: noniid_partition.homo_partition(n_train, n_nets, rng))
 
     elif partition == "hetero":
-        min_size = 0
         K = 100
         N = y_train.shape[0]
         logging.info("N = " + str(N))
-        net_dataidx_map = {}
-
-        while min_size < 64 :
-            idx_batch = [[] for _ in range(n_nets)]
-            # for each class in the dataset
-            for k in range(K):
-                idx_k = np.where(y_train == k)[0]
-                np.random.shuffle(idx_k)
-                proportions = np.random.dirichlet(np.repeat(alpha, n_nets))
-                ## Balance
-                proportions = np.array([p * (len(idx_j) < N / n_nets) for p, idx_j in zip(proportions, idx_batch)])
-                proportions = proportions / proportions.sum()
-                proportions = (np.cumsum(proportions) * len(idx_k)).astype(int)[:-1]
-                idx_batch = [idx_j + idx.tolist() for idx_j, idx in zip(idx_batch, np.split(idx_k, proportions))]
-                min_size = min([len(idx_j) for idx_j in idx_batch])
-
-        for j in range(n_nets):
-            np.random.shuffle(idx_batch[j])
-            net_dataidx_map[j] = idx_batch[j]
-
+        net_dataidx_map = partition_cache.get_net_dataidx_map(
+            "cifar100", partition, alpha, N, n_nets,
+            lambda rng: noniid_partition.dirichlet_partition(noniid_partition.class_indices(y_train, K), N, n_nets,
+                                                             alpha, min_require_size=64, rng=rng))
     elif partition == "hetero-fix":
         dataidx_map_file_path = './data_preprocessing/non-iid-distribution/CIFAR100/net_dataidx_map.txt'
         net_dataidx_map = read_net_dataidx_map(dataidx_map_file_path)
@@ -169,8 +172,8 @@ def partition_data(dataset, datadir, partition, n_nets, alpha):
 
 
 # for centralized training
-def get_dataloader(dataset, datadir, train_bs, test_bs, dataidxs=None):
-    return get_dataloader_CIFAR100(datadir, train_bs, test_bs, dataidxs)
+def get_dataloader(dataset, datadir, train_bs, test_bs, dataidxs=None, batch_transform=False):
+    return get_dataloader_CIFAR100(datadir, train_bs, test_bs, dataidxs, batch_transform)
 
 
 # for local devices
@@ -178,16 +181,21 @@ def get_dataloader_test(dataset, datadir, train_bs, test_bs, dataidxs_train, dat
     return get_dataloader_test_CIFAR100(datadir, train_bs, test_bs, dataidxs_train, dataidxs_test)
 
 
-def get_dataloader_CIFAR100(datadir, train_bs, test_bs, dataidxs=None):
+def get_dataloader_CIFAR100(datadir, train_bs, test_bs, dataidxs=None, batch_transform=False):
     dl_obj = CIFAR100_truncated
 
-    transform_train, transform_test = _data_transforms_cifar100()
+    transform_train, transform_test = _data_transforms_cifar100(batch=batch_transform)
+    train_collate = test_collate = None
+    if batch_transform:
+        # the datasets only convert the images to uint8 tensors, the augmentation runs in the collate_fn
+        train_collate, test_collate = transform_train, transform_test
+        transform_train = transform_test = batch_transforms.to_uint8_tensor
 
     train_ds = dl_obj(datadir, dataidxs=dataidxs, train=True, transform=transform_train, download=False)
     test_ds = dl_obj(datadir, train=False, transform=transform_test, download=False)
 
-    train_dl = data.DataLoader(dataset=train_ds, batch_size=train_bs, shuffle=True, drop_last=True)
-    test_dl = data.DataLoader(dataset=test_ds, batch_size=test_bs, shuffle=False, drop_last=True)
+    train_dl = data.DataLoader(dataset=train_ds, batch_size=train_bs, shuffle=True, drop_last=True, collate_fn=train_collate)
+    test_dl = data.DataLoader(dataset=test_ds, batch_size=test_bs, shuffle=False, drop_last=True, collate_fn=test_collate)
 
     return train_dl, test_dl
 
@@ -207,7 +215,7 @@ def get_dataloader_test_CIFAR100(datadir, train_bs, test_bs, dataidxs_train=None
 
 
 def load_partition_data_distributed_cifar100(process_id, dataset, data_dir, partition_method, partition_alpha,
-                                            client_number, batch_size):
+                                            client_number, batch_size, batch_transform=False):
     X_train, y_train, X_test, y_test, net_dataidx_map, traindata_cls_counts = partition_data(dataset,
                                                                                              data_dir,
                                                                                              partition_method,
@@ -219,7 +227,7 @@ def load_partition_data_distributed_cifar100(process_id, dataset, data_dir, part
 
     # get global test data
     if process_id == 0:
-        train_data_global, test_data_global = get_dataloader(dataset, data_dir, batch_size, batch_size)
+        train_data_global, test_data_global = get_dataloader(dataset, data_dir, batch_size, batch_size, batch_transform=batch_transform)
         logging.info("train_dl_global number = " + str(len(train_data_global)))
         logging.info("test_dl_global number = " + str(len(train_data_global)))
         train_data_local = None
@@ -232,7 +240,7 @@ def load_partition_data_distributed_cifar100(process_id, dataset, data_dir, part
         logging.info("rank = %d, local_sample_number = %d" % (process_id, local_data_num))
         # training batch size = 64; algorithms batch size = 32
         train_data_local, test_data_local = get_dataloader(dataset, data_dir, batch_size, batch_size,
-                                                 dataidxs)
+                                                 dataidxs, batch_transform=batch_transform)
         logging.info("process_id = %d, batch_num_train_local = %d, batch_num_test_local = %d" % (
             process_id, len(train_data_local), len(test_data_local)))
         train_data_global = None
@@ -241,7 +249,7 @@ def load_partition_data_distributed_cifar100(process_id, dataset, data_dir, part
     return train_data_num, train_data_global, test_data_global, local_data_num, train_data_local, test_data_local, class_num
 
 
-def load_partition_data_cifar100(dataset, data_dir, partition_method, partition_alpha, client_number, batch_size):
+def load_partition_data_cifar100(dataset, data_dir, partition_method, partition_alpha, client_number, batch_size, batch_transform=False):
     X_train, y_train, X_test, y_test, net_dataidx_map, traindata_cls_counts = partition_data(dataset,
                                                                                              data_dir,
                                                                                              partition_method,
@@ -251,7 +259,7 @@ def load_partition_data_cifar100(dataset, data_dir, partition_method, partition_
     logging.info("traindata_cls_counts = " + str(traindata_cls_counts))
     train_data_num = sum([len(net_dataidx_map[r]) for r in range(client_number)])
 
-    train_data_global, test_data_global = get_dataloader(dataset, data_dir, batch_size, batch_size)
+    train_data_global, test_data_global = get_dataloader(dataset, data_dir, batch_size, batch_size, batch_transform=batch_transform)
     logging.info("train_dl_global number = " + str(len(train_data_global)))
     logging.info("test_dl_global number = " + str(len(train_data_global)))
     test_data_num = len(test_data_global)
@@ -269,7 +277,7 @@ def load_partition_data_cifar100(dataset, data_dir, partition_method, partition_
 
         # training batch size = 64; algorithms batch size = 32
         train_data_local, test_data_local = get_dataloader(dataset, data_dir, batch_size, batch_size,
-                                                 dataidxs)
+                                                 dataidxs, batch_transform=batch_transform)
         logging.info("client_idx = %d, batch_num_train_local = %d, batch_num_test_local = %d" % (
             client_idx, len(train_data_local), len(test_data_local)))
         train_data_local_dict[client_idx] = train_data_local
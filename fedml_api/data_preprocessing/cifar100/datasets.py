@@ -5,6 +5,8 @@ import torch.utils.data as data
 from PIL import Image
 from torchvision.datasets import CIFAR100
 
+from .. import dataset_store
+
 #logging.basicConfig()
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -50,25 +52,23 @@ class CIFAR100_truncated(data.Dataset):
         self.data, self.target = self.__build_truncated_dataset__()
 
     def __build_truncated_dataset__(self):
-
-        cifar_dataobj = CIFAR100(self.root, self.train, self.transform, self.target_transform, self.download)
-
-        if self.train:
-            # print("train member of the class: {}".format(self.train))
-            # data = cifar_dataobj.train_data
-            data = cifar_dataobj.data
-            target = np.array(cifar_dataobj.targets)
-        else:
-            data = cifar_dataobj.data
-            target = np.array(cifar_dataobj.targets)
-
+        # the base arrays are loaded once per process and shared by every client; a client only keeps its dataidxs
+        data, target = dataset_store.get_arrays("cifar100", self.root, self.train, self.__load_base_arrays__)
         if self.dataidxs is not None:
-            data = data[self.dataidxs]
-            target = target[self.dataidxs]
-
+            self.dataidxs = np.asarray(self.dataidxs, dtype=np.int64)
         return data, target
 
+    def __load_base_arrays__(self):
+        cifar_dataobj = CIFAR100(self.root, self.train, self.transform, self.target_transform, self.download)
+        return cifar_dataobj.data, np.array(cifar_dataobj.targets)
+
     def truncate_channel(self, index):
+        # copy the samples out of the shared base arrays before modifying them
+        if self.dataidxs is not None:
+            self.data, self.target = self.data[self.dataidxs], self.target[self.dataidxs]
+            self.dataidxs = None
+        else:
+            self.data = self.data.copy()
         for i in range(index.shape[0]):
             gs_index = index[i]
             self.data[gs_index, :, :, 1] = 0.0
@@ -82,6 +82,8 @@ class CIFAR100_truncated(data.Dataset):
         Returns:
             tuple: (image, target) where target is index of the target class.
         """
+        if self.dataidxs is not None:
+            index = self.dataidxs[index]
         img, target = self.data[index], self.target[index]
 
         if self.transform is not None:
@@ -93,4 +95,6 @@ class CIFAR100_truncated(data.Dataset):
         return img, target
 
     def __len__(self):
+        if self.dataidxs is not None:
+            return len(self.dataidxs)
         return len(self.data)
\ No newline at end of file
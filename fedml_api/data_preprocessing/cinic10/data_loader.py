@@ -8,6 +8,12 @@ import torch.nn.functional as F
 import torch.utils.data as data
 import torchvision.transforms as transforms
 
+try:
+    from fedml_core.non_iid_partition import noniid_partition
+except ImportError:
+    from FedML.fedml_core.non_iid_partition import noniid_partition
+
+from .. import batch_transforms, partition_cache
 from .datasets import ImageFolderTruncated, ImageFolderLMDB
 
 # logging.basicConfig()
@@ -80,7 +86,7 @@ class Cutout(object):
         return img
 
 
-def _data_transforms_cinic10(lmdb=False):
+def _data_transforms_cinic10(lmdb=False, batch=False):
 
     # cinic_mean = [0.47889522, 0.47227842, 0.43047404]
     # cinic_std = [0.24205776, 0.23828046, 0.25874835]
@@ -97,13 +103,30 @@ def _data_transforms_cinic10(lmdb=False):
     #     transforms.ToTensor(),
     #     transforms.Normalize(mean=cinic_mean, std=cinic_std)
     # ])
+    cinic_mean = [0.47889522, 0.47227842, 0.43047404]
+    cinic_std = [0.24205776, 0.23828046, 0.25874835]
+    if batch:
+        # uint8 images, augmented per batch in the DataLoader collate_fn
+        train_transform = batch_transforms.BatchTransform([
+            batch_transforms.RandomCrop(32),
+            batch_transforms.RandomHorizontalFlip(),
+            batch_transforms.ToFloat(),
+            batch_transforms.Normalize(cinic_mean, cinic_std),
+        ])
+        valid_transform = batch_transforms.BatchTransform([
+            batch_transforms.ReverseChannels(),
+            batch_transforms.RandomCrop(32),
+            batch_transforms.RandomHorizontalFlip(),
+            batch_transforms.ToFloat(),
+            batch_transforms.Normalize(cinic_mean, cinic_std),
+        ])
+        return train_transform, valid_transform
+
     if lmdb:
         temp = []
     else:
         temp = [transforms.ToTensor()]
 
-    cinic_mean = [0.47889522, 0.47227842, 0.43047404]
-    cinic_std = [0.24205776, 0.23828046, 0.25874835]
     # Transformer for train set: random crops and horizontal flip
     train_transform = transforms.Compose(temp+[
         # transforms.Lambda(lambda x:
@@ -145,7 +168,7 @@ def load_cinic10_data(datadir, lmdb=False):
     cinic_std = [0.24205776, 0.23828046, 0.25874835]
 
     if lmdb:
-        trainset = ImageFolderLMDB(_train_dir, transform=transforms.Compose([transforms.ToTensor(),
+        trainset = ImageFolderLMDB(_train_dir, transform=transforms.Compose([transforms.ConvertImageDtype(torch.float),
                                                                              transforms.Lambda(
             lambda x: F.pad(x.unsqueeze(0),
                             (4, 4, 4, 4),
@@ -158,7 +181,7 @@ def load_cinic10_data(datadir, lmdb=False):
             transforms.Normalize(mean=cinic_mean,
                                  std=cinic_std),
         ]))
-        testset = ImageFolderLMDB(_test_dir, transform=transforms.Compose([transforms.ToTensor(),
+        testset = ImageFolderLMDB(_test_dir, transform=transforms.Compose([transforms.ConvertImageDtype(torch.float),
                                                                            transforms.Lambda(
             lambda x: F.pad(x.unsqueeze(0),
                             (4, 4, 4, 4),
@@ -218,75 +241,26 @@ def partition_data(dataset, datadir, partition, n_nets, alpha, lmdb):
     # n_test = len(X_test)
 
     if partition == "homo":
-        total_num = n_train
-        idxs = np.random.permutation(total_num)
-        batch_idxs = np.array_split(idxs, n_nets)
-        net_dataidx_map = {i: batch_idxs[i] for i in range(n_nets)}
+        net_dataidx_map = partition_cache.get_net_dataidx_map(
+            "cinic10", partition, None, n_train, n_nets,
+            lambda rng: noniid_partition.homo_partition(n_train, n_nets, rng))
 
     elif partition == "hetero":
-        min_size = 0
         K = 10
         N = y_train.shape[0]
         logging.info("N = " + str(N))
-        net_dataidx_map = {}
-
-        while min_size < 64:
-            print(min_size)
-            idx_batch = [[] for _ in range(n_nets)]
-            # for each class in the dataset
-            for k in range(K):
-                idx_k = np.where(y_train == k)[0]
-                np.random.shuffle(idx_k)
-                proportions = np.random.dirichlet(np.repeat(alpha, n_nets))
-                # Balance
-                proportions = np.array([p * (len(idx_j) < N / n_nets)
-                                       for p, idx_j in zip(proportions, idx_batch)])
-                proportions = proportions / proportions.sum()
-                proportions = (np.cumsum(proportions) *
-                               len(idx_k)).astype(int)[: -1]
-                idx_batch = [idx_j + idx.tolist() for idx_j,
-                             idx in zip(idx_batch, np.split(idx_k, proportions))]
-                min_size = min([len(idx_j) for idx_j in idx_batch])
-
-        for j in range(n_nets):
-            np.random.shuffle(idx_batch[j])
-            net_dataidx_map[j] = idx_batch[j]
+        net_dataidx_map = partition_cache.get_net_dataidx_map(
+            "cinic10", partition, alpha, N, n_nets,
+            lambda rng: noniid_partition.dirichlet_partition(noniid_partition.class_indices(y_train, K), N, n_nets,
+                                                             alpha, min_require_size=64, rng=rng))
 
     elif "label" in partition:
         num = eval(partition[5:])
         K = 10
-        if num == 10:
-            net_dataidx_map = {i: np.ndarray(
-                0, dtype=np.int64) for i in range(n_nets)}
-            for i in range(10):
-                idx_k = np.where(y_train == i)[0]
-                np.random.shuffle(idx_k)
-                split = np.array_split(idx_k, n_nets)
-                for j in range(n_nets):
-                    net_dataidx_map[j] = np.append(
-                        net_dataidx_map[j], split[j])
-        else:
-            net_dataidx_map = {i: np.ndarray(
-                0, dtype=np.int64) for i in range(n_nets)}
-            classes_nets = []
-            classes_count = [0]*K
-            for i in range(n_nets):
-                temp = np.random.choice(K, size=num, replace=False, p=None)
-                for j in temp:
-                    classes_count[j] += 1
-                classes_nets.append(temp)
-            for index, clss_partition in enumerate(classes_count):
-                if clss_partition == 0:
-                    continue
-                idx_k = np.where(y_train == index)[0]
-                np.random.shuffle(idx_k)
-                split = np.array_split(idx_k, clss_partition)
-                index_in = 0
-                for net_idx in range(n_nets):
-                    if index in classes_nets[net_idx]:
-                        net_dataidx_map[net_idx] = np.append(
-                            net_dataidx_map[net_idx], split[index_in])
-                        index_in += 1
+        net_dataidx_map = partition_cache.get_net_dataidx_map(
+            "cinic10", partition, None, n_train, n_nets,
+            lambda rng: noniid_partition.label_k_partition(noniid_partition.class_indices(y_train, K), n_nets, num,
+                                                           rng))
     elif partition == "hetero-fix":
         dataidx_map_file_path = './data_preprocessing/non-iid-distribution/CINIC10/net_dataidx_map.txt'
         net_dataidx_map = read_net_dataidx_map(dataidx_map_file_path)
@@ -301,8 +275,8 @@ def partition_data(dataset, datadir, partition, n_nets, alpha, lmdb):
 
 
 # for centralized training
-def get_dataloader(dataset, datadir, train_bs, test_bs, dataidxs=None, lmdb=False):
-    return get_dataloader_cinic10(datadir, train_bs, test_bs, dataidxs, lmdb=lmdb)
+def get_dataloader(dataset, datadir, train_bs, test_bs, dataidxs=None, lmdb=False, batch_transform=False):
+    return get_dataloader_cinic10(datadir, train_bs, test_bs, dataidxs, lmdb=lmdb, batch_transform=batch_transform)
 
 
 # for local devices
@@ -310,13 +284,18 @@ def get_dataloader_test(dataset, datadir, train_bs, test_bs, dataidxs_train, dat
     return get_dataloader_test_cinic10(datadir, train_bs, test_bs, dataidxs_train, dataidxs_test)
 
 
-def get_dataloader_cinic10(datadir, train_bs, test_bs, dataidxs=None, lmdb=False):
+def get_dataloader_cinic10(datadir, train_bs, test_bs, dataidxs=None, lmdb=False, batch_transform=False):
     if lmdb:
         dl_obj = ImageFolderLMDB
     else:
         dl_obj = ImageFolderTruncated
 
-    transform_train, transform_test = _data_transforms_cinic10(lmdb)
+    transform_train, transform_test = _data_transforms_cinic10(lmdb, batch=batch_transform)
+    train_collate = test_collate = None
+    if batch_transform:
+        # the datasets only convert the images to uint8 tensors, the augmentation runs in the collate_fn
+        train_collate, test_collate = transform_train, transform_test
+        transform_train = transform_test = batch_transforms.to_uint8_tensor
 
     traindir = os.path.join(datadir, 'train')
     valdir = os.path.join(datadir, 'test')
@@ -325,9 +304,9 @@ def get_dataloader_cinic10(datadir, train_bs, test_bs, dataidxs=None, lmdb=False
     test_ds = dl_obj(valdir, transform=transform_train)
 
     train_dl = data.DataLoader(
-        dataset=train_ds, batch_size=train_bs, shuffle=True, drop_last=True)
+        dataset=train_ds, batch_size=train_bs, shuffle=True, drop_last=True, collate_fn=train_collate)
     test_dl = data.DataLoader(
-        dataset=test_ds, batch_size=test_bs, shuffle=False, drop_last=True)
+        dataset=test_ds, batch_size=test_bs, shuffle=False, drop_last=True, collate_fn=train_collate)
 
     return train_dl, test_dl
 
@@ -356,7 +335,7 @@ def get_dataloader_test_cinic10(datadir, train_bs, test_bs, dataidxs_train=None,
 
 
 def load_partition_data_distributed_cinic10(process_id, dataset, data_dir, partition_method, partition_alpha,
-                                            client_number, batch_size, lmdb="False"):
+                                            client_number, batch_size, lmdb="False", batch_transform=False):
     X_train, y_train, X_test, y_test, net_dataidx_map, traindata_cls_counts = partition_data(dataset,
                                                                                              data_dir,
                                                                                              partition_method,
@@ -370,7 +349,7 @@ def load_partition_data_distributed_cinic10(process_id, dataset, data_dir, parti
     # get global test data
     if process_id == 0:
         train_data_global, test_data_global = get_dataloader(
-            dataset, data_dir, batch_size, batch_size)
+            dataset, data_dir, batch_size, batch_size, batch_transform=batch_transform)
         logging.info("train_dl_global number = " + str(len(train_data_global)))
         logging.info("test_dl_global number = " + str(len(train_data_global)))
         test_data_num = len(test_data_global)
@@ -385,7 +364,7 @@ def load_partition_data_distributed_cinic10(process_id, dataset, data_dir, parti
                      (process_id, local_data_num))
         # training batch size = 64; algorithms batch size = 32
         train_data_local, test_data_local = get_dataloader(dataset, data_dir, batch_size, batch_size,
-                                                           dataidxs)
+                                                           dataidxs, batch_transform=batch_transform)
         logging.info("process_id = %d, batch_num_train_local = %d, batch_num_test_local = %d" % (
             process_id, len(train_data_local), len(test_data_local)))
         test_data_num = 0
@@ -395,7 +374,7 @@ def load_partition_data_distributed_cinic10(process_id, dataset, data_dir, parti
     return train_data_num, test_data_num, train_data_global, test_data_global, local_data_num, train_data_local, test_data_local, class_num
 
 
-def load_partition_data_cinic10(dataset, data_dir, partition_method, partition_alpha, client_number, batch_size):
+def load_partition_data_cinic10(dataset, data_dir, partition_method, partition_alpha, client_number, batch_size, batch_transform=False):
     X_train, y_train, X_test, y_test, net_dataidx_map, traindata_cls_counts = partition_data(dataset,
                                                                                              data_dir,
                                                                                              partition_method,
@@ -407,7 +386,7 @@ def load_partition_data_cinic10(dataset, data_dir, partition_method, partition_a
                          for r in range(client_number)])
 
     train_data_global, test_data_global = get_dataloader(
-        dataset, data_dir, batch_size, batch_size)
+        dataset, data_dir, batch_size, batch_size, batch_transform=batch_transform)
     logging.info("train_dl_global number = " + str(len(train_data_global)))
     logging.info("test_dl_global number = " + str(len(train_data_global)))
     test_data_num = len(test_data_global)
@@ -426,7 +405,7 @@ def load_partition_data_cinic10(dataset, data_dir, partition_method, partition_a
 
         # training batch size = 64; algorithms batch size = 32
         train_data_local, test_data_local = get_dataloader(dataset, data_dir, batch_size, batch_size,
-                                                           dataidxs)
+                                                           dataidxs, batch_transform=batch_transform)
         logging.info("client_idx = %d, batch_num_train_local = %d, batch_num_test_local = %d" % (
             client_idx, len(train_data_local), len(test_data_local)))
         train_data_local_dict[client_idx] = train_data_local
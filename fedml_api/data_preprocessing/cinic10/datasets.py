@@ -4,10 +4,10 @@ import numpy as np
 from PIL import Image
 from torchvision.datasets import DatasetFolder
 import torch.utils.data as data
-import six
-import lmdb
 import os
-import pickle
+
+from .. import dataset_store
+from ..lmdb_dataset import LMDBImageDataset
 
 # logging.basicConfig()
 logger = logging.getLogger()
@@ -78,10 +78,21 @@ class ImageFolderTruncated(DatasetFolder):
         self.dataidxs = dataidxs
 
         # we need to fetch training labels out here:
-        self._train_labels = np.array([tup[-1] for tup in self.imgs])
+        if is_valid_file is None:
+            self._train_labels = dataset_store.get(("cinic10_labels", os.path.abspath(self.root)),
+                                                   lambda: np.array([tup[-1] for tup in self.imgs]))
+        else:
+            self._train_labels = np.array([tup[-1] for tup in self.imgs])
 
         self.__build_truncated_dataset__()
 
+    def make_dataset(self, directory, *args, **kwargs):
+        # the folder scan is done once per process and shared by every client's dataset on the same directory
+        if kwargs.get("is_valid_file") is not None or (len(args) > 2 and args[2] is not None):
+            return DatasetFolder.make_dataset(directory, *args, **kwargs)
+        return dataset_store.get(("cinic10_samples", os.path.abspath(directory)),
+                                 lambda: DatasetFolder.make_dataset(directory, *args, **kwargs))
+
     def __build_truncated_dataset__(self):
         if self.dataidxs is not None:
             # self.imgs = self.imgs[self.dataidxs]
@@ -113,70 +124,10 @@ class ImageFolderTruncated(DatasetFolder):
         return self._train_labels
 
 
-def loads_data(buf):
-    """
-    Args:
-        buf: the output of `dumps`.
-    """
-    return pickle.loads(buf)
-
-
-class ImageFolderLMDB(data.Dataset):
-    def __init__(self, db_path, transform=None, target_transform=None,dataidxs=None):
-        self.db_path = db_path+".lmdb"
-        self.env = lmdb.open(self.db_path, subdir=os.path.isdir(self.db_path),
-                             readonly=True, lock=False,
-                             readahead=False, meminit=False)
-
-        with self.env.begin(write=False) as txn:
-            self.length = loads_data(txn.get(b'__len__'))
-            self.keys = dict(loads_data(txn.get(b'__keys__')))
-        self.dataidxs = dataidxs
-        self.get_imgs()
-        self.targets = list(self.keys.values())
-        self.transform = transform
-        self.target_transform = target_transform
-        
-    def get_imgs(self):
-        if self.dataidxs is not None:
-            self.imgs = self.dataidxs
-        else:
-            self.imgs = np.array(list(self.keys.keys()),dtype=int)
-
-    def __getitem__(self, index):
-        env = self.env
-        with env.begin(write=False) as txn:
-            idx = self.imgs[index]
-            byteflow = txn.get(u'{}'.format(idx).encode('ascii'))
-
-        unpacked = loads_data(byteflow)
-
-        # load img
-        img = unpacked[0].numpy()
-        # buf = six.BytesIO()
-        # buf.write(imgbuf)
-        # buf.seek(0)
-        # img = Image.open(buf).convert('RGB')
-
-        # load label
-        target = unpacked[1].item()
-
-        if self.transform is not None:
-            img = self.transform(img)
-
-        # im2arr = np.array(img)
-
-        if self.target_transform is not None:
-            target = self.target_transform(target)
-
-        # return img, target
-        return img, target
-
-    def __len__(self):
-        return len(self.imgs)
-
-    def __repr__(self):
-        return self.__class__.__name__ + ' (' + self.db_path + ')'
+class ImageFolderLMDB(LMDBImageDataset):
+    def __init__(self, db_path, transform=None, target_transform=None, dataidxs=None):
+        super(ImageFolderLMDB, self).__init__(db_path + ".lmdb", transform, target_transform, dataidxs)
 
-    # def __get_labels__(self):
- 
+    def decode_legacy(self, unpacked):
+        # (HWC uint8 tensor, label tensor)
+        return np.ascontiguousarray(unpacked[0].numpy().transpose(2, 0, 1)), unpacked[1].item()
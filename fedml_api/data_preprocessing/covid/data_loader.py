@@ -77,8 +77,9 @@ def _data_transforms_covid(lmdb=False):
     # ])
 
     # Transformer for train set: random crops and horizontal flip
+    # (the LMDB datasets yield uint8 CHW tensors)
     train_transform = transforms.Compose([transforms.Resize([32, 32]),
-                                          transforms.ToTensor()
+                                          transforms.ConvertImageDtype(torch.float)
                                           ])
     #   [transforms.Lambda(
     #       lambda x: F.pad(x.unsqueeze(0),
@@ -87,7 +88,7 @@ def _data_transforms_covid(lmdb=False):
 
     # Transformer for test set
     valid_transform = transforms.Compose([transforms.Resize([32, 32]),
-                                          transforms.ToTensor()
+                                          transforms.ConvertImageDtype(torch.float)
                                           ])  # transforms.Lambda(
     #   lambda x: F.pad(x.unsqueeze(0),
     #                   (4, 4, 4, 4),
@@ -102,10 +103,10 @@ def load_covid_data(datadir, lmdb=False):
 
     if lmdb:
         trainset = ImageFolderLMDB(_train_dir, transform=transforms.Compose([transforms.Resize([32, 32]),
-                                                                             transforms.ToTensor()
+                                                                             transforms.ConvertImageDtype(torch.float)
                                                                              ]))
         testset = ImageFolderLMDB(_test_dir, transform=transforms.Compose([transforms.Resize([32, 32]),
-                                                                           transforms.ToTensor()
+                                                                           transforms.ConvertImageDtype(torch.float)
                                                                            ]))
 
     X_train, y_train = trainset.imgs, trainset.targets
@@ -5,77 +5,21 @@ from PIL import Image
 from torchvision.datasets import DatasetFolder
 import torch.utils.data as data
 import six
-import lmdb
-import os
-import pickle
+
+from ..lmdb_dataset import LMDBImageDataset
 
 #logging.basicConfig()
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-def loads_data(buf):
-    """
-    Args:
-        buf: the output of `dumps`.
-    """
-    return pickle.loads(buf)
-
-
-class ImageFolderLMDB(data.Dataset):
-    def __init__(self, db_path, transform=None, target_transform=None,dataidxs=None):
-        self.db_path = db_path+".lmdb"
-        self.env = lmdb.open(self.db_path, subdir=os.path.isdir(self.db_path),
-                             readonly=True, lock=False,
-                             readahead=False, meminit=False)
-
-        with self.env.begin(write=False) as txn:
-            self.length = loads_data(txn.get(b'__len__'))
-            self.keys = dict(loads_data(txn.get(b'__keys__')))
-        self.dataidxs = dataidxs
-        self.get_imgs()
-        self.targets = list(self.keys.values())
-        self.transform = transform
-        self.target_transform = target_transform
-        
-    def get_imgs(self):
-        if self.dataidxs is not None:
-            self.imgs = self.dataidxs
-        else:
-            self.imgs = np.array(list(self.keys.keys()),dtype=int)
+class ImageFolderLMDB(LMDBImageDataset):
+    def __init__(self, db_path, transform=None, target_transform=None, dataidxs=None):
+        super(ImageFolderLMDB, self).__init__(db_path + ".lmdb", transform, target_transform, dataidxs)
 
-    def __getitem__(self, index):
-        env = self.env
-        with env.begin(write=False) as txn:
-            idx = self.imgs[index]
-            byteflow = txn.get(u'{}'.format(idx).encode('ascii'))
-
-        unpacked = loads_data(byteflow)
-
-        # load img
-        imgbuf = unpacked[0]
+    def decode_legacy(self, unpacked):
+        # (encoded image file, label)
         buf = six.BytesIO()
-        buf.write(imgbuf)
+        buf.write(unpacked[0])
         buf.seek(0)
-        img = Image.open(buf).convert('RGB')
-
-        # load label
-        target = unpacked[1]
-
-        if self.transform is not None:
-            img = self.transform(img)
-
-        # im2arr = np.array(img)
-
-        if self.target_transform is not None:
-            target = self.target_transform(target)
-
-        # return img, target
-        return img, target
-
-    def __len__(self):
-        return len(self.imgs)
-
-    def __repr__(self):
-        return self.__class__.__name__ + ' (' + self.db_path + ')'
-
-    # def __get_labels__(self):
\ No newline at end of file
+        img = np.asarray(Image.open(buf).convert('RGB'))
+        return np.ascontiguousarray(img.transpose(2, 0, 1)), unpacked[1]
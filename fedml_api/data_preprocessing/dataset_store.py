@@ -0,0 +1,74 @@
+"""
+Process-wide store of base datasets shared by the per-client datasets.
+
+The per-client datasets (CIFAR10_truncated, CIFAR100_truncated, EMNIST_truncated, ImageFolderTruncated) used to
+re-read and copy the whole base dataset for every client. They now fetch the base arrays from this store, which
+loads each of them once per process, and keep only their `dataidxs` as an index view into the shared arrays.
+
+With `set_mmap_dir(path)` the base arrays are additionally written once as `.npy` files under `path` and opened
+with copy-on-write memory mapping, so the processes (e.g. MPI ranks) on one host share a single copy through the
+page cache instead of each holding its own.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import uuid
+
+import numpy as np
+
+_objects = {}
+_lock = threading.RLock()
+_mmap_dir = None
+
+
+def set_mmap_dir(mmap_dir):
+    """Keep base arrays loaded after this call as memory-mapped `.npy` files under `mmap_dir` (None disables)."""
+    global _mmap_dir
+    _mmap_dir = mmap_dir
+
+
+def get(key, load_fn):
+    """Return the object stored under `key`, calling `load_fn()` to build it on first use."""
+    with _lock:
+        if key not in _objects:
+            _objects[key] = load_fn()
+        return _objects[key]
+
+
+def get_arrays(name, root, train, load_fn):
+    """Return the shared (data, targets) numpy arrays of a base dataset.
+
+    `load_fn()` returns the arrays and is only called when neither this process nor (with a mmap dir) another
+    process on the host has loaded `name` from `root` before.
+    """
+    key = (name, os.path.abspath(root), train)
+    return get(key, lambda: _load_arrays(key, load_fn))
+
+
+def clear():
+    with _lock:
+        _objects.clear()
+
+
+def _load_arrays(key, load_fn):
+    if _mmap_dir is None:
+        data, targets = load_fn()
+        return np.asarray(data), np.asarray(targets)
+
+    name, root, train = key
+    prefix = os.path.join(_mmap_dir, "%s_%s_%s" % (name, "train" if train else "test",
+                                                   hashlib.md5(root.encode("utf-8")).hexdigest()[:8]))
+    paths = [prefix + "_data.npy", prefix + "_targets.npy"]
+    if not all(os.path.exists(path) for path in paths):
+        os.makedirs(_mmap_dir, exist_ok=True)
+        for path, array in zip(paths, load_fn()):
+            # write to a private temp file first so concurrent ranks never map a partially written file
+            tmp_path = path + ".tmp_" + uuid.uuid4().hex
+            with open(tmp_path, "wb") as f:
+                np.save(f, np.asarray(array))
+            os.replace(tmp_path, path)
+        logging.info("dataset store: saved %s to %s" % (name, prefix))
+    # "c" maps the file copy-on-write: pages are shared until a dataset writes to them (e.g. truncate_channel)
+    return tuple(np.load(path, mmap_mode="c") for path in paths)
@@ -7,6 +7,8 @@ from torchvision.datasets import EMNIST
 import torchvision.transforms as tt
 import torch
 
+from .. import dataset_store
+
 #logging.basicConfig()
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -41,12 +43,15 @@ class EMNIST_truncated(data.Dataset):
 
         emnist_dataobj = self.dataset
 
-        data = emnist_dataobj.data #
-        target = np.array(emnist_dataobj.targets)
+        # the arrays are converted once per process and shared by every client; a client only keeps its dataidxs
+        data, target = dataset_store.get_arrays("emnist_" + emnist_dataobj.split, emnist_dataobj.root,
+                                                emnist_dataobj.train,
+                                                lambda: (emnist_dataobj.data.numpy(),
+                                                         np.array(emnist_dataobj.targets)))
+        data = torch.from_numpy(data)
 
         if self.dataidxs is not None:
-            data = data[self.dataidxs]
-            target = target[self.dataidxs]
+            self.dataidxs = np.asarray(self.dataidxs, dtype=np.int64)
 
         return data, target
 
@@ -59,11 +64,15 @@ class EMNIST_truncated(data.Dataset):
         Returns:
             tuple: (image, target) where target is index of the target class.
         """
+        if self.dataidxs is not None:
+            index = self.dataidxs[index]
         img, target = torch.unsqueeze(self.data[index],0), self.target[index]
 
         return img.float(), target
 
     def __len__(self):
+        if self.dataidxs is not None:
+            return len(self.dataidxs)
         return len(self.data)
 
 
@@ -7,6 +7,7 @@ import torch
 import torch.utils.data as data
 
 from . import utils
+from ..lazy_client_dict import lazy_client_dicts
 
 #logging.basicConfig()
 logger = logging.getLogger()
@@ -25,6 +26,9 @@ _EXAMPLE = 'examples'
 _IMGAE = 'image'
 _LABEL = 'label'
 
+train_collate = utils.cifar100_batch_transform(train=True)
+test_collate = utils.cifar100_batch_transform(train=False)
+
 
 def get_dataloader(dataset, data_dir, train_bs, test_bs, client_idx = None):
     
@@ -50,11 +54,12 @@ def get_dataloader(dataset, data_dir, train_bs, test_bs, client_idx = None):
             test_x = np.vstack([test_h5[_EXAMPLE][client_id_test][_IMGAE][()]])
             test_y = np.vstack([test_h5[_EXAMPLE][client_id_test][_LABEL][()]]).squeeze()
 
-    # preprocess 
-    train_x = utils.preprocess_cifar_img(torch.tensor(train_x), train=True)
+    # keep the raw uint8 images (NCHW); crop/flip/normalize run per batch in the collate_fn, so every epoch
+    # draws a new augmentation
+    train_x = torch.from_numpy(train_x).permute(0, 3, 1, 2).contiguous()
     train_y = torch.tensor(train_y)
     if len(test_x) != 0:
-        test_x = utils.preprocess_cifar_img(torch.tensor(test_x), train=False)
+        test_x = torch.from_numpy(test_x).permute(0, 3, 1, 2).contiguous()
         test_y = torch.tensor(test_y)
     
     # generate dataloader
@@ -62,14 +67,16 @@ def get_dataloader(dataset, data_dir, train_bs, test_bs, client_idx = None):
     train_dl = data.DataLoader(dataset=train_ds,
                                batch_size=train_bs,
                                shuffle=True,
-                               drop_last=False)
+                               drop_last=False,
+                               collate_fn=train_collate)
 
     if len(test_x) != 0:
         test_ds = data.TensorDataset(test_x, test_y)
         test_dl = data.DataLoader(dataset=test_ds,
                                   batch_size=test_bs,
                                   shuffle=True,
-                                  drop_last=False)
+                                  drop_last=False,
+                                  collate_fn=test_collate)
     else:
         test_dl = None
 
@@ -116,32 +123,21 @@ def load_partition_data_federated_cifar100(dataset, data_dir, batch_size=DEFAULT
     
     # get local dataset
     data_local_num_dict = dict()
-    train_data_local_dict = dict()
-    test_data_local_dict = dict()
-    
-    for client_idx in range(DEFAULT_TRAIN_CLIENTS_NUM):
-        train_data_local, test_data_local = get_dataloader(
-            dataset, data_dir, batch_size, batch_size, client_idx)
-        local_data_num = len(train_data_local.dataset)
-        data_local_num_dict[client_idx] = local_data_num
-        logging.info("client_idx = %d, local_sample_number = %d" % (client_idx, local_data_num))
-        logging.info("client_idx = %d, batch_num_train_local = %d" % (client_idx, len(train_data_local)))
-        train_data_local_dict[client_idx] = train_data_local
-        test_data_local_dict[client_idx] = test_data_local
-    
+    with h5py.File(train_file_path, 'r') as train_h5:
+        train_examples = train_h5[_EXAMPLE]
+        for client_idx in range(DEFAULT_TRAIN_CLIENTS_NUM):
+            local_data_num = train_examples[client_ids_train[client_idx]][_LABEL].shape[0]
+            data_local_num_dict[client_idx] = local_data_num
+            logging.info("client_idx = %d, local_sample_number = %d" % (client_idx, local_data_num))
+
+    # the client DataLoaders are built on first access
+    train_data_local_dict, test_data_local_dict = lazy_client_dicts(
+        range(DEFAULT_TRAIN_CLIENTS_NUM),
+        lambda client_idx: get_dataloader(dataset, data_dir, batch_size, batch_size, client_idx))
+
     # global dataset
-    train_data_global = data.DataLoader(
-                data.ConcatDataset(
-                    list(dl.dataset for dl in list(train_data_local_dict.values()))
-                ),
-                batch_size=batch_size, shuffle=True)
+    train_data_global, test_data_global = get_dataloader(dataset, data_dir, batch_size, batch_size)
     train_data_num = len(train_data_global.dataset)
-    
-    test_data_global = data.DataLoader(
-                data.ConcatDataset(
-                    list(dl.dataset for dl in list(test_data_local_dict.values()) if dl is not None)
-                ),
-                batch_size=batch_size, shuffle=True)
     test_data_num = len(test_data_global.dataset)
 
 
@@ -178,13 +174,13 @@ def get_global_dataloader(data_dir,batch_size =DEFAULT_BATCH_SIZE ,dataidx = Non
                 data.ConcatDataset(
                     list(dl.dataset for dl in list(train_data_local_dict.values()))
                 ),
-                batch_size=batch_size, shuffle=True)
+                batch_size=batch_size, shuffle=True, collate_fn=train_collate)
     
     test_data_global = data.DataLoader(
                 data.ConcatDataset(
                     list(dl.dataset for dl in list(test_data_local_dict.values()) if dl is not None)
                 ),
-                batch_size=batch_size, shuffle=True)
+                batch_size=batch_size, shuffle=True, collate_fn=test_collate)
 
 
     return train_data_global, test_data_global
@@ -1,6 +1,8 @@
 import torch
 import torchvision.transforms as transforms
 
+from .. import batch_transforms
+
 '''
 preprocess reference : https://github.com/google-research/federated/blob/master/utils/datasets/cifar100_dataset.py
 '''
@@ -33,4 +35,20 @@ def preprocess_cifar_img(img, train):
             train)
         (i.permute(2,0,1)) 
         for i in img])
-    return transoformed_img
\ No newline at end of file
+    return transoformed_img
+
+
+def cifar100_batch_transform(train=True, crop_size=(24, 24)):
+    """collate_fn version of `cifar100_transform` for uint8 (N, 3, 32, 32) batches; the per-image statistics are
+    those of the whole image, as in `preprocess_cifar_img`."""
+    if train:
+        crop = batch_transforms.RandomCrop(crop_size)
+        flip = [batch_transforms.RandomHorizontalFlip()]
+    else:
+        crop = batch_transforms.CenterCrop(crop_size)
+        flip = []
+    return batch_transforms.BatchTransform([
+        batch_transforms.ToFloat(),
+        batch_transforms.PerImageStandardization(),
+        crop,
+    ] + flip)
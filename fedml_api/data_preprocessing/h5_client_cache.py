@@ -0,0 +1,69 @@
+"""
+Shared HDF5 handles and per-client example cache for the datasets that read one client group of a large h5 file
+(stackoverflow_nwp, stackoverflow_lr).
+
+`get_h5_file` keeps one read-only handle per file and process. It is opened on first use and reopened in a forked
+child (e.g. a DataLoader worker), because h5py handles must not be shared across fork. The handles live here rather
+than on the datasets, so the datasets stay picklable.
+
+`client_examples` holds the decoded and preprocessed examples of the most recently used clients, bounded by the
+total number of examples. An epoch over a client then reads its h5 group once instead of once per sample.
+"""
+
+import collections
+import os
+import threading
+
+import h5py
+
+DEFAULT_CACHE_SAMPLE_NUM = 500000
+
+_handles = {}
+_handles_pid = None
+_lock = threading.Lock()
+
+
+def get_h5_file(h5_path):
+    global _handles_pid
+    with _lock:
+        if _handles_pid != os.getpid():
+            # handles inherited from the parent process are dropped, not reused
+            _handles.clear()
+            _handles_pid = os.getpid()
+        if h5_path not in _handles:
+            _handles[h5_path] = h5py.File(h5_path, 'r')
+        return _handles[h5_path]
+
+
+class ClientExampleCache(object):
+    """LRU cache of per-client example arrays, evicting whole clients once more than `max_sample_num` examples
+    are cached. The most recently loaded client is always kept, even if it alone exceeds the bound."""
+
+    def __init__(self, max_sample_num=DEFAULT_CACHE_SAMPLE_NUM):
+        self.max_sample_num = max_sample_num
+        self._entries = collections.OrderedDict()
+        self._sample_num = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, load_fn):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        examples = load_fn()
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = examples
+                self._sample_num += len(examples)
+            while self._sample_num > self.max_sample_num and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._sample_num -= len(evicted)
+        return examples
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._sample_num = 0
+
+
+client_examples = ClientExampleCache()
@@ -0,0 +1,80 @@
+"""
+Lazy per-client DataLoader dicts of the load_partition_data_* functions.
+
+`lazy_client_dicts(client_idxs, make_fn)` returns train_data_local_dict and test_data_local_dict as read-only
+mappings over `client_idxs`. Accessing a client in either one calls `make_fn(client_idx)`, which builds the client's
+(train, test) DataLoaders. Only the most recently used clients are kept, at most the budget set with
+`set_max_clients`; older ones are evicted and built again on their next access. Startup then builds no client
+DataLoaders, and the memory held is bounded by the clients of the last rounds instead of all clients.
+"""
+
+import collections
+import threading
+from collections.abc import Mapping
+
+_max_clients = None
+
+
+def set_max_clients(max_clients):
+    """Budget of the dicts created after this call; None (or 0) keeps every client once built."""
+    global _max_clients
+    _max_clients = max_clients or None
+
+
+class ClientDataLoaderCache(object):
+    """LRU cache of the (train, test) DataLoaders of `make_fn(client_idx)`."""
+
+    def __init__(self, make_fn, max_clients=None):
+        self.make_fn = make_fn
+        self.max_clients = max_clients
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, client_idx):
+        with self._lock:
+            if client_idx in self._entries:
+                self._entries.move_to_end(client_idx)
+                return self._entries[client_idx]
+        dataloaders = self.make_fn(client_idx)
+        with self._lock:
+            self._entries[client_idx] = dataloaders
+            self._entries.move_to_end(client_idx)
+            while self.max_clients is not None and len(self._entries) > self.max_clients:
+                self._entries.popitem(last=False)
+        return dataloaders
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class LazyClientDict(Mapping):
+    """{client_idx: DataLoader} view on the `position` (0 train, 1 test) of the DataLoaders of a cache."""
+
+    def __init__(self, client_idxs, cache, position):
+        self._client_idxs = dict.fromkeys(client_idxs)
+        self.cache = cache
+        self.position = position
+
+    def __getitem__(self, client_idx):
+        if client_idx not in self._client_idxs:
+            raise KeyError(client_idx)
+        return self.cache.get(client_idx)[self.position]
+
+    def __contains__(self, client_idx):
+        return client_idx in self._client_idxs
+
+    def __iter__(self):
+        return iter(self._client_idxs)
+
+    def __len__(self):
+        return len(self._client_idxs)
+
+    def __repr__(self):
+        return "%s(%d clients, %d built)" % (self.__class__.__name__, len(self), len(self.cache))
+
+
+def lazy_client_dicts(client_idxs, make_fn):
+    """(train_data_local_dict, test_data_local_dict) sharing one cache of `make_fn(client_idx)` -> (train, test)."""
+    client_idxs = list(client_idxs)
+    cache = ClientDataLoaderCache(make_fn, _max_clients)
+    return LazyClientDict(client_idxs, cache, 0), LazyClientDict(client_idxs, cache, 1)
@@ -0,0 +1,145 @@
+"""
+LMDB image datasets with pre-decoded records (CINIC-10, COVID).
+
+`write_lmdb` stores every image as one record: a fixed 16 byte header (int64 label, uint16 channels, height, width)
+followed by the uint8 CHW pixels. Reading a record is a `np.frombuffer` view on the LMDB page, without pickle or
+image decoding. The labels are stored once as an int64 array under `__labels__`, so a dataset knows all of its
+labels without reading the records.
+
+`get_env` keeps one read-only environment per database and process, shared by all datasets on it (e.g. every
+client's dataset); LMDB does not allow opening a database twice in one process. A forked child (e.g. a DataLoader
+worker) closes the environments inherited from its parent and opens its own on first use. `LMDBImageDataset`
+implements `__getitems__`, which DataLoader calls with the indexes of a whole batch, to read the batch in one
+transaction. Databases written by the previous pickle-based `folder2lmdb` are still readable through
+`decode_legacy`.
+"""
+
+import os
+import pickle
+import struct
+import threading
+
+import lmdb
+import numpy as np
+import torch
+import torch.utils.data as data
+
+RECORD_FORMAT = b'uint8_chw_v1'
+_HEADER = struct.Struct('<qHHH2x')
+
+_envs = {}
+_envs_pid = None
+_lock = threading.Lock()
+
+
+def get_env(db_path):
+    global _envs_pid
+    with _lock:
+        if _envs_pid != os.getpid():
+            # environments inherited through fork must not be used; closing only releases this process' mapping
+            for env in _envs.values():
+                env.close()
+            _envs.clear()
+            _envs_pid = os.getpid()
+        if db_path not in _envs:
+            _envs[db_path] = lmdb.open(db_path, subdir=os.path.isdir(db_path),
+                                       readonly=True, lock=False,
+                                       readahead=False, meminit=False)
+        return _envs[db_path]
+
+
+def record_key(idx):
+    return u'{}'.format(idx).encode('ascii')
+
+
+def encode_record(img, label):
+    """img: uint8 (C, H, W) array."""
+    img = np.ascontiguousarray(img, dtype=np.uint8)
+    return _HEADER.pack(int(label), *img.shape) + img.tobytes()
+
+
+def decode_record(buf):
+    """(uint8 (C, H, W) view on `buf`, label)."""
+    label, channels, height, width = _HEADER.unpack_from(buf)
+    img = np.frombuffer(buf, dtype=np.uint8, count=channels * height * width, offset=_HEADER.size)
+    return img.reshape(channels, height, width), label
+
+
+def write_lmdb(lmdb_path, samples, write_frequency=5000):
+    """Write (uint8 CHW image, label) pairs as records "0", "1", ... of a new database at `lmdb_path`."""
+    db = lmdb.open(lmdb_path, subdir=os.path.isdir(lmdb_path),
+                   map_size=1099511627776 * 2, readonly=False,
+                   meminit=False, map_async=True)
+    labels = []
+    txn = db.begin(write=True)
+    for idx, (img, label) in enumerate(samples):
+        txn.put(record_key(idx), encode_record(img, label))
+        labels.append(int(label))
+        if (idx + 1) % write_frequency == 0:
+            txn.commit()
+            txn = db.begin(write=True)
+    txn.commit()
+    with db.begin(write=True) as txn:
+        txn.put(b'__labels__', np.asarray(labels, dtype=np.int64).tobytes())
+        txn.put(b'__len__', str(len(labels)).encode('ascii'))
+        txn.put(b'__format__', RECORD_FORMAT)
+    db.sync()
+    db.close()
+
+
+class LMDBImageDataset(data.Dataset):
+    """Samples (uint8 CHW image tensor, label) of an LMDB database; `dataidxs` selects the records of a client."""
+
+    def __init__(self, db_path, transform=None, target_transform=None, dataidxs=None):
+        self.db_path = db_path
+        self.transform = transform
+        self.target_transform = target_transform
+        self.dataidxs = dataidxs
+
+        with get_env(self.db_path).begin(write=False) as txn:
+            self.legacy = txn.get(b'__format__') != RECORD_FORMAT
+            if self.legacy:
+                keys = dict(pickle.loads(txn.get(b'__keys__')))
+                self.targets = list(keys.values())
+                all_idxs = np.array(list(keys.keys()), dtype=int)
+            else:
+                self.targets = np.frombuffer(txn.get(b'__labels__'), dtype=np.int64).tolist()
+                all_idxs = np.arange(len(self.targets))
+        if self.legacy and type(self).decode_legacy is LMDBImageDataset.decode_legacy:
+            raise ValueError("%s has the previous pickle-based layout, which only the dataset classes implementing "
+                             "decode_legacy can read" % self.db_path)
+        self.imgs = self.dataidxs if self.dataidxs is not None else all_idxs
+
+    def decode_legacy(self, unpacked):
+        """(uint8 CHW image, label) of an unpickled record of the previous layout; implemented by the datasets
+        whose legacy databases are supported."""
+        raise NotImplementedError()
+
+    def _read(self, txn, index):
+        buf = txn.get(record_key(self.imgs[index]))
+        if self.legacy:
+            img, target = self.decode_legacy(pickle.loads(buf))
+        else:
+            # the view is only valid inside the transaction; the copy is the only one made of the pixels
+            img, target = decode_record(buf)
+            img = np.array(img)
+        img = torch.from_numpy(img)
+        if self.transform is not None:
+            img = self.transform(img)
+        if self.target_transform is not None:
+            target = self.target_transform(target)
+        return img, target
+
+    def __getitem__(self, index):
+        with get_env(self.db_path).begin(write=False, buffers=True) as txn:
+            return self._read(txn, index)
+
+    def __getitems__(self, indexes):
+        with get_env(self.db_path).begin(write=False, buffers=True) as txn:
+            return [self._read(txn, index) for index in indexes]
+
+    def __len__(self):
+        return len(self.imgs)
+
+    def __repr__(self):
+        return self.__class__.__name__ + ' (' + self.db_path + ')'
@@ -0,0 +1,60 @@
+"""
+On-disk cache of client partitions (net_dataidx_map).
+
+Without a cache dir, `get_net_dataidx_map` partitions with the global np.random state, as the loaders always did.
+With `set_cache_dir(path, seed)` the partition is drawn from np.random.RandomState(seed) and stored once as a CSR
+pair of `.npy` files
+
+    <path>/<dataset>_<method>_alpha<alpha>_n<sample_num>_clients<client_num>_seed<seed>_offsets.npy   int64 (client_num + 1,)
+    <path>/<dataset>_<method>_alpha<alpha>_n<sample_num>_clients<client_num>_seed<seed>_indices.npy   int64 (sample_num,)
+
+which later launches and the other ranks memory-map instead of partitioning again.
+"""
+
+import logging
+import os
+import uuid
+
+import numpy as np
+
+try:
+    from fedml_core.non_iid_partition.noniid_partition import csr_to_dataidx_map
+except ImportError:
+    from FedML.fedml_core.non_iid_partition.noniid_partition import csr_to_dataidx_map
+
+_cache_dir = None
+_seed = 0
+
+
+def set_cache_dir(cache_dir, seed=0):
+    """Cache the partitions computed after this call under `cache_dir` (None disables), drawn with `seed`."""
+    global _cache_dir, _seed
+    _cache_dir = cache_dir
+    _seed = seed
+
+
+def get_net_dataidx_map(dataset, method, alpha, sample_num, client_num, partition_fn):
+    """Return {client index: sample indexes}; `partition_fn(rng)` computes the CSR (offsets, indices) on a miss."""
+    if _cache_dir is None:
+        return csr_to_dataidx_map(*partition_fn(np.random))
+
+    name = "%s_%s_alpha%s_n%d_clients%d_seed%d" % (dataset, method, alpha, sample_num, client_num, _seed)
+    offsets_path = os.path.join(_cache_dir, name + "_offsets.npy")
+    indices_path = os.path.join(_cache_dir, name + "_indices.npy")
+    if not os.path.exists(offsets_path):
+        offsets, indices = partition_fn(np.random.RandomState(_seed))
+        os.makedirs(_cache_dir, exist_ok=True)
+        # the offsets file is written last and marks a complete entry
+        _save(indices_path, indices)
+        _save(offsets_path, offsets)
+        logging.info("partition %s computed and cached in %s" % (name, _cache_dir))
+    # plain ndarray views of the mapping, slicing a np.memmap per client is much slower
+    return csr_to_dataidx_map(np.load(offsets_path), np.load(indices_path, mmap_mode='r').view(np.ndarray))
+
+
+def _save(path, array):
+    # ranks that miss the cache concurrently write identical files; the rename keeps every reader consistent
+    tmp_path = path + ".tmp_" + uuid.uuid4().hex
+    with open(tmp_path, 'wb') as f:
+        np.save(f, np.asarray(array, dtype=np.int64))
+    os.replace(tmp_path, path)
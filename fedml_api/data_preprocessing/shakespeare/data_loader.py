@@ -4,6 +4,7 @@ import os
 import numpy as np
 import torch
 
+from . import packed_data
 from .language_utils import word_to_indices, VOCAB_SIZE, \
     letter_to_index
 
@@ -87,39 +88,42 @@ def batch_data(data, batch_size):
     return batch_data
 
 
-def load_partition_data_shakespeare(batch_size):
-    train_path = "../../../data/shakespeare/train"
-    test_path = "../../../data/shakespeare/test"
-    users, groups, train_data, test_data = read_data(train_path, test_path)
-
-    if len(groups) == 0:
-        groups = [None for _ in users]
-    train_data_num = 0
-    test_data_num = 0
+def load_partition_data_shakespeare(batch_size, train_path="../../../data/shakespeare/train",
+                                    test_path="../../../data/shakespeare/test", packed_dir=None):
+    # the json files are converted once into a memory-mapped packed cache (see packed_data.py) next to them
+    if packed_dir is None:
+        packed_dir = os.path.join(os.path.dirname(os.path.normpath(train_path)), "packed")
+    if not packed_data.has_packed_data(packed_dir):
+        users, _, train_data, test_data = read_data(train_path, test_path)
+        packed_data.pack_data(users, train_data, test_data, packed_dir)
+    users, arrays = packed_data.load_packed_data(packed_dir)
+
+    train_x, train_y, train_offsets = arrays["train"]
+    test_x, test_y, test_offsets = arrays["test"]
+    train_data_num = int(train_offsets[-1])
+    test_data_num = int(test_offsets[-1])
     train_data_local_dict = dict()
     test_data_local_dict = dict()
     train_data_local_num_dict = dict()
-    train_data_global = list()
-    test_data_global = list()
-    client_idx = 0
-    for u, g in zip(users, groups):
-        user_train_data_num = len(train_data[u]['x'])
-        user_test_data_num = len(test_data[u]['x'])
-        train_data_num += user_train_data_num
-        test_data_num += user_test_data_num
-        train_data_local_num_dict[client_idx] = user_train_data_num
+    train_batch_indices_global = list()
+    test_batch_indices_global = list()
+    for client_idx in range(len(users)):
+        train_data_local_num_dict[client_idx] = int(train_offsets[client_idx + 1] - train_offsets[client_idx])
 
         # transform to batches
-        train_batch = batch_data(train_data[u], batch_size)
-        test_batch = batch_data(test_data[u], batch_size)
+        train_batch_indices = packed_data.client_batch_indices(train_offsets[client_idx],
+                                                               train_offsets[client_idx + 1], batch_size)
+        test_batch_indices = packed_data.client_batch_indices(test_offsets[client_idx],
+                                                              test_offsets[client_idx + 1], batch_size)
 
         # index using client index
-        train_data_local_dict[client_idx] = train_batch
-        test_data_local_dict[client_idx] = test_batch
-        train_data_global += train_batch
-        test_data_global += test_batch
-        client_idx += 1
-    client_num = client_idx
+        train_data_local_dict[client_idx] = packed_data.PackedBatches(train_x, train_y, train_batch_indices)
+        test_data_local_dict[client_idx] = packed_data.PackedBatches(test_x, test_y, test_batch_indices)
+        train_batch_indices_global += train_batch_indices
+        test_batch_indices_global += test_batch_indices
+    train_data_global = packed_data.PackedBatches(train_x, train_y, train_batch_indices_global)
+    test_data_global = packed_data.PackedBatches(test_x, test_y, test_batch_indices_global)
+    client_num = len(users)
     output_dim = VOCAB_SIZE
 
     return client_num, train_data_num, test_data_num, train_data_global, test_data_global, \
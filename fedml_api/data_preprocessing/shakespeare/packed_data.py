@@ -0,0 +1,125 @@
+"""
+Packed binary cache of the LEAF Shakespeare json files.
+
+`pack_data` converts the train and test json files once into
+
+    <packed_dir>/clients.json            client ids, in the order of the client indexes
+    <packed_dir>/<split>_x.npy           int8 (example_num, seq_len) character indices of all clients' examples
+    <packed_dir>/<split>_y.npy           int8 (example_num,) next-character indices
+    <packed_dir>/<split>_offsets.npy     int64 (client_num + 1,) start of each client's examples
+
+`load_packed_data` memory-maps these files, so startup reads no json and the processes on one host share the
+pages. `PackedBatches` slices the mini-batches out of the mapped arrays when they are accessed.
+"""
+
+import json
+import logging
+import os
+import uuid
+
+import numpy as np
+import torch
+
+from .language_utils import ALL_LETTERS, letter_to_index
+
+CLIENTS_FILE = 'clients.json'
+SPLITS = ('train', 'test')
+
+
+def _char_lookup_table(max_code_point):
+    """int8 table from unicode code point to index in ALL_LETTERS (-1, like str.find, for unknown characters)."""
+    table = np.full(max(max_code_point, max(map(ord, ALL_LETTERS))) + 1, -1, dtype=np.int8)
+    for index in reversed(range(len(ALL_LETTERS))):
+        table[ord(ALL_LETTERS[index])] = index
+    return table
+
+
+def _texts_to_indices(texts):
+    """Vectorized `word_to_indices` over equally long strings; returns an int8 (len(texts), seq_len) array."""
+    seq_len = len(texts[0]) if texts else 0
+    if any(len(text) != seq_len for text in texts):
+        raise ValueError("packing needs examples of equal length")
+    code_points = np.frombuffer(''.join(texts).encode('utf-32-le'), dtype=np.uint32)
+    table = _char_lookup_table(int(code_points.max()) if len(code_points) else 0)
+    return table[code_points].reshape(len(texts), seq_len)
+
+
+def _texts_to_indices_chunked(texts, chunk_size=100000):
+    # bounds the size of the temporary utf-32 buffer on large datasets
+    if not texts:
+        return np.zeros((0, 0), dtype=np.int8)
+    return np.concatenate([_texts_to_indices(texts[i:i + chunk_size]) for i in range(0, len(texts), chunk_size)])
+
+
+def _save(path, array):
+    # write a private temp file and rename it, so a concurrent reader never maps a partially written file
+    tmp_path = path + '.tmp_' + uuid.uuid4().hex
+    with open(tmp_path, 'wb') as f:
+        np.save(f, array)
+    os.replace(tmp_path, path)
+
+
+def pack_data(clients, train_data, test_data, packed_dir):
+    """Write the packed cache of the `read_data` output; clients.json is written last and marks it complete."""
+    os.makedirs(packed_dir, exist_ok=True)
+    for split, split_data in zip(SPLITS, (train_data, test_data)):
+        xs = [x for client in clients for x in split_data[client]['x']]
+        ys = [y for client in clients for y in split_data[client]['y']]
+        offsets = np.cumsum([0] + [len(split_data[client]['x']) for client in clients], dtype=np.int64)
+        _save(os.path.join(packed_dir, split + '_x.npy'), _texts_to_indices_chunked(xs))
+        if all(len(y) == 1 for y in ys):
+            y_indices = _texts_to_indices_chunked(ys).reshape(-1)
+        else:
+            y_indices = np.fromiter((letter_to_index(y) for y in ys), dtype=np.int8, count=len(ys))
+        _save(os.path.join(packed_dir, split + '_y.npy'), y_indices)
+        _save(os.path.join(packed_dir, split + '_offsets.npy'), offsets)
+    tmp_path = os.path.join(packed_dir, CLIENTS_FILE + '.tmp_' + uuid.uuid4().hex)
+    with open(tmp_path, 'w') as f:
+        json.dump(clients, f)
+    os.replace(tmp_path, os.path.join(packed_dir, CLIENTS_FILE))
+    logging.info("packed %d shakespeare clients into %s" % (len(clients), packed_dir))
+
+
+def has_packed_data(packed_dir):
+    return os.path.exists(os.path.join(packed_dir, CLIENTS_FILE))
+
+
+def load_packed_data(packed_dir):
+    """Returns (clients, {split: (x, y, offsets)}) with x and y memory-mapped read-only."""
+    with open(os.path.join(packed_dir, CLIENTS_FILE), 'r') as f:
+        clients = json.load(f)
+    arrays = {}
+    for split in SPLITS:
+        arrays[split] = (np.load(os.path.join(packed_dir, split + '_x.npy'), mmap_mode='r'),
+                         np.load(os.path.join(packed_dir, split + '_y.npy'), mmap_mode='r'),
+                         np.load(os.path.join(packed_dir, split + '_offsets.npy')))
+    return clients, arrays
+
+
+def client_batch_indices(start, end, batch_size):
+    """Example indexes of the mini-batches of the client whose examples are [start, end), shuffled with the same
+    permutation as `batch_data`."""
+    permutation = start + np.random.RandomState(100).permutation(end - start)
+    return [permutation[i:i + batch_size] for i in range(0, end - start, batch_size)]
+
+
+class PackedBatches(object):
+    """List-like sequence of (x, y) int64 tensor batches, gathered from the packed arrays on access."""
+
+    def __init__(self, x, y, batch_indices):
+        self.x = x
+        self.y = y
+        self.batch_indices = batch_indices
+
+    def __len__(self):
+        return len(self.batch_indices)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return PackedBatches(self.x, self.y, self.batch_indices[idx])
+        indices = self.batch_indices[idx]
+        return torch.from_numpy(self.x[indices].astype(np.int64)), torch.from_numpy(self.y[indices].astype(np.int64))
+
+    def __iter__(self):
+        for idx in range(len(self.batch_indices)):
+            yield self[idx]
@@ -1,12 +1,13 @@
 
 import logging
 import os
-import tqdm
+import pickle
 
 import torch.utils.data as data
 
 from . import utils
-from .dataset import StackOverflowDataset
+from ..lazy_client_dict import lazy_client_dicts
+from .dataset import StackOverflowDataset, sparse_collate
 #logging.basicConfig()
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -21,67 +22,61 @@ DEFAULT_TEST_FILE = 'stackoverflow_test.h5'
 
 #cache
 DEFAULT_CACHE_FILE = 'stackoverflow_lr.pkl'
+DEFAULT_SPARSE_CACHE_FILE = 'stackoverflow_lr_sparse.pkl'
 
-def get_dataloader(dataset, data_dir, train_bs, test_bs, client_idx=None):
+def get_dataloader(dataset, data_dir, train_bs, test_bs, client_idx=None, sparse=False):
+    collate_fn = sparse_collate if sparse else None
 
     if client_idx is None:
 
         train_dl = data.DataLoader(data.ConcatDataset(
             StackOverflowDataset(
                 os.path.join(data_dir, DEFAULT_TRAIN_FILE), client_idx,
-                "train", {
-                    "input": lambda x: utils.preprocess_input(x, data_dir),
-                    "target": lambda y: utils.preprocess_target(y, data_dir)
-                }) for client_idx in range(DEFAULT_TRAIN_CLIENTS_NUM)),
+                "train", data_dir=data_dir, sparse=sparse)
+                for client_idx in range(DEFAULT_TRAIN_CLIENTS_NUM)),
                                    batch_size=train_bs,
-                                   shuffle=True)
+                                   shuffle=True,
+                                  collate_fn=collate_fn)
 
         test_dl = data.DataLoader(data.ConcatDataset(
             StackOverflowDataset(
-                os.path.join(data_dir, DEFAULT_TEST_FILE), client_idx, "test",
-                {
-                    "input": lambda x: utils.preprocess_input(x, data_dir),
-                    "target": lambda y: utils.preprocess_target(y, data_dir)
-                }) for client_idx in range(DEFAULT_TEST_CLIENTS_NUM)),
+                os.path.join(data_dir, DEFAULT_TEST_FILE), client_idx, "test", data_dir=data_dir, sparse=sparse)
+                for client_idx in range(DEFAULT_TEST_CLIENTS_NUM)),
                                   batch_size=test_bs,
-                                  shuffle=True)
+                                  shuffle=True,
+                                  collate_fn=collate_fn)
         return train_dl, test_dl
 
     else:
         train_ds = StackOverflowDataset(
-            os.path.join(data_dir, DEFAULT_TRAIN_FILE), client_idx, "train", {
-                "input": lambda x: utils.preprocess_input(x, data_dir),
-                "target": lambda y: utils.preprocess_target(y, data_dir)
-            })
+            os.path.join(data_dir, DEFAULT_TRAIN_FILE), client_idx, "train", data_dir=data_dir, sparse=sparse)
         train_dl = data.DataLoader(dataset=train_ds,
                                    batch_size=train_bs,
                                    shuffle=True,
-                                   drop_last=False)
+                                   drop_last=False,
+                                   collate_fn=collate_fn)
 
         if client_idx >= DEFAULT_TEST_CLIENTS_NUM:
             test_dl = None
         else:
             test_ds = StackOverflowDataset(
-                os.path.join(data_dir, DEFAULT_TEST_FILE), client_idx, "test",
-                {
-                    "input": lambda x: utils.preprocess_input(x, data_dir),
-                    "target": lambda y: utils.preprocess_target(y, data_dir)
-                })
+                os.path.join(data_dir, DEFAULT_TEST_FILE), client_idx, "test", data_dir=data_dir, sparse=sparse)
             test_dl = data.DataLoader(dataset=test_ds,
                                       batch_size=test_bs,
                                       shuffle=True,
-                                      drop_last=False)
+                                      drop_last=False,
+                                      collate_fn=collate_fn)
 
         return train_dl, test_dl
 
 
 def load_partition_data_distributed_federated_stackoverflow_lr(
-        process_id, dataset, data_dir, batch_size=DEFAULT_BATCH_SIZE):
+        process_id, dataset, data_dir, batch_size=DEFAULT_BATCH_SIZE, sparse=False):
 
     # get global dataset
     if process_id == 0:
         train_data_global, test_data_global = get_dataloader(
-            dataset, data_dir, batch_size, batch_size, process_id - 1)
+            dataset, data_dir, batch_size, batch_size, process_id - 1, sparse=sparse)
         # train_data_num = len(train_data_global.dataset)
         # test_data_num = len(test_data_global.dataset)
         # logging.info("train_dl_global number = " + str(train_data_num))
@@ -92,7 +87,7 @@ def load_partition_data_distributed_federated_stackoverflow_lr(
     else:
         # get local dataset
         train_data_local, test_data_local = get_dataloader(
-            dataset, data_dir, batch_size, batch_size, process_id - 1)
+            dataset, data_dir, batch_size, batch_size, process_id - 1, sparse=sparse)
         local_data_num = len(train_data_local.dataset)
         # logging.info("rank = %d, local_sample_number = %d" %
         #              (process_id, local_data_num))
@@ -103,10 +98,10 @@ def load_partition_data_distributed_federated_stackoverflow_lr(
 
 
 def load_partition_data_federated_stackoverflow_lr(
-        dataset, data_dir, batch_size=DEFAULT_BATCH_SIZE):
+        dataset, data_dir, batch_size=DEFAULT_BATCH_SIZE, sparse=False):
     logging.info("load_partition_data_federated_stackoverflow_lr START")
 
-    cache_path = os.path.join(data_dir, DEFAULT_CACHE_FILE)
+    cache_path = os.path.join(data_dir, DEFAULT_SPARSE_CACHE_FILE if sparse else DEFAULT_CACHE_FILE)
     if os.path.exists(cache_path):
         #load cache
         with open(cache_path, 'rb') as cache_file:
@@ -116,41 +111,14 @@ def load_partition_data_federated_stackoverflow_lr(
             train_data_global = cache_data['train_data_global']
             test_data_global = cache_data['test_data_global']
             data_local_num_dict = cache_data['data_local_num_dict']
-            train_data_local_dict = cache_data['train_data_local_dict']
-            test_data_local_dict = cache_data['test_data_local_dict']
             output_dim = cache_data['output_dim']
 
     else:
-        # get local dataset
-        data_local_num_dict = dict()
-        train_data_local_dict = dict()
-        test_data_local_dict = dict()
-
-        for client_idx in tqdm.tqdm(range(DEFAULT_TRAIN_CLIENTS_NUM)):
-            train_data_local, test_data_local = get_dataloader(
-                dataset, data_dir, batch_size, batch_size, client_idx)
-            local_data_num = len(train_data_local.dataset)
-            data_local_num_dict[client_idx] = local_data_num
-            # logging.info("client_idx = %d, local_sample_number = %d" %
-            #              (client_idx, local_data_num if test_data_local==None else len(test_data_local.dataset)))
-            # logging.info(
-            #     "client_idx = %d, batch_num_train_local = %d"
-            # % (client_idx, len(train_data_local)))
-            train_data_local_dict[client_idx] = train_data_local
-            test_data_local_dict[client_idx] = test_data_local
-
-        train_data_global = data.DataLoader(data.ConcatDataset(
-            list(dl.dataset for dl in list(train_data_local_dict.values()))),
-                                            batch_size=batch_size,
-                                            shuffle=True)
+        train_data_global, test_data_global = get_dataloader(dataset, data_dir, batch_size, batch_size, sparse=sparse)
         train_data_num = len(train_data_global.dataset)
-
-        test_data_global = data.DataLoader(data.ConcatDataset(
-            list(dl.dataset for dl in list(test_data_local_dict.values())
-                if dl is not None)),
-                                        batch_size=batch_size,
-                                        shuffle=True)
         test_data_num = len(test_data_global.dataset)
+        data_local_num_dict = {client_idx: len(train_ds)
+                               for client_idx, train_ds in enumerate(train_data_global.dataset.datasets)}
 
         output_dim = len(utils.get_tag_dict(data_dir))
 
@@ -162,11 +130,14 @@ def load_partition_data_federated_stackoverflow_lr(
             cache_data['train_data_global'] = train_data_global
             cache_data['test_data_global'] = test_data_global
             cache_data['data_local_num_dict'] = data_local_num_dict
-            cache_data['train_data_local_dict'] = train_data_local_dict
-            cache_data['test_data_local_dict'] = test_data_local_dict
             cache_data['output_dim'] = output_dim
             cache_data = pickle.dump(cache_data, cache_file)
 
+    # the client DataLoaders are built on first access
+    train_data_local_dict, test_data_local_dict = lazy_client_dicts(
+        range(DEFAULT_TRAIN_CLIENTS_NUM),
+        lambda client_idx: get_dataloader(dataset, data_dir, batch_size, batch_size, client_idx, sparse=sparse))
+
     return DEFAULT_TRAIN_CLIENTS_NUM, train_data_num, test_data_num, train_data_global, test_data_global, \
            data_local_num_dict, train_data_local_dict, test_data_local_dict, output_dim
 
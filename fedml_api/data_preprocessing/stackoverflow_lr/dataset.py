@@ -1,22 +1,50 @@
-import h5py
-
+import numpy as np
+import torch
 import torch.utils.data as data
 
+from . import utils
+from ..h5_client_cache import client_examples, get_h5_file
+
+
+class _ClientBagOfWords(object):
+    """CSR bag-of-words inputs and tag counts of all of one client's examples."""
+
+    def __init__(self, words, tags):
+        self.words = words
+        self.tags = tags
+
+    def __len__(self):
+        return len(self.tags[0]) - 1
+
+    @staticmethod
+    def row(csr, idx):
+        indptr, indices, values = csr
+        return indices[indptr[idx]:indptr[idx + 1]], values[indptr[idx]:indptr[idx + 1]]
+
+
+def sparse_collate(batch):
+    """collate_fn of datasets created with sparse=True: stacks the inputs into one sparse COO batch."""
+    return torch.stack([x for x, _ in batch]), torch.from_numpy(np.stack([tag for _, tag in batch]))
+
+
 class StackOverflowDataset(data.Dataset):
     """StackOverflow dataset"""
 
     __train_client_id_list = None
     __test_client_id_list = None
 
-    def __init__(self, h5_path, client_idx, datast, preprocess=None):
+    def __init__(self, h5_path, client_idx, datast, preprocess=None, data_dir=None, sparse=False):
         """
         Args:
             h5_path (string) : path to the h5 file
             client_idx (idx) : index of train file
             datast (string) : "train" or "test" denoting on train set or test set
             preprocess (dict of callable, optional) : Optional preprocessing, with key "input", "target"
+            data_dir (string, optional) : directory of the word/tag count files; if given, the client's examples are
+                converted to bag-of-words / tag vectors in bulk instead of calling `preprocess` per example
+            sparse (bool) : with `data_dir`, return the input as a torch sparse vector (use `sparse_collate`)
         """
-        
+
         self._EXAMPLE = 'examples'
         self._TOKENS = 'tokens'
         self._TITLE = 'title'
@@ -30,38 +58,74 @@ class StackOverflowDataset(data.Dataset):
         if preprocess:
             self.input_fn = preprocess["input"]
             self.target_fn = preprocess["target"]
+        self.data_dir = data_dir
+        self.sparse = sparse
+        self._len = None
 
     def get_client_id_list(self):
         if self.datast == "train":
-            if StackOverflowDataset.__train_client_id_list is None:       
-                with h5py.File(self.h5_path, 'r') as h5_file:
-                    StackOverflowDataset.__train_client_id_list = list(h5_file[self._EXAMPLE].keys())
+            if StackOverflowDataset.__train_client_id_list is None:
+                StackOverflowDataset.__train_client_id_list = list(get_h5_file(self.h5_path)[self._EXAMPLE].keys())
             return StackOverflowDataset.__train_client_id_list
         elif self.datast == "test":
-            if StackOverflowDataset.__test_client_id_list is None:       
-                with h5py.File(self.h5_path, 'r') as h5_file:
-                    StackOverflowDataset.__test_client_id_list = list(h5_file[self._EXAMPLE].keys())
-            return StackOverflowDataset.__test_client_id_list 
+            if StackOverflowDataset.__test_client_id_list is None:
+                StackOverflowDataset.__test_client_id_list = list(get_h5_file(self.h5_path)[self._EXAMPLE].keys())
+            return StackOverflowDataset.__test_client_id_list
         else:
-            raise Exception ("Please specify either train or test set!") 
+            raise Exception ("Please specify either train or test set!")
+
+    def _load_examples(self):
+        # one read of each of the client's columns, decoded into a list of (sample, tag) strings
+        client = get_h5_file(self.h5_path)[self._EXAMPLE][self.client_id]
+        return [(' '.join([raw_token.decode('utf8'), raw_title.decode('utf8')]), tag.decode('utf8'))
+                for raw_token, raw_title, tag in zip(client[self._TOKENS][()], client[self._TITLE][()],
+                                                     client[self._TAGS][()])]
 
+    def _load_bag_of_words(self):
+        # one read of each column and one vectorized conversion for all of the client's examples
+        client = get_h5_file(self.h5_path)[self._EXAMPLE][self.client_id]
+        samples = [' '.join([raw_token.decode('utf8'), raw_title.decode('utf8')])
+                   for raw_token, raw_title in zip(client[self._TOKENS][()], client[self._TITLE][()])]
+        tags = [tag.decode('utf8') for tag in client[self._TAGS][()]]
+        word_ids, word_lengths = utils.sentences_to_ids(samples, self.data_dir)
+        tag_ids, tag_lengths = utils.tags_to_ids(tags, self.data_dir)
+        return _ClientBagOfWords(
+            utils.bag_of_words_csr(word_ids, word_lengths, len(utils.get_word_dict(self.data_dir))),
+            utils.bag_of_words_csr(tag_ids, tag_lengths, len(utils.get_tag_dict(self.data_dir)), normalize=False))
+
+    def _get_bag_of_words(self, idx):
+        examples = client_examples.get(("stackoverflow_lr_bow", self.h5_path, self.client_id),
+                                       self._load_bag_of_words)
+        vocab_size = len(utils.get_word_dict(self.data_dir))
+        word_indices, word_values = examples.row(examples.words, idx)
+        if self.sparse:
+            sample = torch.sparse_coo_tensor(torch.from_numpy(word_indices).unsqueeze(0),
+                                             torch.from_numpy(word_values), (vocab_size,))
+        else:
+            sample = np.zeros(vocab_size, dtype=np.float32)
+            sample[word_indices] = word_values
+        tag_indices, tag_values = examples.row(examples.tags, idx)
+        tag = np.zeros(len(utils.get_tag_dict(self.data_dir)), dtype=np.float32)
+        tag[tag_indices] = tag_values
+        return sample, tag
 
     def __len__(self):
-        with h5py.File(self.h5_path, 'r') as h5_file:
-            return len(h5_file[self._EXAMPLE][self.client_id][self._TAGS][()])
+        if self._len is None:
+            # the length is read from the h5 metadata, without loading the examples
+            self._len = len(get_h5_file(self.h5_path)[self._EXAMPLE][self.client_id][self._TAGS])
+        return self._len
 
     def __getitem__(self, idx):
-        with h5py.File(self.h5_path, 'r') as h5_file:
-            if idx > self.__len__():
-                return None
-            raw_token = h5_file[self._EXAMPLE][self.client_id][self._TOKENS][()][idx].decode('utf8')
-            raw_title = h5_file[self._EXAMPLE][self.client_id][self._TITLE][()][idx].decode('utf8')
-            sample = ' '.join([raw_token, raw_title])
-            tag = h5_file[self._EXAMPLE][self.client_id][self._TAGS][()][idx].decode('utf8')
-
-            if self.input_fn:
-                sample = self.input_fn(sample)
-            if self.target_fn:
-                tag = self.target_fn(tag)
-
-        return (sample, tag)
\ No newline at end of file
+        if idx > self.__len__():
+            return None
+        if self.data_dir is not None:
+            return self._get_bag_of_words(idx)
+        sample, tag = client_examples.get(("stackoverflow_lr", self.h5_path, self.client_id),
+                                          self._load_examples)[idx]
+
+        if self.input_fn:
+            sample = self.input_fn(sample)
+        if self.target_fn:
+            tag = self.target_fn(tag)
+
+        return (sample, tag)
@@ -62,88 +62,75 @@ def get_tag_dict(data_dir):
     return tag_dict
 
 
-def preprocess_inputs(sentences, data_dir):
+def _split_to_ids(texts, separator, id_dict):
+    # one dict lookup per token and one numpy conversion for the whole batch; unknown tokens map to len(id_dict)
+    splits = [text.split(separator) for text in texts]
+    lengths = np.fromiter((len(split) for split in splits), dtype=np.int64, count=len(splits))
+    oov_id = len(id_dict)
+    ids = np.fromiter((id_dict.get(token, oov_id) for split in splits for token in split), dtype=np.int64,
+                      count=int(lengths.sum()))
+    return ids, lengths
 
-    sentences = [sentence.split(' ') for sentence in sentences]
-    vocab_size = len(get_word_dict(data_dir))
 
-    def word_to_id(word):
-        word_dict = get_word_dict(data_dir)
-        if word in word_dict:
-            return word_dict[word]
-        else:
-            return len(word_dict)
+def sentences_to_ids(sentences, data_dir):
+    """Word ids of all `sentences` concatenated, plus the number of words of each sentence."""
+    return _split_to_ids(sentences, ' ', get_word_dict(data_dir))
 
-    def to_bag_of_words(sentence):
-        tokens = [word_to_id(token) for token in sentence]
-        onehot = np.zeros((len(tokens), vocab_size + 1))
-        onehot[np.arange(len(tokens)), tokens] = 1
-        return np.mean(onehot, axis=0)[:vocab_size]
 
-    return [to_bag_of_words(sentence) for sentence in sentences]
+def tags_to_ids(tags, data_dir):
+    """Tag ids of all '|'-separated `tags` concatenated, plus the number of tags of each example."""
+    return _split_to_ids(tags, '|', get_tag_dict(data_dir))
 
 
-def preprocess_targets(tags, data_dir):
+def bag_of_words_csr(ids, lengths, size, normalize=True):
+    """CSR (indptr, indices, values) rows of per-example id counts, as produced by `sentences_to_ids`.
 
-    tags = [tag.split('|') for tag in tags]
-    tag_size = len(get_tag_dict(data_dir))
-    
-    def tag_to_id(tag):
-        tag_dict = get_tag_dict(data_dir)
-        if tag in tag_dict:
-            return tag_dict[tag]
-        else:
-            return len(tag_dict)
+    Ids >= size (out of vocabulary) are counted in the row length but dropped from the row. With `normalize`
+    the counts are divided by the row length, i.e. the mean of the one-hot vectors.
+    """
+    row_num = len(lengths)
+    rows = np.repeat(np.arange(row_num), lengths)
+    keys, counts = np.unique(rows * (size + 1) + ids, return_counts=True)
+    rows, indices = np.divmod(keys, size + 1)
+    values = counts.astype(np.float32)
+    if normalize:
+        values /= lengths[rows]
+    in_vocab = indices < size
+    rows, indices, values = rows[in_vocab], indices[in_vocab], values[in_vocab]
+    indptr = np.zeros(row_num + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=row_num), out=indptr[1:])
+    return indptr, indices, values
 
-    def to_bag_of_words(tag):
-        tag = [tag_to_id(t) for t in tag]
-        onehot = np.zeros((len(tag), tag_size + 1))
-        onehot[np.arange(len(tag)), tag] = 1
-        return np.sum(onehot, axis=0, dtype=np.float32)#[:tag_size]
 
-    return [to_bag_of_words(tag) for tag in tags]
+def csr_to_dense(indptr, indices, values, size, dtype=np.float32):
+    dense = np.zeros((len(indptr) - 1, size), dtype=dtype)
+    dense[np.repeat(np.arange(len(indptr) - 1), np.diff(indptr)), indices] = values
+    return dense
 
 
-def preprocess_input(sentence, data_dir):
-
-    sentence = sentence.split(' ')
+def preprocess_inputs(sentences, data_dir):
     vocab_size = len(get_word_dict(data_dir))
+    ids, lengths = sentences_to_ids(sentences, data_dir)
+    return list(csr_to_dense(*bag_of_words_csr(ids, lengths, vocab_size), vocab_size, dtype=np.float64))
 
-    def word_to_id(word):
-        word_dict = get_word_dict(data_dir)
-        if word in word_dict:
-            return word_dict[word]
-        else:
-            return len(word_dict)
 
-    def to_bag_of_words(sentence):
-        tokens = [word_to_id(token) for token in sentence]
-        onehot = np.zeros((len(tokens), vocab_size + 1))
-        onehot[np.arange(len(tokens)), tokens] = 1
-        return np.mean(onehot, axis=0, dtype=np.float32)[:vocab_size]
+def preprocess_targets(tags, data_dir):
+    # unlike preprocess_target, the out-of-vocabulary tag count is kept as the last column
+    tag_size = len(get_tag_dict(data_dir))
+    ids, lengths = tags_to_ids(tags, data_dir)
+    return list(csr_to_dense(*bag_of_words_csr(ids, lengths, tag_size + 1, normalize=False), tag_size + 1))
+
 
-    return to_bag_of_words(sentence)
+def preprocess_input(sentence, data_dir):
+    vocab_size = len(get_word_dict(data_dir))
+    ids, _ = sentences_to_ids([sentence], data_dir)
+    return (np.bincount(ids, minlength=vocab_size + 1)[:vocab_size] / np.float32(len(ids))).astype(np.float32)
 
 
 def preprocess_target(tag, data_dir):
-
-    tag = tag.split('|')
     tag_size = len(get_tag_dict(data_dir))
-    
-    def tag_to_id(tag):
-        tag_dict = get_tag_dict(data_dir)
-        if tag in tag_dict:
-            return tag_dict[tag]
-        else:
-            return len(tag_dict)
-
-    def to_bag_of_words(tag):
-        tag = [tag_to_id(t) for t in tag]
-        onehot = np.zeros((len(tag), tag_size + 1))
-        onehot[np.arange(len(tag)), tag] = 1
-        return np.sum(onehot, axis=0, dtype=np.float32)[:tag_size]
-
-    return to_bag_of_words(tag)
+    ids, _ = tags_to_ids([tag], data_dir)
+    return np.bincount(ids, minlength=tag_size + 1)[:tag_size].astype(np.float32)
 
 
 if __name__ == "__main__":
@@ -3,11 +3,10 @@ import logging
 import os
 import pickle
 
-import tqdm
-
 import torch.utils.data as data
 
 from . import utils
+from ..lazy_client_dict import lazy_client_dicts
 from .dataset import StackOverflowDataset
 
 
@@ -31,7 +30,7 @@ def get_dataloader(dataset, data_dir, train_bs, test_bs, client_idx=None):
 
         train_dl = data.DataLoader(data.ConcatDataset(
             StackOverflowDataset(
-                os.path.join(data_dir, DEFAULT_TRAIN_FILE), client_idx, _tokenizer) 
+                os.path.join(data_dir, DEFAULT_TRAIN_FILE), client_idx, "train", _tokenizer)
                 for client_idx in range(DEFAULT_TRAIN_CLIENTS_NUM)),
                                    batch_size=train_bs,
                                    shuffle=True)
@@ -106,43 +105,14 @@ def load_partition_data_federated_stackoverflow_nwp(dataset, data_dir, batch_siz
             train_data_global = cache_data['train_data_global']
             test_data_global = cache_data['test_data_global']
             data_local_num_dict = cache_data['data_local_num_dict']
-            train_data_local_dict = cache_data['train_data_local_dict']
-            test_data_local_dict = cache_data['test_data_local_dict']
             VOCAB_LEN = cache_data['VOCAB_LEN']
 
     else:
-        # get local dataset
-        data_local_num_dict = dict()
-        train_data_local_dict = dict()
-        test_data_local_dict = dict()
-        
-        for client_idx in tqdm.tqdm(range(DEFAULT_TRAIN_CLIENTS_NUM)):
-
-            train_data_local, test_data_local = get_dataloader(
-                dataset, data_dir, batch_size, batch_size, client_idx)
-            local_data_num = len(train_data_local.dataset)
-            data_local_num_dict[client_idx] = local_data_num
-            # logging.info("client_idx = %d, local_sample_number = %d" %
-            #              (client_idx, local_data_num))
-            # logging.info(
-            #     "client_idx = %d, batch_num_train_local = %d"
-            #     % (client_idx, len(train_data_local)))
-            train_data_local_dict[client_idx] = train_data_local
-            test_data_local_dict[client_idx] = test_data_local
-
-        train_data_global = data.DataLoader(
-                    data.ConcatDataset(
-                        list(dl.dataset for dl in list(train_data_local_dict.values()))
-                    ),
-                    batch_size=batch_size, shuffle=True)
+        train_data_global, test_data_global = get_dataloader(dataset, data_dir, batch_size, batch_size)
         train_data_num = len(train_data_global.dataset)
-        
-        test_data_global = data.DataLoader(
-                data.ConcatDataset(
-                    list(dl.dataset for dl in list(test_data_local_dict.values()) if dl is not None)
-                ),
-                batch_size=batch_size, shuffle=True)
         test_data_num = len(test_data_global.dataset)
+        data_local_num_dict = {client_idx: len(train_ds)
+                               for client_idx, train_ds in enumerate(train_data_global.dataset.datasets)}
 
         VOCAB_LEN = len(utils.get_word_dict(data_dir)) + 1
 
@@ -154,11 +124,14 @@ def load_partition_data_federated_stackoverflow_nwp(dataset, data_dir, batch_siz
             cache_data['train_data_global'] = train_data_global
             cache_data['test_data_global'] = test_data_global
             cache_data['data_local_num_dict'] = data_local_num_dict
-            cache_data['train_data_local_dict'] = train_data_local_dict
-            cache_data['test_data_local_dict'] = test_data_local_dict
             cache_data['VOCAB_LEN'] = VOCAB_LEN
             cache_data = pickle.dump(cache_data, cache_file)
 
+    # the client DataLoaders are built on first access
+    train_data_local_dict, test_data_local_dict = lazy_client_dicts(
+        range(DEFAULT_TRAIN_CLIENTS_NUM),
+        lambda client_idx: get_dataloader(dataset, data_dir, batch_size, batch_size, client_idx))
+
     return DEFAULT_TRAIN_CLIENTS_NUM, train_data_num, test_data_num, train_data_global, test_data_global, \
         data_local_num_dict, train_data_local_dict, test_data_local_dict, VOCAB_LEN
 
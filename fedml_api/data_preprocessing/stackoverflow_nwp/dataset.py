@@ -1,7 +1,8 @@
-import h5py
 import numpy as np
 import torch.utils.data as data
 
+from ..h5_client_cache import client_examples, get_h5_file
+
 class StackOverflowDataset(data.Dataset):
     """StackOverflow dataset"""
 
@@ -16,7 +17,7 @@ class StackOverflowDataset(data.Dataset):
             datast (string) : "train" or "test" denoting on train set or test set
             preprocess (callable, optional) : Optional preprocessing
         """
-        
+
         self._EXAMPLE = 'examples'
         self._TOKENS = 'tokens'
 
@@ -24,28 +25,31 @@ class StackOverflowDataset(data.Dataset):
         self.datast = datast
         self.client_id = self.get_client_id_list()[client_idx]
         self.preprocess = preprocess
+        self._len = None
 
     def get_client_id_list(self):
         if self.datast == "train":
-            if StackOverflowDataset.__train_client_id_list is None:       
-                with h5py.File(self.h5_path, 'r') as h5_file:
-                    StackOverflowDataset.__train_client_id_list = list(h5_file[self._EXAMPLE].keys())
+            if StackOverflowDataset.__train_client_id_list is None:
+                StackOverflowDataset.__train_client_id_list = list(get_h5_file(self.h5_path)[self._EXAMPLE].keys())
             return StackOverflowDataset.__train_client_id_list
         elif self.datast == "test":
-            if StackOverflowDataset.__test_client_id_list is None:       
-                with h5py.File(self.h5_path, 'r') as h5_file:
-                    StackOverflowDataset.__test_client_id_list = list(h5_file[self._EXAMPLE].keys())
-            return StackOverflowDataset.__test_client_id_list 
+            if StackOverflowDataset.__test_client_id_list is None:
+                StackOverflowDataset.__test_client_id_list = list(get_h5_file(self.h5_path)[self._EXAMPLE].keys())
+            return StackOverflowDataset.__test_client_id_list
         else:
-            raise Exception ("Please specify either train or test set!") 
+            raise Exception ("Please specify either train or test set!")
 
+    def _load_examples(self):
+        # one read of the client's sentences, tokenized into a (sample_num, max_seq_len + 1) int32 array
+        sentences = get_h5_file(self.h5_path)[self._EXAMPLE][self.client_id][self._TOKENS][()]
+        return np.asarray([self.preprocess(sentence.decode('utf8')) for sentence in sentences], dtype=np.int32)
 
     def __len__(self):
-        with h5py.File(self.h5_path, 'r') as h5_file:
-            return len(h5_file[self._EXAMPLE][self.client_id][self._TOKENS][()])
+        if self._len is None:
+            # the length is read from the h5 metadata, without loading the sentences
+            self._len = len(get_h5_file(self.h5_path)[self._EXAMPLE][self.client_id][self._TOKENS])
+        return self._len
 
     def __getitem__(self, idx):
-        with h5py.File(self.h5_path, 'r') as h5_file:
-            sample = h5_file[self._EXAMPLE][self.client_id][self._TOKENS][()][idx].decode('utf8')
-            sample = self.preprocess(sample)
-        return np.asarray(sample[:-1]), np.asarray(sample[1:])
\ No newline at end of file
+        sample = client_examples.get(("stackoverflow_nwp", self.h5_path, self.client_id), self._load_examples)[idx]
+        return sample[:-1].astype(np.int64), sample[1:].astype(np.int64)
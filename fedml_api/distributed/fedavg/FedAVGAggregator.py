@@ -1,5 +1,6 @@
 import copy
 import logging
+import math
 import random
 import time
 
@@ -7,6 +8,13 @@ import numpy as np
 import torch
 import wandb
 
+try:
+    from fedml_core.aggregation.flat_aggregation import FlatAggregator, StreamingAggregator
+    from fedml_core.trainer.evaluation import BackgroundEvaluation, evaluate_clients, stratified_client_sample
+except ImportError:
+    from FedML.fedml_core.aggregation.flat_aggregation import FlatAggregator, StreamingAggregator
+    from FedML.fedml_core.trainer.evaluation import BackgroundEvaluation, evaluate_clients, stratified_client_sample
+
 from .utils import transform_list_to_tensor
 
 
@@ -29,7 +37,17 @@ class FedAVGAggregator(object):
 
         self.worker_num = worker_num
         self.device = device
-        self.model_dict = dict()
+        if getattr(self.args, "streaming_aggregation", 0) == 1:
+            # fold each upload into a running weighted sum in the receive handler instead of caching worker_num models
+            self.flat_aggregator = StreamingAggregator()
+        else:
+            self.flat_aggregator = FlatAggregator(self.worker_num)
+        self.background_evaluation = BackgroundEvaluation() if getattr(args, "async_evaluation", 0) == 1 else None
+        # with over-selection a round is aggregated once this many of the worker_num sampled clients have reported
+        self.aggregation_target = max(1, int(math.ceil(worker_num / (1.0 + getattr(args, "over_selection_rate", 0)))))
+        self.latency_bias = getattr(args, "latency_bias", 0)
+        # client index -> moving average of the time from dispatching its model to receiving its upload
+        self.client_latency = dict()
         self.sample_num_dict = dict()
         self.flag_client_model_uploaded_dict = dict()
         for idx in range(self.worker_num):
@@ -43,42 +61,33 @@ class FedAVGAggregator(object):
 
     def add_local_trained_result(self, index, model_params, sample_num):
         logging.info("add_model. index = %d" % index)
-        self.model_dict[index] = model_params
+        if self.args.is_mobile == 1:
+            model_params = transform_list_to_tensor(model_params)
+        self.flat_aggregator.add(index, model_params, sample_num)
         self.sample_num_dict[index] = sample_num
         self.flag_client_model_uploaded_dict[index] = True
 
+    def received_indexes(self):
+        return [idx for idx in range(self.worker_num) if self.flag_client_model_uploaded_dict[idx]]
+
     def check_whether_all_receive(self):
+        """True once `aggregation_target` workers (all of them without over-selection) have uploaded."""
         logging.debug("worker_num = {}".format(self.worker_num))
-        for idx in range(self.worker_num):
-            if not self.flag_client_model_uploaded_dict[idx]:
-                return False
-        for idx in range(self.worker_num):
-            self.flag_client_model_uploaded_dict[idx] = False
-        return True
+        return len(self.received_indexes()) >= self.aggregation_target
 
     def aggregate(self):
         start_time = time.time()
-        model_list = []
-        training_num = 0
+        logging.info("len of self.sample_num_dict = " + str(len(self.sample_num_dict)))
 
+        # weighted average of the models uploaded in this round (a single vector-matrix product, or the finished
+        # running sum); after a deadline these are only the workers that made it, reweighted by their sample numbers
+        indexes = self.received_indexes()
+        if len(indexes) < self.worker_num and isinstance(self.flat_aggregator, FlatAggregator):
+            averaged_params = self.flat_aggregator.aggregate(indexes)
+        else:
+            averaged_params = self.flat_aggregator.aggregate()
         for idx in range(self.worker_num):
-            if self.args.is_mobile == 1:
-                self.model_dict[idx] = transform_list_to_tensor(self.model_dict[idx])
-            model_list.append((self.sample_num_dict[idx], self.model_dict[idx]))
-            training_num += self.sample_num_dict[idx]
-
-        logging.info("len of self.model_dict[idx] = " + str(len(self.model_dict)))
-
-        # logging.info("################aggregate: %d" % len(model_list))
-        (num0, averaged_params) = model_list[0]
-        for k in averaged_params.keys():
-            for i in range(0, len(model_list)):
-                local_sample_number, local_model_params = model_list[i]
-                w = local_sample_number / training_num
-                if i == 0:
-                    averaged_params[k] = local_model_params[k] * w
-                else:
-                    averaged_params[k] += local_model_params[k] * w
+            self.flag_client_model_uploaded_dict[idx] = False
 
         # update the global model which is cached at the server side
         self.set_global_model_params(averaged_params)
@@ -93,10 +102,28 @@ class FedAVGAggregator(object):
         else:
             num_clients = min(client_num_per_round, client_num_in_total)
             np.random.seed(round_idx)  # make sure for each comparison, we are selecting the same clients each round
-            client_indexes = np.random.choice(range(client_num_in_total), num_clients, replace=False)
+            if self.latency_bias > 0 and self.client_latency:
+                p = self._latency_sampling_probabilities(client_num_in_total)
+                client_indexes = np.random.choice(range(client_num_in_total), num_clients, replace=False, p=p)
+            else:
+                client_indexes = np.random.choice(range(client_num_in_total), num_clients, replace=False)
         logging.info("client_indexes = %s" % str(client_indexes))
         return client_indexes
 
+    def record_client_latency(self, client_index, latency):
+        client_index = int(client_index)
+        if client_index in self.client_latency:
+            latency = 0.5 * (self.client_latency[client_index] + latency)
+        self.client_latency[client_index] = latency
+
+    def _latency_sampling_probabilities(self, client_num_in_total):
+        # clients without a measurement count as median ones, so they keep being explored
+        latencies = np.full(client_num_in_total, np.median(list(self.client_latency.values())))
+        for client_index, latency in self.client_latency.items():
+            latencies[client_index] = latency
+        weights = np.maximum(latencies, 1e-3) ** -self.latency_bias
+        return weights / weights.sum()
+
     def _generate_validation_set(self, num_samples=10000):
         if self.args.dataset.startswith("stackoverflow"):
             test_data_num  = len(self.test_global.dataset)
@@ -113,52 +140,59 @@ class FedAVGAggregator(object):
 
         if round_idx % self.args.frequency_of_the_test == 0 or round_idx == self.args.comm_round - 1:
             logging.info("################test_on_server_for_all_clients : {}".format(round_idx))
-            train_num_samples = []
-            train_tot_corrects = []
-            train_losses = []
-            for client_idx in range(self.args.client_num_in_total):
-                # train data
-                metrics = self.trainer.test(self.train_data_local_dict[client_idx], self.device, self.args)
-                train_tot_correct, train_num_sample, train_loss = metrics['test_correct'], metrics['test_total'], metrics['test_loss']
-                train_tot_corrects.append(copy.deepcopy(train_tot_correct))
-                train_num_samples.append(copy.deepcopy(train_num_sample))
-                train_losses.append(copy.deepcopy(train_loss))
-
-                """
-                Note: CI environment is CPU-based computing. 
-                The training speed for RNN training is to slow in this setting, so we only test a client to make sure there is no programming error.
-                """
-                if self.args.ci == 1:
-                    break
-
-            # test on training dataset
-            train_acc = sum(train_tot_corrects) / sum(train_num_samples)
-            train_loss = sum(train_losses) / sum(train_num_samples)
-            wandb.log({"Train/Acc": train_acc, "round": round_idx})
-            wandb.log({"Train/Loss": train_loss, "round": round_idx})
-            stats = {'training_acc': train_acc, 'training_loss': train_loss}
-            logging.info(stats)
-
-            # test data
-            test_num_samples = []
-            test_tot_corrects = []
-            test_losses = []
-
-            if round_idx == self.args.comm_round - 1:
-                metrics = self.trainer.test(self.test_global, self.device, self.args)
+            client_indexes = stratified_client_sample(range(self.args.client_num_in_total),
+                                                      self.train_data_local_num_dict,
+                                                      getattr(self.args, "eval_client_fraction", 1.0), seed=round_idx)
+            if self.background_evaluation is not None:
+                # evaluate a copy of the global model while the clients train the next round
+                self.background_evaluation.submit(self._test_on_clients, copy.deepcopy(self.trainer),
+                                                  client_indexes, round_idx)
+                if round_idx == self.args.comm_round - 1:
+                    self.background_evaluation.wait()
             else:
-                metrics = self.trainer.test(self.val_global, self.device, self.args)
-                
-            test_tot_correct, test_num_sample, test_loss = metrics['test_correct'], metrics['test_total'], metrics[
-                'test_loss']
-            test_tot_corrects.append(copy.deepcopy(test_tot_correct))
-            test_num_samples.append(copy.deepcopy(test_num_sample))
-            test_losses.append(copy.deepcopy(test_loss))
-
-            # test on test dataset
-            test_acc = sum(test_tot_corrects) / sum(test_num_samples)
-            test_loss = sum(test_losses) / sum(test_num_samples)
-            wandb.log({"Test/Acc": test_acc, "round": round_idx})
-            wandb.log({"Test/Loss": test_loss, "round": round_idx})
-            stats = {'test_acc': test_acc, 'test_loss': test_loss}
-            logging.info(stats)
+                self._test_on_clients(self.trainer, client_indexes, round_idx)
+
+    def _test_on_clients(self, trainer, client_indexes, round_idx):
+        """
+        Note: CI environment is CPU-based computing.
+        The training speed for RNN training is to slow in this setting, so we only test a client to make sure there is no programming error.
+        """
+        if self.args.ci == 1:
+            client_indexes = client_indexes[:1]
+        train_metrics = evaluate_clients(trainer, [self.train_data_local_dict[client_idx]
+                                                   for client_idx in client_indexes], self.device, self.args)
+        train_num_samples = [metrics['test_total'] for metrics in train_metrics]
+        train_tot_corrects = [metrics['test_correct'] for metrics in train_metrics]
+        train_losses = [metrics['test_loss'] for metrics in train_metrics]
+
+        # test on training dataset
+        train_acc = sum(train_tot_corrects) / sum(train_num_samples)
+        train_loss = sum(train_losses) / sum(train_num_samples)
+        wandb.log({"Train/Acc": train_acc, "round": round_idx})
+        wandb.log({"Train/Loss": train_loss, "round": round_idx})
+        stats = {'training_acc': train_acc, 'training_loss': train_loss}
+        logging.info(stats)
+
+        # test data
+        test_num_samples = []
+        test_tot_corrects = []
+        test_losses = []
+
+        if round_idx == self.args.comm_round - 1:
+            metrics = trainer.test(self.test_global, self.device, self.args)
+        else:
+            metrics = trainer.test(self.val_global, self.device, self.args)
+            
+        test_tot_correct, test_num_sample, test_loss = metrics['test_correct'], metrics['test_total'], metrics[
+            'test_loss']
+        test_tot_corrects.append(copy.deepcopy(test_tot_correct))
+        test_num_samples.append(copy.deepcopy(test_num_sample))
+        test_losses.append(copy.deepcopy(test_loss))
+
+        # test on test dataset
+        test_acc = sum(test_tot_corrects) / sum(test_num_samples)
+        test_loss = sum(test_losses) / sum(test_num_samples)
+        wandb.log({"Test/Acc": test_acc, "round": round_idx})
+        wandb.log({"Test/Loss": test_loss, "round": round_idx})
+        stats = {'test_acc': test_acc, 'test_loss': test_loss}
+        logging.info(stats)
@@ -0,0 +1,96 @@
+import logging
+import time
+
+import torch
+
+try:
+    from fedml_core.aggregation.flat_aggregation import FlatModelLayout, flatten_state_dict, unflatten_state_dict
+except ImportError:
+    from FedML.fedml_core.aggregation.flat_aggregation import FlatModelLayout, flatten_state_dict, \
+        unflatten_state_dict
+
+from .FedAVGAggregator import FedAVGAggregator
+from .utils import transform_list_to_tensor
+
+
+def staleness_weight(staleness, exponent):
+    """Polynomial staleness discount (1 + staleness)^-exponent of FedAsync."""
+    return (1.0 + staleness) ** -exponent
+
+
+class FedAVGAsyncAggregator(FedAVGAggregator):
+    """Buffered asynchronous aggregation (FedBuff).
+
+    Every dispatched model is tagged with the global model version it was taken from. An upload is turned into the
+    update it made to that version, discounted by its staleness (the number of global updates since) and added to a
+    buffer; once `async_buffer_size` uploads are buffered, the sample-weighted mean of their updates, scaled by
+    `async_server_lr`, is applied to the global model and the version advances. With no staleness and a server
+    learning rate of 1 a buffer of all workers is exactly a FedAvg round.
+    """
+
+    def __init__(self, train_global, test_global, all_train_data_num,
+                 train_data_local_dict, test_data_local_dict, train_data_local_num_dict, worker_num, device,
+                 args, model_trainer):
+        super().__init__(train_global, test_global, all_train_data_num, train_data_local_dict, test_data_local_dict,
+                         train_data_local_num_dict, worker_num, device, args, model_trainer)
+        self.buffer_size = getattr(args, "async_buffer_size", 0) or max(1, worker_num // 2)
+        self.staleness_exponent = getattr(args, "async_staleness_exponent", 0.5)
+        self.server_lr = getattr(args, "async_server_lr", 1.0)
+
+        global_model_params = self.get_global_model_params()
+        self.layout = FlatModelLayout(global_model_params)
+        self.global_flat = flatten_state_dict(global_model_params, self.layout)
+        self.model_version = 0
+        # the global models that dispatched clients started from, by version, with their number of clients
+        self.version_models = dict()
+        self.version_refs = dict()
+
+        self.update_sum = torch.zeros(self.layout.numel, dtype=self.layout.dtype)
+        self.buffered_sample_num = 0
+        self.buffered_stalenesses = []
+
+    def dispatch_global_model(self):
+        """Registers a client starting from the current global model; returns the model version to tag it with."""
+        if self.model_version not in self.version_models:
+            self.version_models[self.model_version] = self.global_flat.clone()
+            self.version_refs[self.model_version] = 0
+        self.version_refs[self.model_version] += 1
+        return self.model_version
+
+    def add_local_trained_result(self, index, model_params, sample_num, model_version):
+        if self.args.is_mobile == 1:
+            model_params = transform_list_to_tensor(model_params)
+        staleness = self.model_version - model_version
+        logging.info("add_model. index = %d, model version = %d, staleness = %d" % (index, model_version, staleness))
+
+        update = flatten_state_dict(model_params, self.layout)
+        update.sub_(self.version_models[model_version])
+        self.update_sum.add_(update, alpha=sample_num * staleness_weight(staleness, self.staleness_exponent))
+        self.buffered_sample_num += sample_num
+        self.buffered_stalenesses.append(staleness)
+
+        self.version_refs[model_version] -= 1
+        if self.version_refs[model_version] == 0:
+            del self.version_models[model_version]
+            del self.version_refs[model_version]
+
+    def check_whether_buffer_full(self):
+        return len(self.buffered_stalenesses) >= self.buffer_size
+
+    def aggregate(self):
+        start_time = time.time()
+        logging.info("aggregate %d buffered updates, mean staleness %.2f" % (
+            len(self.buffered_stalenesses), sum(self.buffered_stalenesses) / len(self.buffered_stalenesses)))
+        self.global_flat.add_(self.update_sum, alpha=self.server_lr / self.buffered_sample_num)
+        self.model_version += 1
+        self.update_sum.zero_()
+        self.buffered_sample_num = 0
+        self.buffered_stalenesses = []
+
+        # update the global model which is cached at the server side
+        averaged_params = unflatten_state_dict(self.global_flat.clone(), self.layout)
+        self.set_global_model_params(averaged_params)
+
+        end_time = time.time()
+        logging.info("aggregate time cost: %d" % (end_time - start_time))
+        return averaged_params
@@ -1,8 +1,10 @@
 from mpi4py import MPI
 
 from .FedAVGAggregator import FedAVGAggregator
+from .FedAVGAsyncAggregator import FedAVGAsyncAggregator
 from .FedAVGTrainer import FedAVGTrainer
 from .FedAvgClientManager import FedAVGClientManager
+from .FedAvgAsyncServerManager import FedAVGAsyncServerManager
 from .FedAvgServerManager import FedAVGServerManager
 
 from ...standalone.fedavg.my_model_trainer_classification import MyModelTrainer as MyModelTrainerCLS
@@ -93,7 +95,11 @@ def init_server(
 
     # aggregator
     worker_num = size - 1
-    aggregator = FedAVGAggregator(
+    if getattr(args, "async_aggregation", 0) == 1:
+        aggregator_class, server_manager_class = FedAVGAsyncAggregator, FedAVGAsyncServerManager
+    else:
+        aggregator_class, server_manager_class = FedAVGAggregator, FedAVGServerManager
+    aggregator = aggregator_class(
         train_data_global,
         test_data_global,
         train_data_num,
@@ -109,9 +115,9 @@ def init_server(
     # start the distributed training
     backend = args.backend
     if preprocessed_sampling_lists is None:
-        server_manager = FedAVGServerManager(args, aggregator, comm, rank, size, backend)
+        server_manager = server_manager_class(args, aggregator, comm, rank, size, backend)
     else:
-        server_manager = FedAVGServerManager(
+        server_manager = server_manager_class(
             args,
             aggregator,
             comm,
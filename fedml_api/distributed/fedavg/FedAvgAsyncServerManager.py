@@ -0,0 +1,78 @@
+import logging
+
+import numpy as np
+
+from .FedAvgServerManager import FedAVGServerManager
+from .message_define import MyMessage
+from .utils import transform_tensor_to_list
+
+
+class FedAVGAsyncServerManager(FedAVGServerManager):
+    """Asynchronous counterpart of FedAVGServerManager for a FedAVGAsyncAggregator.
+
+    A round does not wait for every worker: each upload goes into the aggregator's buffer, the global model is
+    updated whenever the buffer is full, and the worker that uploaded immediately gets the newest global model with
+    a fresh client, so fast workers never idle behind a straggler. The server tracks the model version each worker
+    trains on; `comm_round` counts global model updates. The messages are those of the synchronous protocol.
+    """
+
+    def __init__(self, args, aggregator, comm=None, rank=0, size=0, backend="MPI", is_preprocessed=False,
+                 preprocessed_client_lists=None):
+        super().__init__(args, aggregator, comm, rank, size, backend, is_preprocessed, preprocessed_client_lists)
+        if is_preprocessed:
+            logging.warning("the asynchronous server samples its clients itself, the preprocessed lists are ignored")
+        self.rng = np.random.RandomState(0)
+        # worker index -> client index it trains and global model version it started from
+        self.worker_client_index = dict()
+        self.worker_model_version = dict()
+
+    def send_init_msg(self):
+        client_indexes = self.aggregator.client_sampling(self.round_idx, self.args.client_num_in_total,
+                                                         self.size - 1)
+        for worker_idx, client_index in enumerate(client_indexes):
+            self.worker_client_index[worker_idx] = client_index
+            self.worker_model_version[worker_idx] = self.aggregator.dispatch_global_model()
+        global_model_params = self.aggregator.get_global_model_params()
+        if self.args.is_mobile == 1:
+            global_model_params = transform_tensor_to_list(global_model_params)
+        self.send_message_init_config_to_all_clients(global_model_params, client_indexes)
+
+    def handle_message_receive_model_from_client(self, msg_params):
+        sender_id = msg_params.get(MyMessage.MSG_ARG_KEY_SENDER)
+        model_params = msg_params.get(MyMessage.MSG_ARG_KEY_MODEL_PARAMS)
+        local_sample_number = msg_params.get(MyMessage.MSG_ARG_KEY_NUM_SAMPLES)
+
+        worker_idx = sender_id - 1
+        del self.worker_client_index[worker_idx]
+        model_version = self.worker_model_version.pop(worker_idx)
+        self.aggregator.add_local_trained_result(worker_idx, model_params, local_sample_number, model_version)
+        if self.aggregator.check_whether_buffer_full():
+            self.aggregator.aggregate()
+            self.aggregator.test_on_server_for_all_clients(self.round_idx)
+
+            self.round_idx += 1
+            if self.round_idx == self.round_num:
+                self.finish()
+                return
+
+        # the idle worker trains a fresh client on the newest global model right away
+        client_index = self._sample_idle_client()
+        self.worker_client_index[worker_idx] = client_index
+        self.worker_model_version[worker_idx] = self.aggregator.dispatch_global_model()
+        global_model_params = self.aggregator.get_global_model_params()
+        if self.args.is_mobile == 1:
+            global_model_params = transform_tensor_to_list(global_model_params)
+        self.send_message_sync_model_to_client(sender_id, global_model_params, client_index)
+
+    def _sample_idle_client(self):
+        # a client that no other worker is training at the moment
+        busy = set(self.worker_client_index.values())
+        idle = [client_index for client_index in range(self.args.client_num_in_total) if client_index not in busy]
+        return idle[self.rng.randint(len(idle))]
+
+    def finish(self):
+        if self.backend != "MPI":
+            # the clients of the asynchronous mode do not count rounds; this client index tells them to stop
+            for receiver_id in range(1, self.size):
+                self.send_message_sync_model_to_client(receiver_id, None, MyMessage.FINISH_CLIENT_INDEX)
+        super().finish()
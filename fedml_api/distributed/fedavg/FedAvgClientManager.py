@@ -51,6 +51,9 @@ class FedAVGClientManager(ClientManager):
         logging.info("handle_message_receive_model_from_server.")
         model_params = msg_params.get(MyMessage.MSG_ARG_KEY_MODEL_PARAMS)
         client_index = msg_params.get(MyMessage.MSG_ARG_KEY_CLIENT_INDEX)
+        if int(client_index) == MyMessage.FINISH_CLIENT_INDEX:
+            self.finish()
+            return
 
         if self.args.is_mobile == 1:
             model_params = transform_list_to_tensor(model_params)
@@ -59,7 +62,8 @@ class FedAVGClientManager(ClientManager):
         self.trainer.update_dataset(int(client_index))
         self.round_idx += 1
         self.__train()
-        if self.round_idx == self.num_rounds - 1:
+        # with asynchronous aggregation the server decides when the run ends
+        if self.round_idx == self.num_rounds - 1 and getattr(self.args, "async_aggregation", 0) != 1:
             # post_complete_message_to_sweep_process(self.args)
             self.finish()
 
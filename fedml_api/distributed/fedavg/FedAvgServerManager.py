@@ -1,6 +1,9 @@
 import logging
 import os, signal
 import sys
+import threading
+import time
+from collections import deque
 
 from .message_define import MyMessage
 from .utils import transform_tensor_to_list, post_complete_message_to_sweep_process
@@ -16,6 +19,10 @@ except ImportError:
 
 
 class FedAVGServerManager(ServerManager):
+    init_config_msg_type = MyMessage.MSG_TYPE_S2C_INIT_CONFIG
+    sync_model_msg_type = MyMessage.MSG_TYPE_S2C_SYNC_MODEL_TO_CLIENT
+    client_index_key = MyMessage.MSG_ARG_KEY_CLIENT_INDEX
+
     def __init__(self, args, aggregator, comm=None, rank=0, size=0, backend="MPI", is_preprocessed=False, preprocessed_client_lists=None):
         super().__init__(args, comm, rank, size, backend)
         self.args = args
@@ -25,6 +32,18 @@ class FedAVGServerManager(ServerManager):
         self.is_preprocessed = is_preprocessed
         self.preprocessed_client_lists = preprocessed_client_lists
 
+        # a round is aggregated with whatever has arrived `round_deadline` seconds after its models were sent
+        self.round_deadline = getattr(args, "round_deadline", 0)
+        self.deadline_timer = None
+        self.deadline_passed = False
+        # the deadline timer and the receive handler both finish rounds
+        self.round_lock = threading.Lock()
+        # worker index -> (round, client index, send time) of the models it has been sent and not answered yet;
+        # a worker answers in order, so an answer to an older round is a straggler's and is ignored
+        self.worker_tasks = dict((worker_idx, deque()) for worker_idx in range(size - 1))
+        # worker index -> time of its last answer; a client queued behind a late task only starts then
+        self.worker_free_time = dict()
+
     def run(self):
         super().run()
 
@@ -35,8 +54,8 @@ class FedAVGServerManager(ServerManager):
         global_model_params = self.aggregator.get_global_model_params()
         if self.args.is_mobile == 1:
             global_model_params = transform_tensor_to_list(global_model_params)
-        for process_id in range(1, self.size):
-            self.send_message_init_config(process_id, global_model_params, client_indexes[process_id - 1])
+        self._start_round(client_indexes)
+        self.send_message_init_config_to_all_clients(global_model_params, client_indexes)
 
     def register_message_receive_handlers(self):
         self.register_message_receive_handler(MyMessage.MSG_TYPE_C2S_SEND_MODEL_TO_SERVER,
@@ -47,39 +66,76 @@ class FedAVGServerManager(ServerManager):
         model_params = msg_params.get(MyMessage.MSG_ARG_KEY_MODEL_PARAMS)
         local_sample_number = msg_params.get(MyMessage.MSG_ARG_KEY_NUM_SAMPLES)
 
-        self.aggregator.add_local_trained_result(sender_id - 1, model_params, local_sample_number)
-        b_all_received = self.aggregator.check_whether_all_receive()
-        logging.info("b_all_received = " + str(b_all_received))
-        if b_all_received:
-            global_model_params = self.aggregator.aggregate()
-            self.aggregator.test_on_server_for_all_clients(self.round_idx)
-
-            # start the next round
-            self.round_idx += 1
-            if self.round_idx == self.round_num:
-                # post_complete_message_to_sweep_process(self.args)
-                self.finish()
-                print('here')
+        with self.round_lock:
+            round_idx, client_index, send_time = self.worker_tasks[sender_id - 1].popleft()
+            receive_time = time.time()
+            start_time = max(send_time, self.worker_free_time.get(sender_id - 1, send_time))
+            self.worker_free_time[sender_id - 1] = receive_time
+            self.aggregator.record_client_latency(client_index, receive_time - start_time)
+            if round_idx != self.round_idx:
+                logging.info("ignore the late model of round %d from client %d" % (round_idx, sender_id))
                 return
-            if self.is_preprocessed:
-                if self.preprocessed_client_lists is None:
-                    # sampling has already been done in data preprocessor
-                    client_indexes = [self.round_idx] * self.args.client_num_per_round
-                else:
-                    client_indexes = self.preprocessed_client_lists[self.round_idx]
+
+            self.aggregator.add_local_trained_result(sender_id - 1, model_params, local_sample_number)
+            b_all_received = self.aggregator.check_whether_all_receive()
+            logging.info("b_all_received = " + str(b_all_received))
+            if b_all_received or self.deadline_passed:
+                self._finish_round()
+
+    def handle_round_deadline(self, round_idx):
+        with self.round_lock:
+            if round_idx != self.round_idx or self.deadline_passed:
+                return
+            self.deadline_passed = True
+            if len(self.aggregator.received_indexes()) == 0:
+                logging.info("no model of round %d has arrived before the deadline, wait for the first" % round_idx)
+                return
+            logging.info("round %d deadline: aggregate %d of %d models" % (
+                round_idx, len(self.aggregator.received_indexes()), self.size - 1))
+            self._finish_round()
+
+    def _start_round(self, client_indexes):
+        send_time = time.time()
+        for worker_idx in range(self.size - 1):
+            self.worker_tasks[worker_idx].append((self.round_idx, client_indexes[worker_idx], send_time))
+        self.deadline_passed = False
+        if self.round_deadline > 0:
+            self.deadline_timer = threading.Timer(self.round_deadline, self.handle_round_deadline,
+                                                  args=(self.round_idx,))
+            self.deadline_timer.daemon = True
+            self.deadline_timer.start()
+
+    def _finish_round(self):
+        if self.deadline_timer is not None:
+            self.deadline_timer.cancel()
+        global_model_params = self.aggregator.aggregate()
+        self.aggregator.test_on_server_for_all_clients(self.round_idx)
+
+        # start the next round
+        self.round_idx += 1
+        if self.round_idx == self.round_num:
+            # post_complete_message_to_sweep_process(self.args)
+            self.finish()
+            print('here')
+            return
+        if self.is_preprocessed:
+            if self.preprocessed_client_lists is None:
+                # sampling has already been done in data preprocessor
+                client_indexes = [self.round_idx] * self.args.client_num_per_round
             else:
-                # sampling clients
-                client_indexes = self.aggregator.client_sampling(self.round_idx, self.args.client_num_in_total,
-                                                                 self.args.client_num_per_round)
-            
-            print('indexes of clients: ' + str(client_indexes))
-            print("size = %d" % self.size)
-            if self.args.is_mobile == 1:
-                global_model_params = transform_tensor_to_list(global_model_params)
-
-            for receiver_id in range(1, self.size):
-                self.send_message_sync_model_to_client(receiver_id, global_model_params,
-                                                       client_indexes[receiver_id - 1])
+                client_indexes = self.preprocessed_client_lists[self.round_idx]
+        else:
+            # sampling clients
+            client_indexes = self.aggregator.client_sampling(self.round_idx, self.args.client_num_in_total,
+                                                             self.args.client_num_per_round)
+
+        print('indexes of clients: ' + str(client_indexes))
+        print("size = %d" % self.size)
+        if self.args.is_mobile == 1:
+            global_model_params = transform_tensor_to_list(global_model_params)
+
+        self._start_round(client_indexes)
+        self.send_message_sync_model_to_all_clients(global_model_params, client_indexes)
 
     def send_message_init_config(self, receive_id, global_model_params, client_index):
         message = Message(MyMessage.MSG_TYPE_S2C_INIT_CONFIG, self.get_sender_id(), receive_id)
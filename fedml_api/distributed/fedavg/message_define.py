@@ -21,6 +21,9 @@ class MyMessage(object):
     MSG_ARG_KEY_MODEL_PARAMS = "model_params"
     MSG_ARG_KEY_CLIENT_INDEX = "client_idx"
 
+    # client index of the model sync that ends the run of an asynchronous client
+    FINISH_CLIENT_INDEX = -1
+
     MSG_ARG_KEY_TRAIN_CORRECT = "train_correct"
     MSG_ARG_KEY_TRAIN_ERROR = "train_error"
     MSG_ARG_KEY_TRAIN_NUM = "train_num_sample"
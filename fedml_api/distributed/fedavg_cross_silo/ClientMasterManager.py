@@ -122,15 +122,23 @@ class ClientMasterManager:
         message = Message(MyMessage.MSG_TYPE_C2S_SEND_MODEL_TO_SERVER, self.client_real_id, receive_id)
         message.add_params(MyMessage.MSG_ARG_KEY_MODEL_PARAMS, weights)
         message.add_params(MyMessage.MSG_ARG_KEY_NUM_SAMPLES, local_sample_num)
-        self.communication_manager.send_message(message)
+        future = self.communication_manager.send_message(message)
         log_round_end(self.rank, self.round_idx)
 
         # Report client model to MLOps
+        round_idx = self.round_idx
+        if future is None:
+            self.report_client_model_info(round_idx, message)
+        else:
+            # with async upload the url is only known once the upload has completed
+            future.add_done_callback(lambda f: self.report_client_model_info(round_idx, f.result()))
+
+    def report_client_model_info(self, round_idx, message):
         model_url = message.get(MyMessage.MSG_ARG_KEY_MODEL_PARAMS_URL)
         model_info = {
             "run_id": self.args.run_id,
             "edge_id": self.client_real_id,
-            "round_idx": self.round_idx+1,
+            "round_idx": round_idx+1,
             "client_model_s3_address": model_url
         }
         self.mlops_logger.report_client_model_info(model_info)
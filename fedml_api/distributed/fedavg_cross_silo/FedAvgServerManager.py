@@ -21,6 +21,10 @@ from fedml_core.distributed.communication.utils import log_round_start, log_roun
 
 
 class FedAVGServerManager(ServerManager):
+    init_config_msg_type = MyMessage.MSG_TYPE_S2C_INIT_CONFIG
+    sync_model_msg_type = MyMessage.MSG_TYPE_S2C_SYNC_MODEL_TO_CLIENT
+    client_index_key = MyMessage.MSG_ARG_KEY_CLIENT_INDEX
+
     def __init__(
         self,
         args,
@@ -49,7 +53,6 @@ class FedAVGServerManager(ServerManager):
         self.mlops_logger.set_messenger(self.com_manager)
         self.dist_aggregator.aggregator.set_mlops_logger(self.mlops_logger)
         self.start_running_time = 0.0
-        self.aggregated_model_url = None
         self.event_sdk = FedEventSDK(self.args)
 
     def run(self):
@@ -77,12 +80,9 @@ class FedAVGServerManager(ServerManager):
             self.round_idx, self.args.data_silo_num_in_total, len(client_id_list_in_this_round)
         )
 
-        client_idx_in_this_round = 0
-        for client_id in client_id_list_in_this_round:
-            self.send_message_init_config(
-                client_id, global_model_params, data_silo_index_list[client_idx_in_this_round]
-            )
-            client_idx_in_this_round += 1
+        self.send_message_init_config_to_all_clients(
+            global_model_params, data_silo_index_list, client_id_list_in_this_round
+        )
 
         self.event_sdk.log_event_ended("aggregator.init")
 
@@ -154,20 +154,9 @@ class FedAVGServerManager(ServerManager):
                 self.round_idx, self.args.data_silo_num_in_total, len(client_id_list_in_this_round)
             )
 
-            client_idx_in_this_round = 0
-            for receiver_id in client_id_list_in_this_round:
-                self.send_message_sync_model_to_client(
-                    receiver_id, global_model_params, data_silo_index_list[client_idx_in_this_round]
-                )
-                client_idx_in_this_round += 1
-
-            model_info = {
-                "run_id": self.args.run_id,
-                "round_idx": self.round_idx+1,
-                "global_aggregated_model_s3_address": self.aggregated_model_url
-            }
-            self.mlops_logger.report_aggregated_model_info(model_info)
-            self.aggregated_model_url = None
+            self.send_message_sync_model_and_report_url(
+                client_id_list_in_this_round, global_model_params, data_silo_index_list
+            )
 
             self.event_sdk.log_event_ended("aggregator.global-aggregate")
 
@@ -189,12 +178,22 @@ class FedAVGServerManager(ServerManager):
         message.add_params(MyMessage.MSG_ARG_KEY_CLIENT_INDEX, str(client_index))
         self.send_message(message)
 
-    def send_message_sync_model_to_client(self, receive_id, global_model_params, data_silo_index):
-        logging.info("send_message_sync_model_to_" "client. receive_id = %d" % receive_id)
-        message = Message(MyMessage.MSG_TYPE_S2C_SYNC_MODEL_TO_CLIENT, self.get_sender_id(), receive_id)
-        message.add_params(MyMessage.MSG_ARG_KEY_MODEL_PARAMS, global_model_params)
-        message.add_params(MyMessage.MSG_ARG_KEY_CLIENT_INDEX, str(data_silo_index))
-        self.send_message(message)
-
-        if self.aggregated_model_url is None:
-            self.aggregated_model_url = message.get(MyMessage.MSG_ARG_KEY_MODEL_PARAMS_URL)
+    def send_message_sync_model_and_report_url(self, receive_ids, global_model_params, data_silo_index_list):
+        # the global model is uploaded once per round; each client only gets its own data silo index
+        future = self.send_message_sync_model_to_all_clients(global_model_params, data_silo_index_list, receive_ids)
+
+        round_idx = self.round_idx
+        if future is None:
+            self.report_aggregated_model_info(round_idx, None)
+        else:
+            # with async upload the url is only known once the upload has completed; the future yields the message
+            future.add_done_callback(lambda f: self.report_aggregated_model_info(
+                round_idx, f.result().get(MyMessage.MSG_ARG_KEY_MODEL_PARAMS_URL)))
+
+    def report_aggregated_model_info(self, round_idx, model_url):
+        model_info = {
+            "run_id": self.args.run_id,
+            "round_idx": round_idx+1,
+            "global_aggregated_model_s3_address": model_url
+        }
+        self.mlops_logger.report_aggregated_model_info(model_info)
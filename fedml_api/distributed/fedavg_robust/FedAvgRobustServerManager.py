@@ -2,11 +2,14 @@ import logging
 
 from fedml_api.distributed.fedavg_robust.message_define import MyMessage
 from fedml_api.distributed.fedavg.utils import transform_tensor_to_list
-from fedml_core.distributed.communication.message import Message
 from fedml_core.distributed.server.server_manager import ServerManager
 
 
 class FedAvgRobustServerManager(ServerManager):
+    init_config_msg_type = MyMessage.MSG_TYPE_S2C_INIT_CONFIG
+    sync_model_msg_type = MyMessage.MSG_TYPE_S2C_SYNC_MODEL_TO_CLIENT
+    client_index_key = MyMessage.MSG_ARG_KEY_CLIENT_INDEX
+
     def __init__(self, args, aggregator, comm=None, rank=0, size=0, backend="MPI"):
         super().__init__(args, comm, rank, size, backend)
         self.args = args
@@ -22,8 +25,7 @@ class FedAvgRobustServerManager(ServerManager):
         client_indexes = self.aggregator.client_sampling(self.round_idx, self.args.client_num_in_total,
                                                          self.args.client_num_per_round)
         global_model_params = self.aggregator.get_global_model_params()
-        for process_id in range(1, self.size):
-            self.send_message_init_config(process_id, global_model_params, client_indexes[process_id-1])
+        self.send_message_init_config_to_all_clients(global_model_params, client_indexes)
 
     def register_message_receive_handlers(self):
         self.register_message_receive_handler(MyMessage.MSG_TYPE_C2S_SEND_MODEL_TO_SERVER,
@@ -58,18 +60,4 @@ class FedAvgRobustServerManager(ServerManager):
                 print("transform_tensor_to_list")
                 global_model_params = transform_tensor_to_list(global_model_params)
 
-            for receiver_id in range(1, self.size):
-                self.send_message_sync_model_to_client(receiver_id, global_model_params, client_indexes[receiver_id-1])
-
-    def send_message_init_config(self, receive_id, global_model_params, client_index):
-        message = Message(MyMessage.MSG_TYPE_S2C_INIT_CONFIG, self.get_sender_id(), receive_id)
-        message.add_params(MyMessage.MSG_ARG_KEY_MODEL_PARAMS, global_model_params)
-        message.add_params(MyMessage.MSG_ARG_KEY_CLIENT_INDEX, str(client_index))
-        self.send_message(message)
-
-    def send_message_sync_model_to_client(self, receive_id, global_model_params, client_index):
-        logging.info("send_message_sync_model_to_client. receive_id = %d" % receive_id)
-        message = Message(MyMessage.MSG_TYPE_S2C_SYNC_MODEL_TO_CLIENT, self.get_sender_id(), receive_id)
-        message.add_params(MyMessage.MSG_ARG_KEY_MODEL_PARAMS, global_model_params)
-        message.add_params(MyMessage.MSG_ARG_KEY_CLIENT_INDEX, str(client_index))
-        self.send_message(message)
\ No newline at end of file
+            self.send_message_sync_model_to_all_clients(global_model_params, client_indexes)
@@ -7,6 +7,11 @@ import numpy as np
 import torch
 import wandb
 
+try:
+    from fedml_core.aggregation.flat_aggregation import FlatAggregator
+except ImportError:
+    from FedML.fedml_core.aggregation.flat_aggregation import FlatAggregator
+
 from .optrepo import OptRepo
 from .utils import transform_list_to_tensor
 
@@ -30,7 +35,7 @@ class FedOptAggregator(object):
 
         self.worker_num = worker_num
         self.device = device
-        self.model_dict = dict()
+        self.flat_aggregator = FlatAggregator(self.worker_num)
         self.sample_num_dict = dict()
         self.flag_client_model_uploaded_dict = dict()
         self.opt = self._instantiate_opt()
@@ -55,7 +60,9 @@ class FedOptAggregator(object):
 
     def add_local_trained_result(self, index, model_params, sample_num):
         logging.info("add_model. index = %d" % index)
-        self.model_dict[index] = model_params
+        if self.args.is_mobile == 1:
+            model_params = transform_list_to_tensor(model_params)
+        self.flat_aggregator.add(index, model_params, sample_num)
         self.sample_num_dict[index] = sample_num
         self.flag_client_model_uploaded_dict[index] = True
 
@@ -69,27 +76,10 @@ class FedOptAggregator(object):
 
     def aggregate(self):
         start_time = time.time()
-        model_list = []
-        training_num = 0
+        logging.info("len of self.sample_num_dict = " + str(len(self.sample_num_dict)))
 
-        for idx in range(self.worker_num):
-            if self.args.is_mobile == 1:
-                self.model_dict[idx] = transform_list_to_tensor(self.model_dict[idx])
-            model_list.append((self.sample_num_dict[idx], self.model_dict[idx]))
-            training_num += self.sample_num_dict[idx]
-
-        logging.info("len of self.model_dict[idx] = " + str(len(self.model_dict)))
-
-        # logging.info("################aggregate: %d" % len(model_list))
-        (num0, averaged_params) = model_list[0]
-        for k in averaged_params.keys():
-            for i in range(0, len(model_list)):
-                local_sample_number, local_model_params = model_list[i]
-                w = local_sample_number / training_num
-                if i == 0:
-                    averaged_params[k] = local_model_params[k] * w
-                else:
-                    averaged_params[k] += local_model_params[k] * w
+        # weighted average of all uploaded models as one vector-matrix product over the flat buffers
+        averaged_params = self.flat_aggregator.aggregate()
 
         # server optimizer
         # save optimizer state
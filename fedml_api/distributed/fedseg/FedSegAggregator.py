@@ -6,6 +6,11 @@ import wandb
 import numpy as np
 from torch import nn
 
+try:
+    from fedml_core.aggregation.flat_aggregation import FlatAggregator, unflatten_state_dict
+except ImportError:
+    from FedML.fedml_core.aggregation.flat_aggregation import FlatAggregator, unflatten_state_dict
+
 from .utils import transform_list_to_tensor, Saver, EvaluationMetricsKeeper
 
 
@@ -15,7 +20,7 @@ class FedSegAggregator(object):
         self.worker_num = worker_num
         self.device = device
         self.args = args
-        self.model_dict = dict()
+        self.flat_aggregator = FlatAggregator(self.worker_num)
         self.sample_num_dict = dict()
         self.flag_client_model_uploaded_dict = dict()
 
@@ -50,7 +55,9 @@ class FedSegAggregator(object):
 
     def add_local_trained_result(self, index, model_params, sample_num):
         logging.info("Add model index: {}".format(index))
-        self.model_dict[index] = model_params
+        if self.args.is_mobile == 1:
+            model_params = transform_list_to_tensor(model_params)
+        self.flat_aggregator.add(index, model_params, sample_num)
         self.sample_num_dict[index] = sample_num
         self.flag_client_model_uploaded_dict[index] = True
 
@@ -64,26 +71,10 @@ class FedSegAggregator(object):
 
     def aggregate(self):
         start_time = time.time()
-        model_list = []
-        training_num = 0
+        logging.info("Aggregating...... {0}".format(len(self.sample_num_dict)))
 
-        for idx in range(self.worker_num):
-            if self.args.is_mobile == 1:
-                self.model_dict[idx] = transform_list_to_tensor(self.model_dict[idx])
-            model_list.append((self.sample_num_dict[idx], self.model_dict[idx]))
-            training_num += self.sample_num_dict[idx]
-
-        logging.info("Aggregating...... {0}, {1}".format(len(self.model_dict),len(model_list)))
-
-        (num0, averaged_params) = model_list[0]
-        for k in averaged_params.keys():
-            for i in range(0, len(model_list)):
-                local_sample_number, local_model_params = model_list[i]
-                w = local_sample_number / training_num
-                if i == 0:
-                    averaged_params[k] = local_model_params[k] * w
-                else:
-                    averaged_params[k] += local_model_params[k] * w
+        # weighted average of all uploaded models as one vector-matrix product over the flat buffers
+        averaged_params = self.flat_aggregator.aggregate()
 
         # update the global model which is cached at the server side
         self.set_global_model_params(averaged_params)
@@ -132,7 +123,9 @@ class FedSegAggregator(object):
                 saver_state = {
                     'best_pred': test_mIoU,
                     'round': round_idx+1,
-                    'state_dict': self.model_dict[client_idx]                
+                    # copy of the client's row, so the checkpoint does not hold the whole model buffer
+                    'state_dict': unflatten_state_dict(
+                        self.flat_aggregator.model_buffer[client_idx].to("cpu", copy=True), self.flat_aggregator.layout)
                 }
 
                 test_eval_metrics_dict = {
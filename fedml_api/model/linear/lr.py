@@ -7,5 +7,17 @@ class LogisticRegression(torch.nn.Module):
         self.linear = torch.nn.Linear(input_dim, output_dim)
 
     def forward(self, x):
+        if x.is_sparse:
+            return torch.sigmoid(self._sparse_linear(x))
         outputs = torch.sigmoid(self.linear(x))
         return outputs
+
+    def _sparse_linear(self, x):
+        # sparse bag-of-words batches (e.g. stackoverflow_lr with sparse=True): gather the weight columns of the
+        # nonzero inputs and sum them per row, instead of multiplying by the mostly zero dense input
+        x = x.coalesce()
+        rows, cols = x.indices()
+        weight = self.linear.weight
+        contributions = weight.index_select(1, cols) * x.values().to(weight.dtype)
+        outputs = torch.zeros(weight.size(0), x.size(0), dtype=weight.dtype, device=weight.device)
+        return outputs.index_add(1, rows, contributions).t() + self.linear.bias
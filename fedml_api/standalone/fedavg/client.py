@@ -25,9 +25,11 @@ class Client:
         return self.local_sample_number
 
     def train(self, w_global):
-        self.model_trainer.set_model_params(w_global)
+        # the model stays on the device; the returned weights are views into the trainer's snapshot buffer, valid
+        # until the next client trains
+        self.model_trainer.load_model_params(w_global, self.device)
         self.model_trainer.train(self.local_training_data, self.device, self.args)
-        weights = self.model_trainer.get_model_params()
+        weights = self.model_trainer.snapshot_model_params()
         return weights
 
     def local_test(self, b_use_test_dataset):
@@ -7,6 +7,16 @@ import torch
 import wandb
 
 from fedml_api.standalone.fedavg.client import Client
+from fedml_api.standalone.fedavg.parallel_client_executor import ParallelClientExecutor
+from fedml_api.standalone.fedavg.vectorized_client_trainer import VectorizedClientTrainer, \
+    vectorized_training_unsupported
+
+try:
+    from fedml_core.aggregation.flat_aggregation import FlatAggregator
+    from fedml_core.trainer.evaluation import BackgroundEvaluation, evaluate_clients, stratified_client_sample
+except ImportError:
+    from FedML.fedml_core.aggregation.flat_aggregation import FlatAggregator
+    from FedML.fedml_core.trainer.evaluation import BackgroundEvaluation, evaluate_clients, stratified_client_sample
 
 
 class FedAvgAPI(object):
@@ -27,7 +37,10 @@ class FedAvgAPI(object):
         self.test_data_local_dict = test_data_local_dict
 
         self.model_trainer = model_trainer
+        self.background_evaluation = BackgroundEvaluation() if getattr(args, "async_evaluation", 0) == 1 else None
         self._setup_clients(train_data_local_num_dict, train_data_local_dict, test_data_local_dict, model_trainer)
+        self.client_executor = self._setup_client_executor()
+        self.aggregator = FlatAggregator(args.client_num_per_round)
 
     def _setup_clients(self, train_data_local_num_dict, train_data_local_dict, test_data_local_dict, model_trainer):
         logging.info("############setup_clients (START)#############")
@@ -37,14 +50,31 @@ class FedAvgAPI(object):
             self.client_list.append(c)
         logging.info("############setup_clients (END)#############")
 
+    def _setup_client_executor(self):
+        vectorized_client_num = getattr(self.args, "vectorized_client_num", 0)
+        if vectorized_client_num > 0:
+            reason = vectorized_training_unsupported(self.model_trainer, self.args)
+            if reason is None:
+                return VectorizedClientTrainer(vectorized_client_num, self.model_trainer, self.train_data_local_dict,
+                                               self.train_data_local_num_dict, self.args, self.device)
+            logging.warning("vectorized_client_num is ignored: %s" % reason)
+        # forked before any background evaluation thread exists
+        process_num = getattr(self.args, "client_process_num", 0)
+        if process_num <= 0:
+            return None
+        if self.device.type != "cpu":
+            logging.warning("client_process_num is only supported on the cpu, training the clients one by one")
+            return None
+        return ParallelClientExecutor(process_num, self.model_trainer, self.train_data_local_dict,
+                                      self.train_data_local_num_dict, self.args, self.device)
+
     def train(self):
-        w_global = self.model_trainer.get_model_params()
+        # a copy: get_model_params returns the model's own tensors, which the first client's training would change
+        w_global = copy.deepcopy(self.model_trainer.get_model_params())
         for round_idx in range(self.args.comm_round):
 
             logging.info("################Communication round : {}".format(round_idx))
 
-            w_locals = []
-
             """
             for scalability: following the original FedAvg algorithm, we uniformly sample a fraction of clients in each round.
             Instead of changing the 'Client' instances, our implementation keeps the 'Client' instances and then updates their local dataset 
@@ -53,20 +83,23 @@ class FedAvgAPI(object):
                                                    self.args.client_num_per_round)
             logging.info("client_indexes = " + str(client_indexes))
 
-            for idx, client in enumerate(self.client_list):
-                # update dataset
-                client_idx = client_indexes[idx]
-                client.update_local_dataset(client_idx, self.train_data_local_dict[client_idx],
-                                            self.test_data_local_dict[client_idx],
-                                            self.train_data_local_num_dict[client_idx])
-
-                # train on new dataset
-                w = client.train(copy.deepcopy(w_global))
-                # self.logger.info("local weights = " + str(w))
-                w_locals.append((client.get_sample_number(), copy.deepcopy(w)))
-
-            # update global weights
-            w_global = self._aggregate(w_locals)
+            if self.client_executor is not None:
+                w_global = self.client_executor.train(round_idx, client_indexes, w_global)
+            else:
+                for idx, client in enumerate(self.client_list):
+                    # update dataset
+                    client_idx = client_indexes[idx]
+                    client.update_local_dataset(client_idx, self.train_data_local_dict[client_idx],
+                                                self.test_data_local_dict[client_idx],
+                                                self.train_data_local_num_dict[client_idx])
+
+                    # train on new dataset; w is only valid until the next client trains, the aggregator copies it
+                    w = client.train(w_global)
+                    # self.logger.info("local weights = " + str(w))
+                    self.aggregator.add(idx, w, client.get_sample_number())
+
+                # update global weights
+                w_global = self.aggregator.aggregate()
             self.model_trainer.set_model_params(w_global)
 
             # test results
@@ -80,6 +113,11 @@ class FedAvgAPI(object):
                 else:
                     self._local_test_on_all_clients(round_idx)
 
+        if self.background_evaluation is not None:
+            self.background_evaluation.wait()
+        if self.client_executor is not None:
+            self.client_executor.close()
+
     def _client_sampling(self, round_idx, client_num_in_total, client_num_per_round):
         if client_num_in_total == client_num_per_round:
             client_indexes = [client_index for client_index in range(client_num_in_total)]
@@ -97,23 +135,6 @@ class FedAvgAPI(object):
         sample_testset = torch.utils.data.DataLoader(subset, batch_size=self.args.batch_size)
         self.val_global = sample_testset
 
-    def _aggregate(self, w_locals):
-        training_num = 0
-        for idx in range(len(w_locals)):
-            (sample_num, averaged_params) = w_locals[idx]
-            training_num += sample_num
-
-        (sample_num, averaged_params) = w_locals[0]
-        for k in averaged_params.keys():
-            for i in range(0, len(w_locals)):
-                local_sample_number, local_model_params = w_locals[i]
-                w = local_sample_number / training_num
-                if i == 0:
-                    averaged_params[k] = local_model_params[k] * w
-                else:
-                    averaged_params[k] += local_model_params[k] * w
-        return averaged_params
-    
     def _aggregate_noniid_avg(self, w_locals):
         '''
         The old aggregate method will impact the model performance when it comes to Non-IID setting
@@ -133,41 +154,27 @@ class FedAvgAPI(object):
 
         logging.info("################local_test_on_all_clients : {}".format(round_idx))
 
-        train_metrics = {
-            'num_samples': [],
-            'num_correct': [],
-            'losses': []
-        }
-
-        test_metrics = {
-            'num_samples': [],
-            'num_correct': [],
-            'losses': []
-        }
-
-        client = self.client_list[0]
+        client_indexes = stratified_client_sample(range(self.args.client_num_in_total), self.train_data_local_num_dict,
+                                                  getattr(self.args, "eval_client_fraction", 1.0), seed=round_idx)
+        if self.background_evaluation is not None:
+            # evaluate a copy of the global model while the next round trains
+            self.background_evaluation.submit(self._test_on_clients, copy.deepcopy(self.model_trainer),
+                                              client_indexes, round_idx)
+        else:
+            self._test_on_clients(self.model_trainer, client_indexes, round_idx)
 
-        for client_idx in range(self.args.client_num_in_total):
+    def _test_on_clients(self, model_trainer, client_indexes, round_idx):
+        train_data_list = []
+        test_data_list = []
+        for client_idx in client_indexes:
             """
             Note: for datasets like "fed_CIFAR100" and "fed_shakespheare",
             the training client number is larger than the testing client number
             """
             if self.test_data_local_dict[client_idx] is None:
                 continue
-            client.update_local_dataset(0, self.train_data_local_dict[client_idx],
-                                        self.test_data_local_dict[client_idx],
-                                        self.train_data_local_num_dict[client_idx])
-            # train data
-            train_local_metrics = client.local_test(False)
-            train_metrics['num_samples'].append(copy.deepcopy(train_local_metrics['test_total']))
-            train_metrics['num_correct'].append(copy.deepcopy(train_local_metrics['test_correct']))
-            train_metrics['losses'].append(copy.deepcopy(train_local_metrics['test_loss']))
-
-            # test data
-            test_local_metrics = client.local_test(True)
-            test_metrics['num_samples'].append(copy.deepcopy(test_local_metrics['test_total']))
-            test_metrics['num_correct'].append(copy.deepcopy(test_local_metrics['test_correct']))
-            test_metrics['losses'].append(copy.deepcopy(test_local_metrics['test_loss']))
+            train_data_list.append(self.train_data_local_dict[client_idx])
+            test_data_list.append(self.test_data_local_dict[client_idx])
 
             """
             Note: CI environment is CPU-based computing. 
@@ -176,13 +183,16 @@ class FedAvgAPI(object):
             if self.args.ci == 1:
                 break
 
+        train_metrics = evaluate_clients(model_trainer, train_data_list, self.device, self.args)
+        test_metrics = evaluate_clients(model_trainer, test_data_list, self.device, self.args)
+
         # test on training dataset
-        train_acc = sum(train_metrics['num_correct']) / sum(train_metrics['num_samples'])
-        train_loss = sum(train_metrics['losses']) / sum(train_metrics['num_samples'])
+        train_acc = sum(m['test_correct'] for m in train_metrics) / sum(m['test_total'] for m in train_metrics)
+        train_loss = sum(m['test_loss'] for m in train_metrics) / sum(m['test_total'] for m in train_metrics)
 
         # test on test dataset
-        test_acc = sum(test_metrics['num_correct']) / sum(test_metrics['num_samples'])
-        test_loss = sum(test_metrics['losses']) / sum(test_metrics['num_samples'])
+        test_acc = sum(m['test_correct'] for m in test_metrics) / sum(m['test_total'] for m in test_metrics)
+        test_loss = sum(m['test_loss'] for m in test_metrics) / sum(m['test_total'] for m in test_metrics)
 
         stats = {'training_acc': train_acc, 'training_loss': train_loss}
         wandb.log({"Train/Acc": train_acc, "round": round_idx})
@@ -4,8 +4,10 @@ import torch
 from torch import nn
 
 try:
+    from fedml_core.trainer.evaluation import classification_sample_metrics
     from fedml_core.trainer.model_trainer import ModelTrainer
 except ImportError:
+    from FedML.fedml_core.trainer.evaluation import classification_sample_metrics
     from FedML.fedml_core.trainer.model_trainer import ModelTrainer
 
 
@@ -81,5 +83,9 @@ class MyModelTrainer(ModelTrainer):
                 metrics['test_total'] += target.size(0)
         return metrics
 
+    def sample_metrics(self, pred, target):
+        # per-sample terms of `test`, used by the batched evaluation
+        return classification_sample_metrics(pred, target)
+
     def test_on_the_server(self, train_data_local_dict, test_data_local_dict, device, args=None) -> bool:
         return False
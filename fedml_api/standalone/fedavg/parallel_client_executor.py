@@ -0,0 +1,113 @@
+"""
+Multi-process execution of the sampled clients of a FedAvgAPI round.
+
+The worker processes are forked once, when the executor is created, so each one inherits a replica of the model
+trainer that it keeps across rounds, and the client datasets of the parent: their arrays are only read, so the
+copy-on-write pages stay shared with the parent instead of being pickled to every worker. A round writes the global
+model into a flat shared-memory buffer, sends (row, client_idx) tasks to the workers, and every worker trains its
+client from that buffer and writes the flattened local model into its row of a shared `[client_num_per_round, numel]`
+matrix, which the aggregator averages in place without any state_dict crossing a process boundary.
+"""
+
+import logging
+import queue
+import random
+import traceback
+
+import numpy as np
+import torch
+import torch.multiprocessing as mp
+
+from fedml_api.standalone.fedavg.client import Client
+
+try:
+    from fedml_core.aggregation.flat_aggregation import FlatModelLayout, flatten_state_dict, unflatten_state_dict, \
+        weighted_average_rows
+except ImportError:
+    from FedML.fedml_core.aggregation.flat_aggregation import FlatModelLayout, flatten_state_dict, \
+        unflatten_state_dict, weighted_average_rows
+
+
+def _worker_loop(client, train_data_local_dict, train_data_local_num_dict, layout, global_flat, model_buffer,
+                 task_queue, result_queue, thread_num):
+    torch.set_num_threads(thread_num)
+    while True:
+        task = task_queue.get()
+        if task is None:
+            return
+        row, client_idx, seed = task
+        try:
+            # the client's training is reproducible whichever worker runs it
+            random.seed(seed)
+            np.random.seed(seed)
+            torch.manual_seed(seed)
+            client.update_local_dataset(client_idx, train_data_local_dict[client_idx], None,
+                                        train_data_local_num_dict[client_idx])
+            w = client.train(unflatten_state_dict(global_flat, layout))
+            flatten_state_dict(w, layout, out=model_buffer[row])
+            result_queue.put((row, client.get_sample_number(), None))
+        except Exception:
+            result_queue.put((row, None, traceback.format_exc()))
+
+
+class ParallelClientExecutor(object):
+    """Trains the clients of a round on `worker_num` forked CPU processes, each with its own model replica."""
+
+    def __init__(self, worker_num, model_trainer, train_data_local_dict, train_data_local_num_dict, args, device):
+        if device.type != "cpu":
+            raise ValueError("the worker processes are forked and train on the cpu, not on %s" % device)
+        self.worker_num = worker_num
+        self.args = args
+        self.layout = FlatModelLayout(model_trainer.get_model_params())
+        self.global_flat = torch.zeros(self.layout.numel, dtype=self.layout.dtype).share_memory_()
+        self.model_buffer = torch.zeros((args.client_num_per_round, self.layout.numel),
+                                        dtype=self.layout.dtype).share_memory_()
+
+        ctx = mp.get_context("fork")
+        self.task_queue = ctx.Queue()
+        self.result_queue = ctx.Queue()
+        thread_num = max(1, torch.get_num_threads() // worker_num)
+        client = Client(0, None, None, 0, args, device, model_trainer)
+        self.workers = []
+        for _ in range(worker_num):
+            worker = ctx.Process(target=_worker_loop, daemon=True,
+                                 args=(client, train_data_local_dict, train_data_local_num_dict, self.layout,
+                                       self.global_flat, self.model_buffer, self.task_queue, self.result_queue,
+                                       thread_num))
+            worker.start()
+            self.workers.append(worker)
+        logging.info("started %d client worker processes with %d threads each" % (worker_num, thread_num))
+
+    def train(self, round_idx, client_indexes, w_global):
+        """Trains `client_indexes` from `w_global` and returns the FedAvg of their local models."""
+        flatten_state_dict(w_global, self.layout, out=self.global_flat)
+        for row, client_idx in enumerate(client_indexes):
+            seed = (round_idx * self.args.client_num_in_total + int(client_idx)) % 2 ** 32
+            self.task_queue.put((row, int(client_idx), seed))
+
+        sample_nums = [0] * len(client_indexes)
+        errors = []
+        for _ in range(len(client_indexes)):
+            row, sample_num, error = self._get_result()
+            if error is not None:
+                errors.append("client %d:\n%s" % (client_indexes[row], error))
+            sample_nums[row] = sample_num
+        if errors:
+            raise RuntimeError("training failed in a client worker process, " + errors[0])
+        return weighted_average_rows(self.model_buffer[:len(client_indexes)], sample_nums, self.layout)
+
+    def _get_result(self):
+        while True:
+            try:
+                return self.result_queue.get(timeout=1.0)
+            except queue.Empty:
+                dead = [worker.pid for worker in self.workers if not worker.is_alive()]
+                if dead:
+                    raise RuntimeError("client worker processes %s exited during the round" % dead)
+
+    def close(self):
+        for _ in self.workers:
+            self.task_queue.put(None)
+        for worker in self.workers:
+            worker.join()
+        self.workers = []
@@ -0,0 +1,131 @@
+"""
+Vectorized local training of many small-model clients.
+
+`VectorizedClientTrainer` trains up to `vectorized_client_num` clients of a round at once: their parameters are
+stacked along a leading client dimension, and one SGD step of all of them is a single `torch.func.vmap` of the
+gradient of `functional_call(model, ...)` over per-client padded minibatches. A client's loss is the mean over its
+own samples of the trainer's per-sample loss, so padding and clients whose batches are exhausted get zero gradient,
+and every client follows the updates of `MyModelTrainer.train` with plain SGD. For models like LogisticRegression
+or CNN_DropOut the per-client Python loop then costs one batched kernel per step instead of one per client.
+"""
+
+import torch
+from torch.func import functional_call, grad, vmap
+from torch.utils import data
+
+try:
+    from fedml_core.aggregation.flat_aggregation import FlatModelLayout, unflatten_state_dict
+except ImportError:
+    from FedML.fedml_core.aggregation.flat_aggregation import FlatModelLayout, unflatten_state_dict
+
+
+def vectorized_training_unsupported(model_trainer, args):
+    """Why `model_trainer` cannot be trained by `VectorizedClientTrainer`, or None if it can."""
+    if args.client_optimizer != "sgd":
+        return "the %s client optimizer keeps per-client state" % args.client_optimizer
+    if not hasattr(model_trainer, "sample_metrics"):
+        return "%s has no sample_metrics" % model_trainer.__class__.__name__
+    if len(list(model_trainer.model.buffers())) > 0:
+        return "the buffers of the model (e.g. batch norm statistics) are updated in place"
+    return None
+
+
+def _tensor_batches(dataloader):
+    # the batches the DataLoader would yield, by slicing its tensors instead of collating samples one by one
+    x, target = dataloader.dataset.tensors
+    if isinstance(dataloader.sampler, data.RandomSampler):
+        order = torch.randperm(len(target))
+        x, target = x[order], target[order]
+    return [(x[start:start + dataloader.batch_size], target[start:start + dataloader.batch_size])
+            for start in range(0, len(target), dataloader.batch_size)]
+
+
+def client_batches(dataloader):
+    """One epoch of the (x, target) batches of a client's DataLoader."""
+    if isinstance(dataloader.dataset, data.TensorDataset) and len(dataloader.dataset.tensors) == 2 \
+            and dataloader.collate_fn is data.dataloader.default_collate and not dataloader.drop_last \
+            and isinstance(dataloader.sampler, (data.RandomSampler, data.SequentialSampler)):
+        return _tensor_batches(dataloader)
+    return list(dataloader)
+
+
+def pad_batches(batches):
+    """Stacks one batch (or None) per client into `[K, B, ...]` x and target with a `[K, B]` mask of the real samples,
+    B being the largest batch."""
+    x_ref, target_ref = next(batch for batch in batches if batch is not None)
+    batch_size = max(len(batch[1]) for batch in batches if batch is not None)
+    x = x_ref.new_zeros((len(batches), batch_size) + x_ref.shape[1:])
+    target = target_ref.new_zeros((len(batches), batch_size) + target_ref.shape[1:])
+    mask = torch.zeros((len(batches), batch_size))
+    for idx, batch in enumerate(batches):
+        if batch is not None:
+            size = len(batch[1])
+            x[idx, :size] = batch[0]
+            target[idx, :size] = batch[1]
+            mask[idx, :size] = 1
+    return x, target, mask
+
+
+class VectorizedClientTrainer(object):
+    """Trains the clients of a round `vectorized_client_num` at a time, with the interface of
+    `ParallelClientExecutor`."""
+
+    def __init__(self, vectorized_client_num, model_trainer, train_data_local_dict, train_data_local_num_dict, args,
+                 device):
+        self.vectorized_client_num = vectorized_client_num
+        self.model_trainer = model_trainer
+        self.train_data_local_dict = train_data_local_dict
+        self.train_data_local_num_dict = train_data_local_num_dict
+        self.args = args
+        self.device = device
+        self.trainable = [name for name, param in model_trainer.model.named_parameters() if param.requires_grad]
+        self.layout = FlatModelLayout(model_trainer.get_model_params())
+
+        def loss_fn(params, fixed, x, target, mask):
+            pred = functional_call(self.model_trainer.model, (params, fixed), (x,))
+            losses = self.model_trainer.sample_metrics(pred, target)['test_loss']
+            return (losses * mask).sum() / mask.sum().clamp(min=1)
+
+        # each client draws its own dropout masks
+        self._grad_fn = vmap(grad(loss_fn), in_dims=(0, None, 0, 0, 0), randomness='different')
+
+    def train(self, round_idx, client_indexes, w_global):
+        """Trains `client_indexes` from `w_global` and returns the FedAvg of their local models."""
+        sample_nums = torch.tensor([self.train_data_local_num_dict[client_idx] for client_idx in client_indexes],
+                                   dtype=torch.float64)
+        weights = (sample_nums / sample_nums.sum()).to(self.layout.dtype)
+        # each chunk of clients is folded into the average as it finishes, so only one chunk of models is kept
+        averaged = torch.zeros(self.layout.numel, dtype=self.layout.dtype)
+        for start in range(0, len(client_indexes), self.vectorized_client_num):
+            chunk = client_indexes[start:start + self.vectorized_client_num]
+            params = self._train_clients(chunk, w_global)
+            for k, numel, offset in zip(self.layout.keys, self.layout.numels, self.layout.offsets):
+                if k in params:
+                    averaged[offset:offset + numel].add_(
+                        torch.matmul(weights[start:start + len(chunk)], params[k].reshape(len(chunk), numel)))
+        # the entries that are not trained are the same for every client
+        for k, numel, offset in zip(self.layout.keys, self.layout.numels, self.layout.offsets):
+            if k not in self.trainable:
+                averaged[offset:offset + numel].copy_(torch.as_tensor(w_global[k]).reshape(-1))
+        return unflatten_state_dict(averaged, self.layout)
+
+    def _train_clients(self, client_idxs, w_global):
+        model = self.model_trainer.model
+        model.to(self.device)
+        model.train()
+        params = {k: torch.as_tensor(w_global[k]).to(self.device).expand((len(client_idxs),) + w_global[k].shape)
+                  .clone() for k in self.trainable}
+        fixed = {k: torch.as_tensor(v).to(self.device) for k, v in w_global.items() if k not in params}
+
+        for epoch in range(self.args.epochs):
+            batches = [client_batches(self.train_data_local_dict[client_idx]) for client_idx in client_idxs]
+            for step in range(max(len(b) for b in batches)):
+                x, target, mask = pad_batches([b[step] if step < len(b) else None for b in batches])
+                grads = self._grad_fn(params, fixed, x.to(self.device), target.to(self.device),
+                                      mask.to(self.device))
+                for k in params:
+                    params[k].sub_(grads[k], alpha=self.args.lr)
+        return {k: v.cpu() for k, v in params.items()}
+
+    def close(self):
+        pass
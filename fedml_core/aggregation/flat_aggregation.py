@@ -0,0 +1,195 @@
+import logging
+from collections import OrderedDict
+
+import torch
+
+
+class FlatModelLayout(object):
+    """Key order, shapes, dtypes and offsets of a state_dict packed into one contiguous 1-D buffer.
+
+    All entries share a single floating point buffer dtype (the widest floating dtype found in the
+    state_dict, float32 by default), so integer buffers such as `num_batches_tracked` are averaged
+    as floats exactly like the original key-by-key aggregation did.
+    """
+
+    def __init__(self, state_dict):
+        self.keys = []
+        self.shapes = []
+        self.dtypes = []
+        self.numels = []
+        self.offsets = []
+        dtype = torch.float32
+        offset = 0
+        for k, v in state_dict.items():
+            v = torch.as_tensor(v)
+            self.keys.append(k)
+            self.shapes.append(v.shape)
+            self.dtypes.append(v.dtype)
+            self.numels.append(v.numel())
+            self.offsets.append(offset)
+            offset += v.numel()
+            if v.is_floating_point():
+                dtype = torch.promote_types(dtype, v.dtype)
+        self.numel = offset
+        self.dtype = dtype
+
+    def __len__(self):
+        return len(self.keys)
+
+    def matches(self, state_dict):
+        if len(state_dict) != len(self.keys):
+            return False
+        for k, shape in zip(self.keys, self.shapes):
+            if k not in state_dict or torch.as_tensor(state_dict[k]).shape != shape:
+                return False
+        return True
+
+    def mismatch(self, state_dict):
+        """Description of how `state_dict` differs from this layout (missing/unexpected keys, other shapes)."""
+        missing = [k for k in self.keys if k not in state_dict]
+        unexpected = [k for k in state_dict if k not in set(self.keys)]
+        shapes = ["%s %s instead of %s" % (k, tuple(torch.as_tensor(state_dict[k]).shape), tuple(shape))
+                  for k, shape in zip(self.keys, self.shapes)
+                  if k in state_dict and torch.as_tensor(state_dict[k]).shape != shape]
+        problems = []
+        if missing:
+            problems.append("missing keys %s" % missing)
+        if unexpected:
+            problems.append("unexpected keys %s" % unexpected)
+        if shapes:
+            problems.append("shapes " + ", ".join(shapes))
+        return "; ".join(problems)
+
+
+def flatten_state_dict(state_dict, layout, out=None):
+    """Copy every entry of `state_dict` into a flat buffer following `layout` (one copy per tensor)."""
+    if out is None:
+        out = torch.empty(layout.numel, dtype=layout.dtype)
+    for k, numel, offset in zip(layout.keys, layout.numels, layout.offsets):
+        out[offset:offset + numel].copy_(torch.as_tensor(state_dict[k]).reshape(-1))
+    return out
+
+
+def unflatten_state_dict(flat, layout):
+    """View a flat buffer back as a state_dict.
+
+    Entries whose original dtype is the buffer dtype are returned as zero-copy views into `flat`;
+    the others (e.g. integer counters) are cast back to their original dtype.
+    """
+    state_dict = OrderedDict()
+    for k, shape, dtype, numel, offset in zip(layout.keys, layout.shapes, layout.dtypes, layout.numels,
+                                              layout.offsets):
+        v = flat[offset:offset + numel].view(shape)
+        if dtype != flat.dtype:
+            v = v.to(dtype)
+        state_dict[k] = v
+    return state_dict
+
+
+def weighted_average_state_dicts(model_list, layout=None):
+    """FedAvg over `[(sample_num, state_dict), ...]` using fused in-place axpy on flat buffers.
+
+    Returns a new state_dict whose tensors are views into a single flat buffer.
+    """
+    if layout is None:
+        layout = FlatModelLayout(model_list[0][1])
+    training_num = 0
+    for sample_num, _ in model_list:
+        training_num += sample_num
+
+    averaged = torch.zeros(layout.numel, dtype=layout.dtype)
+    local_flat = torch.empty(layout.numel, dtype=layout.dtype)
+    for sample_num, local_model_params in model_list:
+        flatten_state_dict(local_model_params, layout, out=local_flat)
+        averaged.add_(local_flat, alpha=sample_num / training_num)
+    return unflatten_state_dict(averaged, layout)
+
+
+def weighted_average_rows(model_buffer, sample_nums, layout):
+    """FedAvg over the rows of a `[model_num, numel]` matrix of flat models, as one vector-matrix product."""
+    sample_nums = torch.as_tensor(sample_nums, dtype=torch.float64)
+    weights = (sample_nums / sample_nums.sum()).to(device=model_buffer.device, dtype=model_buffer.dtype)
+    averaged = torch.matmul(weights, model_buffer)
+    return unflatten_state_dict(averaged.cpu(), layout)
+
+
+class FlatAggregator(object):
+    """Packs each uploaded state_dict into one row of a preallocated `[worker_num, numel]` matrix on
+    arrival and computes the weighted average of all rows as a single vector-matrix product.
+
+    The layout and the matrix are created lazily from the first upload and reused across rounds. They are only
+    recreated for a model of another layout when no upload of the current round is pending.
+    """
+
+    def __init__(self, worker_num, device=None):
+        self.worker_num = worker_num
+        self.device = torch.device("cpu") if device is None else device
+        self.layout = None
+        self.model_buffer = None
+        self.sample_nums = torch.zeros(worker_num, dtype=torch.float64)
+        # rows added since the last aggregate()
+        self.pending_indexes = set()
+
+    def _init_buffer(self, state_dict):
+        self.layout = FlatModelLayout(state_dict)
+        self.model_buffer = torch.empty((self.worker_num, self.layout.numel), dtype=self.layout.dtype,
+                                        device=self.device)
+
+    def add(self, index, state_dict, sample_num):
+        if self.layout is None or not self.layout.matches(state_dict):
+            if self.pending_indexes - {index}:
+                raise ValueError("model of index %d does not match the %d models received in this round: %s" % (
+                    index, len(self.pending_indexes - {index}), self.layout.mismatch(state_dict)))
+            self._init_buffer(state_dict)
+        flatten_state_dict(state_dict, self.layout, out=self.model_buffer[index])
+        self.sample_nums[index] = sample_num
+        self.pending_indexes.add(index)
+
+    def aggregate(self, indexes=None):
+        """Weighted average of the rows in `indexes` (all workers by default), as a state_dict."""
+        if indexes is None:
+            sample_nums = self.sample_nums
+            model_buffer = self.model_buffer
+        else:
+            indexes = torch.as_tensor(list(indexes), dtype=torch.long)
+            sample_nums = self.sample_nums[indexes]
+            model_buffer = self.model_buffer[indexes.to(self.model_buffer.device)]
+        self.pending_indexes.clear()
+        return weighted_average_rows(model_buffer, sample_nums, self.layout)
+
+
+class StreamingAggregator(object):
+    """Online FedAvg: each upload is folded into a running sample-weighted sum on arrival and then dropped,
+    so the server keeps O(1) models regardless of `worker_num` and the averaging work overlaps with the
+    uploads of the remaining clients.
+
+    It exposes the same `add`/`aggregate` interface as `FlatAggregator`.
+    """
+
+    def __init__(self, device=None):
+        self.device = torch.device("cpu") if device is None else device
+        self.layout = None
+        self.weighted_sum = None
+        self.training_num = 0
+        self.received_indexes = set()
+
+    def add(self, index, state_dict, sample_num):
+        if index in self.received_indexes:
+            logging.warning("model of index %d has already been aggregated in this round, ignore it" % index)
+            return
+        if self.layout is None:
+            self.layout = FlatModelLayout(state_dict)
+            self.weighted_sum = torch.zeros(self.layout.numel, dtype=self.layout.dtype, device=self.device)
+        for k, numel, offset in zip(self.layout.keys, self.layout.numels, self.layout.offsets):
+            v = torch.as_tensor(state_dict[k]).to(self.device)
+            self.weighted_sum[offset:offset + numel].add_(v.reshape(-1), alpha=sample_num)
+        self.training_num += sample_num
+        self.received_indexes.add(index)
+
+    def aggregate(self):
+        """Average of everything folded in since the last call; the accumulator is reset for the next round."""
+        averaged = self.weighted_sum / self.training_num
+        self.weighted_sum.zero_()
+        self.training_num = 0
+        self.received_indexes.clear()
+        return unflatten_state_dict(averaged.cpu(), self.layout)
@@ -75,10 +75,11 @@ class ClientManager(Observer):
             # logging.info("%s == %s" % (key, value))
             msg.add(key, value)
         logging.info("Sending message (type %d) to server" % message.get_type())
-        self.com_manager.send_message(msg)
+        future = self.com_manager.send_message(msg)
         for key, value in msg.get_params().items():
             # logging.info("%s == %s" % (key, value))
             message.add(key, value)
+        return future
 
     @abstractmethod
     def register_message_receive_handlers(self) -> None:
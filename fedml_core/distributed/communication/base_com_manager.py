@@ -10,6 +10,23 @@ class BaseCommunicationManager(object):
     def send_message(self, msg: Message):
         pass
 
+    def broadcast_message(self, msg: Message, receiver_ids, receiver_params=None):
+        """Send the params of `msg` to every receiver in `receiver_ids`, updated with `receiver_params[i]`
+        (e.g. the client index) for receiver_ids[i].
+
+        This default sends one message per receiver. Backends override it to serialize or upload the shared
+        payload (e.g. the global model) only once and send each receiver a lightweight control message.
+        """
+        for i, receiver_id in enumerate(receiver_ids):
+            message = Message(msg.get_type(), msg.get_sender_id(), receiver_id)
+            for key, value in msg.get_params().items():
+                if key != Message.MSG_ARG_KEY_RECEIVER:
+                    message.add_params(key, value)
+            if receiver_params is not None:
+                for key, value in receiver_params[i].items():
+                    message.add_params(key, value)
+            self.send_message(message)
+
     @abstractmethod
     def add_observer(self, observer: Observer):
         pass
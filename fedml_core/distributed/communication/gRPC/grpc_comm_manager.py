@@ -10,6 +10,7 @@ from ..gRPC import grpc_comm_manager_pb2_grpc, grpc_comm_manager_pb2
 
 lock = threading.Lock()
 
+from ...communication import tensor_serializer
 from ...communication.base_com_manager import BaseCommunicationManager
 from ...communication.message import Message
 from ...communication.observer import Observer
@@ -18,6 +19,9 @@ from ...communication.gRPC.grpc_server import GRPCCOMMServicer
 
 import csv
 
+# messages larger than this are sent through the client-streaming RPC in pieces of this size
+GRPC_CHUNK_SIZE = 4 * 1024 * 1024
+
 
 class GRPCCommManager(BaseCommunicationManager):
     def __init__(self, host, port, ip_config_path, topic="fedml", client_id=0, client_num=0):
@@ -28,6 +32,9 @@ class GRPCCommManager(BaseCommunicationManager):
         self.client_id = client_id
         self.client_num = client_num
         self._observers: List[Observer] = []
+        self._channel_pool = dict()
+        self._channel_lock = threading.Lock()
+        self.chunk_size = GRPC_CHUNK_SIZE
 
         if client_id == 0:
             self.node_type = "server"
@@ -52,27 +59,53 @@ class GRPCCommManager(BaseCommunicationManager):
         print("server started. Listening on port " + str(port))
 
     def send_message(self, msg: Message):
-        payload = msg.to_json()
-
         receiver_id = msg.get_receiver_id()
-        PORT_BASE = 8888
-        # lookup ip of receiver from self.ip_config table
-        receiver_ip = self.ip_config[str(receiver_id)]
-        channel_url = "{}:{}".format(receiver_ip, str(PORT_BASE + receiver_id))
-
-        channel = grpc.insecure_channel(channel_url, options=self.opts)
-        stub = grpc_comm_manager_pb2_grpc.gRPCCommManagerStub(channel)
-
-        request = grpc_comm_manager_pb2.CommRequest()
-        logging.info("sending message to {}".format(channel_url))
-
-        request.client_id = self.client_id
-
-        request.message = payload
-
-        stub.sendMessage(request)
+        stub = self._get_stub(receiver_id)
+        logging.info("sending message to {}".format(receiver_id))
+
+        chunks = tensor_serializer.dumps_chunks(msg.get_params())
+        payload_size = sum(len(memoryview(chunk).cast("B")) for chunk in chunks)
+        if payload_size <= self.chunk_size:
+            request = grpc_comm_manager_pb2.CommRequest()
+            request.client_id = self.client_id
+            request.data = b"".join(chunks)
+            stub.sendMessage(request)
+        else:
+            # large models are streamed in fixed-size pieces, so neither side needs the max message length
+            # nor one contiguous copy of the whole payload
+            stub.sendMessageStream(self._iter_chunk_requests(chunks))
         logging.debug("sent successfully")
-        channel.close()
+
+    def _get_stub(self, receiver_id):
+        # channels are created once per receiver and reused across rounds
+        with self._channel_lock:
+            if receiver_id not in self._channel_pool:
+                PORT_BASE = 8888
+                # lookup ip of receiver from self.ip_config table
+                receiver_ip = self.ip_config[str(receiver_id)]
+                channel_url = "{}:{}".format(receiver_ip, str(PORT_BASE + receiver_id))
+                channel = grpc.insecure_channel(channel_url, options=self.opts)
+                stub = grpc_comm_manager_pb2_grpc.gRPCCommManagerStub(channel)
+                self._channel_pool[receiver_id] = (channel, stub)
+                logging.info("created channel to {}".format(channel_url))
+            return self._channel_pool[receiver_id][1]
+
+    def _iter_chunk_requests(self, chunks):
+        pieces = []
+        pending_size = 0
+        for chunk in chunks:
+            view = memoryview(chunk).cast("B")
+            while len(view) > 0:
+                take = min(self.chunk_size - pending_size, len(view))
+                pieces.append(view[:take])
+                pending_size += take
+                view = view[take:]
+                if pending_size == self.chunk_size:
+                    yield grpc_comm_manager_pb2.CommRequest(client_id=self.client_id, data=b"".join(pieces))
+                    pieces = []
+                    pending_size = 0
+        if pending_size > 0:
+            yield grpc_comm_manager_pb2.CommRequest(client_id=self.client_id, data=b"".join(pieces))
 
     def add_observer(self, observer: Observer):
         self._observers.append(observer)
@@ -86,20 +119,30 @@ class GRPCCommManager(BaseCommunicationManager):
 
     def message_handling_subroutine(self):
         while self.is_running:
-            if self.grpc_servicer.message_q.qsize() > 0:
-                lock.acquire()
-                msg_params_string = self.grpc_servicer.message_q.get()
-                msg_params = Message()
-                msg_params.init_from_json_string(msg_params_string)
-                msg_type = msg_params.get_type()
-                for observer in self._observers:
-                    observer.receive_message(msg_type, msg_params)
-                lock.release()
+            # blocks until the servicer queues a message (or stop_receive_message queues the None sentinel)
+            msg_payload = self.grpc_servicer.message_q.get()
+            if msg_payload is None:
+                break
+            lock.acquire()
+            msg_params = Message()
+            if isinstance(msg_payload, (bytes, bytearray)):
+                msg_params.init_from_bytes(msg_payload)
+            else:
+                msg_params.init_from_json_string(msg_payload)
+            msg_type = msg_params.get_type()
+            for observer in self._observers:
+                observer.receive_message(msg_type, msg_params)
+            lock.release()
         return
 
     def stop_receive_message(self):
         self.grpc_server.stop(None)
         self.is_running = False
+        self.grpc_servicer.message_q.put(None)
+        with self._channel_lock:
+            for channel, _ in self._channel_pool.values():
+                channel.close()
+            self._channel_pool.clear()
 
     def notify(self, message: Message):
         msg_type = message.get_type()
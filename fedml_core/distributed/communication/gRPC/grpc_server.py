@@ -32,7 +32,24 @@ class GRPCCOMMServicer(grpc_comm_manager_pb2_grpc.gRPCCommManagerServicer):
         response = grpc_comm_manager_pb2.CommResponse()
         response.message = "message received"
         lock.acquire()
-        self.message_q.put(request.message)
+        # binary messages arrive in `data`, legacy JSON messages in `message`
+        self.message_q.put(request.data if request.data else request.message)
+        lock.release()
+        return response
+
+    def sendMessageStream(self, request_iterator, context):
+        # reassemble the chunks; the bytearray is handed over as-is so the decoder can view it without copying
+        payload = bytearray()
+        sender_id = None
+        for request in request_iterator:
+            sender_id = request.client_id
+            payload += request.data
+        logging.info("client_{} got {} bytes streamed from client_{}".format(self.client_id, len(payload), sender_id))
+
+        response = grpc_comm_manager_pb2.CommResponse()
+        response.message = "message received"
+        lock.acquire()
+        self.message_q.put(payload)
         lock.release()
         return response
 
@@ -1,6 +1,8 @@
 import json
 import sys
 
+from . import tensor_serializer
+
 
 class Message(object):
 
@@ -16,6 +18,7 @@ class Message(object):
 
     MSG_ARG_KEY_MODEL_PARAMS = "model_params"
     MSG_ARG_KEY_MODEL_PARAMS_URL = "model_params_url"
+    MSG_ARG_KEY_MODEL_PARAMS_HASH = "model_params_hash"
 
     def __init__(self, type=0, sender_id=0, receiver_id=0):
         self.type = type
@@ -35,6 +38,12 @@ class Message(object):
         self.sender_id = self.msg_params[Message.MSG_ARG_KEY_SENDER]
         self.receiver_id = self.msg_params[Message.MSG_ARG_KEY_RECEIVER]
 
+    def init_from_bytes(self, buf):
+        self.msg_params = tensor_serializer.loads(buf)
+        self.type = self.msg_params[Message.MSG_ARG_KEY_TYPE]
+        self.sender_id = self.msg_params[Message.MSG_ARG_KEY_SENDER]
+        self.receiver_id = self.msg_params[Message.MSG_ARG_KEY_RECEIVER]
+
     def init_from_json_object(self, json_object):
         self.msg_params = json_object
         self.type = self.msg_params[Message.MSG_ARG_KEY_TYPE]
@@ -70,6 +79,13 @@ class Message(object):
         print("json string size = " + str(sys.getsizeof(json_string)))
         return json_string
 
+    def to_bytes(self):
+        # binary wire format: raw tensor buffers instead of JSON lists (see tensor_serializer)
+        return tensor_serializer.dumps(self.msg_params)
+
+    def has_tensors(self):
+        return tensor_serializer.has_tensors(self.msg_params)
+
     def get_content(self):
         print_dict = self.msg_params.copy()
         msg_str = str(self.__to_msg_type_string()) + ": " + str(print_dict)
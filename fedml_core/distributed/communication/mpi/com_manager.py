@@ -1,12 +1,12 @@
 import logging
 import queue
-import time
 from typing import List
 
 from ..base_com_manager import BaseCommunicationManager
 from ..message import Message
 from .mpi_receive_thread import MPIReceiveThread
 from .mpi_send_thread import MPISendThread
+from .mpi_transfer import BroadcastRequest
 from ..observer import Observer
 
 
@@ -18,11 +18,6 @@ class MpiCommunicationManager(BaseCommunicationManager):
 
         self._observers: List[Observer] = []
 
-        if node_type == "client":
-            self.q_sender, self.q_receiver = self.init_client_communication()
-        elif node_type == "server":
-            self.q_sender, self.q_receiver = self.init_server_communication()
-
         self.server_send_thread = None
         self.server_receive_thread = None
         self.server_collective_thread = None
@@ -31,6 +26,11 @@ class MpiCommunicationManager(BaseCommunicationManager):
         self.client_receive_thread = None
         self.client_collective_thread = None
 
+        if node_type == "client":
+            self.q_sender, self.q_receiver = self.init_client_communication()
+        elif node_type == "server":
+            self.q_sender, self.q_receiver = self.init_server_communication()
+
         self.is_running = True
 
     def init_server_communication(self):
@@ -62,6 +62,16 @@ class MpiCommunicationManager(BaseCommunicationManager):
     def send_message(self, msg: Message):
         self.q_sender.put(msg)
 
+    def broadcast_message(self, msg: Message, receiver_ids, receiver_params=None):
+        """Send the params of `msg` to every rank in `receiver_ids`, updated with the matching dict of
+        `receiver_params` (e.g. the client index); the tensors are transferred once with Ibcast when all
+        other ranks are receivers."""
+        if receiver_params is None:
+            receiver_params = [dict() for _ in receiver_ids]
+        receiver_params = [dict(params, **{Message.MSG_ARG_KEY_RECEIVER: receiver_id})
+                           for receiver_id, params in zip(receiver_ids, receiver_params)]
+        self.q_sender.put(BroadcastRequest(msg.get_params(), list(receiver_ids), receiver_params))
+
     def add_observer(self, observer: Observer):
         self._observers.append(observer)
 
@@ -71,15 +81,17 @@ class MpiCommunicationManager(BaseCommunicationManager):
     def handle_receive_message(self):
         self.is_running = True
         while self.is_running:
-            if self.q_receiver.qsize() > 0:
-                msg_params = self.q_receiver.get()
-                self.notify(msg_params)
-
-            time.sleep(0.3)
+            # blocks until a message (or the shutdown sentinel) arrives
+            msg_params = self.q_receiver.get()
+            if msg_params is None:
+                break
+            self.notify(msg_params)
         logging.info("!!!!!!handle_receive_message stopped!!!")
 
     def stop_receive_message(self):
         self.is_running = False
+        # wake up handle_receive_message if it is waiting on the receive queue
+        self.q_receiver.put(None)
         self.__stop_thread(self.server_send_thread)
         self.__stop_thread(self.server_receive_thread)
         self.__stop_thread(self.server_collective_thread)
@@ -94,5 +106,5 @@ class MpiCommunicationManager(BaseCommunicationManager):
 
     def __stop_thread(self, thread):
         if thread:
-            thread.raise_exception()
+            thread.stop()
             thread.join()
@@ -3,6 +3,9 @@ import logging
 import threading
 import traceback
 
+from mpi4py import MPI
+
+from .mpi_transfer import MPI_STOP_TAG, recv_params
 from ..message import Message
 
 
@@ -18,17 +21,22 @@ class MPIReceiveThread(threading.Thread):
 
     def run(self):
         logging.debug("Starting Thread:" + self.name + ". Process ID = " + str(self.rank))
-        while True:
+        status = MPI.Status()
+        while not self.stopped():
             try:
-                msg_str = self.comm.recv()
+                # blocking receive: the thread sleeps inside MPI until a message arrives
+                msg_params = recv_params(self.comm, status)
+                if msg_params is None:
+                    break
                 msg = Message()
-                msg.init(msg_str)
+                msg.init(msg_params)
                 self.q.put(msg)
             except Exception:
                 traceback.print_exc()
 
     def stop(self):
         self._stop_event.set()
+        self.comm.send(None, dest=self.rank, tag=MPI_STOP_TAG)
 
     def stopped(self):
         return self._stop_event.is_set()
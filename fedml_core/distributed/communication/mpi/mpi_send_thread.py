@@ -1,9 +1,9 @@
 import ctypes
 import logging
 import threading
-import time
 import traceback
 
+from .mpi_transfer import BroadcastRequest, broadcast_params, send_params
 from ..message import Message
 
 
@@ -19,19 +19,23 @@ class MPISendThread(threading.Thread):
 
     def run(self):
         logging.debug("Starting " + self.name + ". Process ID = " + str(self.rank))
-        while True:
+        while not self.stopped():
             try:
-                if not self.q.empty():
-                    msg = self.q.get()
-                    dest_id = msg.get(Message.MSG_ARG_KEY_RECEIVER)
-                    self.comm.send(msg.to_string(), dest=dest_id)
+                # blocks until a message is queued; None is the shutdown sentinel put by stop()
+                msg = self.q.get()
+                if msg is None:
+                    break
+                if isinstance(msg, BroadcastRequest):
+                    broadcast_params(self.comm, msg.params, msg.receiver_ids, msg.receiver_params)
                 else:
-                    time.sleep(0.003)
+                    dest_id = msg.get(Message.MSG_ARG_KEY_RECEIVER)
+                    send_params(self.comm, msg.to_string(), dest_id)
             except Exception:
                 traceback.print_exc()
 
     def stop(self):
         self._stop_event.set()
+        self.q.put(None)
 
     def stopped(self):
         return self._stop_event.is_set()
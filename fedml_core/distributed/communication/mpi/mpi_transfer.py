@@ -0,0 +1,76 @@
+"""
+Wire protocol of the MPI backend.
+
+Messages without tensors are pickled as before (`comm.send`, tag MPI_MSG_TAG). A message that carries tensors is
+sent as a pickled header (`tensor_serializer.split_tensors`) with tag MPI_TENSOR_MSG_TAG followed by one buffer-based
+`Isend` per tensor, so model weights are never pickled. A broadcast sends the per-receiver header with tag
+MPI_BCAST_MSG_TAG to every rank and then moves the shared tensors once with `Ibcast` from the sender.
+"""
+
+from collections import namedtuple
+
+from mpi4py import MPI
+
+from .. import tensor_serializer
+
+MPI_MSG_TAG = 0
+MPI_TENSOR_MSG_TAG = 1
+MPI_TENSOR_TAG = 2
+MPI_BCAST_MSG_TAG = 3
+# tag of the empty message a rank sends to itself to unblock its receive thread on shutdown
+MPI_STOP_TAG = 32767
+
+# queued on the send thread by MpiCommunicationManager.broadcast_message
+BroadcastRequest = namedtuple("BroadcastRequest", ["params", "receiver_ids", "receiver_params"])
+
+
+def send_params(comm, params, dest):
+    if not tensor_serializer.has_tensors(params):
+        comm.send(params, dest=dest, tag=MPI_MSG_TAG)
+        return
+    header, buffers = tensor_serializer.split_tensors(params)
+    comm.send(header, dest=dest, tag=MPI_TENSOR_MSG_TAG)
+    MPI.Request.Waitall([comm.Isend(buffer, dest=dest, tag=MPI_TENSOR_TAG) for buffer in buffers])
+
+
+def broadcast_params(comm, params, receiver_ids, receiver_params):
+    """Send `params` updated with `receiver_params[i]` to every receiver_ids[i].
+
+    The tensors are moved with one collective per tensor, which requires every other rank of `comm` to be a
+    receiver; otherwise this falls back to one `send_params` per receiver.
+    """
+    rank = comm.Get_rank()
+    all_other_ranks = set(range(comm.Get_size())) - {rank}
+    if set(receiver_ids) != all_other_ranks or len(receiver_ids) != len(all_other_ranks) or \
+            not tensor_serializer.has_tensors(params):
+        for receiver_id, extra_params in zip(receiver_ids, receiver_params):
+            receiver_msg_params = dict(params)
+            receiver_msg_params.update(extra_params)
+            send_params(comm, receiver_msg_params, receiver_id)
+        return
+
+    header, buffers = tensor_serializer.split_tensors(params)
+    for receiver_id, extra_params in zip(receiver_ids, receiver_params):
+        receiver_header = dict(header)
+        receiver_header["obj"] = dict(header["obj"])
+        receiver_header["obj"].update(extra_params)
+        comm.send(receiver_header, dest=receiver_id, tag=MPI_BCAST_MSG_TAG)
+    MPI.Request.Waitall([comm.Ibcast(buffer, root=rank) for buffer in buffers])
+
+
+def recv_params(comm, status):
+    """Blocking receive of the next message from any rank; returns None for the shutdown message."""
+    header = comm.recv(source=MPI.ANY_SOURCE, tag=MPI.ANY_TAG, status=status)
+    tag = status.Get_tag()
+    source = status.Get_source()
+    if tag == MPI_STOP_TAG:
+        return None
+    if tag == MPI_TENSOR_MSG_TAG:
+        buffers = tensor_serializer.empty_buffers(header)
+        MPI.Request.Waitall([comm.Irecv(buffer, source=source, tag=MPI_TENSOR_TAG) for buffer in buffers])
+        return tensor_serializer.join_tensors(header, buffers)
+    if tag == MPI_BCAST_MSG_TAG:
+        buffers = tensor_serializer.empty_buffers(header)
+        MPI.Request.Waitall([comm.Ibcast(buffer, root=source) for buffer in buffers])
+        return tensor_serializer.join_tensors(header, buffers)
+    return header
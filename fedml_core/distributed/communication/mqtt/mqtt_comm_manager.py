@@ -6,6 +6,7 @@ from typing import List
 
 import paho.mqtt.client as mqtt
 
+from fedml_core.distributed.communication import tensor_serializer
 from fedml_core.distributed.communication.base_com_manager import BaseCommunicationManager
 from fedml_core.distributed.communication.message import Message
 from fedml_core.distributed.communication.observer import Observer
@@ -70,6 +71,9 @@ class MqttCommManager(BaseCommunicationManager):
             print(result)
 
     def _on_message(self, client, userdata, msg):
+        if tensor_serializer.is_binary(msg.payload):
+            self._notify(msg.payload)
+            return
         msg.payload = str(msg.payload, encoding='utf-8')
         # print("_on_message: " + str(msg.payload))
         self._notify(str(msg.payload))
@@ -91,7 +95,10 @@ class MqttCommManager(BaseCommunicationManager):
     def _notify(self, msg):
         # print("_notify: " + msg)
         msg_params = Message()
-        msg_params.init_from_json_string(str(msg))
+        if isinstance(msg, bytes):
+            msg_params.init_from_bytes(msg)
+        else:
+            msg_params.init_from_json_string(str(msg))
         msg_type = msg_params.get_type()
         for observer in self._observers:
             observer.receive_message(msg_type, msg_params)
@@ -107,17 +114,18 @@ class MqttCommManager(BaseCommunicationManager):
             receiving message topic (subscribe): serverID_clientID
 
         """
+        # messages carrying tensors use the binary format; the others (e.g. from/to mobile devices) stay JSON
+        payload = msg.to_bytes() if msg.has_tensors() else msg.to_json()
         if self.client_id == 0:
             # server
             receiver_id = msg.get_receiver_id()
             topic = self._topic + str(0) + "_" + str(receiver_id)
             logging.info("topic = %s" % str(topic))
-            payload = msg.to_json()
             self._client.publish(topic, payload=payload)
             logging.info("sent")
         else:
             # client
-            self._client.publish(self._topic + str(self.client_id), payload=msg.to_json())
+            self._client.publish(self._topic + str(self.client_id), payload=payload)
 
     def handle_receive_message(self):
         pass
@@ -0,0 +1,95 @@
+import hashlib
+import logging
+import os
+import re
+import uuid
+
+_SHA256_HEX = re.compile(r"[0-9a-f]{64}")
+
+
+def payload_hash(chunks):
+    """sha256 hex digest of a serialized payload given as a list of buffers (see tensor_serializer.dumps_chunks)."""
+    digest = hashlib.sha256()
+    for chunk in chunks:
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def is_sha256_digest(digest):
+    return isinstance(digest, str) and _SHA256_HEX.fullmatch(digest) is not None
+
+
+class ModelCache(object):
+    """Size-bounded, content-addressed on-disk cache of downloaded model payloads.
+
+    Each serialized (uncompressed) payload is stored as `<cache_dir>/<sha256 hex>`. Keys must be sha256 hex digests,
+    and a payload is only stored, and only returned, when it hashes to its key, so a truncated download or a
+    foreign file in the directory is never served. Files are written atomically (temp file + rename), so several
+    processes of one user can share a cache directory. A hit refreshes the file's mtime, and `put` evicts the least
+    recently used files once the total size exceeds `max_size_bytes`.
+    """
+
+    def __init__(self, cache_dir, max_size_bytes):
+        self.cache_dir = cache_dir
+        self.max_size_bytes = max_size_bytes
+        os.makedirs(self.cache_dir, mode=0o700, exist_ok=True)
+
+    def _path(self, digest):
+        if not is_sha256_digest(digest):
+            raise ValueError("model cache key is not a sha256 hex digest: %r" % (digest,))
+        return os.path.join(self.cache_dir, digest)
+
+    def get(self, digest):
+        path = self._path(digest)
+        try:
+            with open(path, "rb") as f:
+                payload = bytearray(os.fstat(f.fileno()).st_size)
+                f.readinto(payload)
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        if payload_hash([payload]) != digest:
+            logging.warning("model cache entry %s does not match its hash, removing it" % digest)
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            return None
+        logging.info("model cache hit: %s (%d bytes)" % (digest, len(payload)))
+        return payload
+
+    def put(self, digest, payload):
+        if len(payload) > self.max_size_bytes:
+            return
+        if payload_hash([payload]) != digest:
+            logging.warning("model payload does not match its hash %s, not caching it" % digest)
+            return
+        tmp_path = self._path(digest) + ".tmp_" + uuid.uuid4().hex
+        with open(tmp_path, "wb") as f:
+            f.write(payload)
+        os.replace(tmp_path, self._path(digest))
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        total_size = 0
+        for name in os.listdir(self.cache_dir):
+            if ".tmp_" in name:
+                continue
+            try:
+                stat = os.stat(self._path(name))
+            except FileNotFoundError:
+                # evicted concurrently by another process
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+            total_size += stat.st_size
+        entries.sort()
+        for _, size, name in entries:
+            if total_size <= self.max_size_bytes:
+                break
+            try:
+                os.remove(self._path(name))
+            except FileNotFoundError:
+                pass
+            total_size -= size
+            logging.info("model cache evicted: %s" % name)
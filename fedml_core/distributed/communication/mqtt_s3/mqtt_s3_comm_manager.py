@@ -1,19 +1,28 @@
 # -*-coding:utf-8-*-
 import json
 import logging
+import os
+import threading
 import time
 import traceback
 import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import List
 
 import paho.mqtt.client as mqtt
 import yaml
 
+from fedml_core.distributed.communication import tensor_serializer
 from fedml_core.distributed.communication.base_com_manager import BaseCommunicationManager
 from fedml_core.distributed.communication.message import Message
 from fedml_core.distributed.communication.observer import Observer
+from .model_cache import ModelCache, is_sha256_digest, payload_hash
 from .remote_storage import S3Storage
 
+# number of recently uploaded model hashes remembered for upload deduplication
+UPLOADED_MODEL_HISTORY_SIZE = 16
+
 
 class MqttS3CommManager(BaseCommunicationManager):
     def __init__(
@@ -26,7 +35,24 @@ class MqttS3CommManager(BaseCommunicationManager):
         if args is not None:
             self.client_real_ids = json.loads(args.client_ids)
 
-        self.model_params_key_map = list()
+        # sha256 of the serialized model -> (S3 key, url) of its most recent uploads
+        self._uploaded_models = OrderedDict()
+        self.model_cache = None
+        model_cache_size_mb = getattr(args, "model_cache_size_mb", 1024)
+        if model_cache_size_mb > 0:
+            model_cache_dir = getattr(args, "model_cache_dir", "")
+            if not model_cache_dir:
+                # per user, so no other account can place files under the hashes this one will look up
+                model_cache_dir = os.path.join(os.path.expanduser("~"), ".cache", "fedml_model_cache")
+            self.model_cache = ModelCache(model_cache_dir, model_cache_size_mb * 1024 * 1024)
+
+        # with async_upload, uploads (and the publishes queued behind them, to keep the message order) run on one
+        # background thread and send_message returns a future; at most upload_queue_size messages may be pending
+        # before send_message blocks the caller
+        self._send_executor = None
+        if getattr(args, "async_upload", 0) == 1:
+            self._send_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mqtt_s3_send")
+            self._send_slots = threading.BoundedSemaphore(getattr(args, "upload_queue_size", 2))
 
         self._unacked_sub = list()
         self._observers: List[Observer] = []
@@ -147,11 +173,8 @@ class MqttS3CommManager(BaseCommunicationManager):
         if s3_key_str != "":
             logging.info("mqtt_s3.on_message: use s3 pack, s3 message key %s" % s3_key_str)
 
-            # read S3 object
-            # s3_obj = self.s3_storage.read_json(s3_key_str)
-            # model_params = str(s3_obj, encoding="utf-8")
-            # model_params = json.loads(model_params)
-            model_params = self.s3_storage.read_model(s3_key_str)
+            # read S3 object, unless the local cache already holds a model with the same hash
+            model_params = self._download_model(s3_key_str, payload_obj.get(Message.MSG_ARG_KEY_MODEL_PARAMS_HASH))
 
             logging.info("mqtt_s3.on_message: model params length %d" % len(model_params))
 
@@ -179,7 +202,14 @@ class MqttS3CommManager(BaseCommunicationManager):
         sending message topic (publish): fedml_runid_clientID
         receiving message topic (subscribe): fedml_runid_serverID_clientID
 
+        Returns a future that completes (with `msg`) once the model is uploaded and the message is published.
         """
+        if self._send_executor is None:
+            self._send_message_impl(msg)
+            return self._completed_future(msg)
+        return self._submit(self._send_message_impl, msg, self._snapshot_model(msg))
+
+    def _send_message_impl(self, msg: Message, model_chunks=None):
         logging.info("mqtt_s3.send_message: starting...")
         if self.client_id == 0:
             # server
@@ -195,19 +225,10 @@ class MqttS3CommManager(BaseCommunicationManager):
             if model_params_obj != "":
                 # S3
                 logging.info("mqtt_s3.send_message: S3+MQTT msg sent, s3 message key = %s" % message_key)
-                # self.s3_storage.write_json(message_key, json.dumps(model_params_obj))
-                # model_uploaded = False
-                # for model_params_key_item in self.model_params_key_map:
-                #     if model_params_obj == model_params_key_item["obj"]:
-                #         model_uploaded = True
-                #         model_params_key_url = model_params_key_item
-                #         break
-                # if not model_uploaded:
-                model_url = self.s3_storage.write_model(message_key, model_params_obj)
-                model_params_key_url = {"key": message_key, "url": model_url, "obj": model_params_obj}
-                #self.model_params_key_map.append(model_params_key_url)
-                payload[Message.MSG_ARG_KEY_MODEL_PARAMS] = model_params_key_url["key"]
-                payload[Message.MSG_ARG_KEY_MODEL_PARAMS_URL] = model_params_key_url["url"]
+                message_key, model_url, model_hash = self._upload_model(message_key, model_params_obj, model_chunks)
+                payload[Message.MSG_ARG_KEY_MODEL_PARAMS] = message_key
+                payload[Message.MSG_ARG_KEY_MODEL_PARAMS_URL] = model_url
+                payload[Message.MSG_ARG_KEY_MODEL_PARAMS_HASH] = model_hash
                 self._client.publish(topic, payload=json.dumps(payload))
             else:
                 # pure MQTT
@@ -224,23 +245,113 @@ class MqttS3CommManager(BaseCommunicationManager):
             if model_params_obj != "":
                 # S3
                 logging.info("mqtt_s3.send_message: S3+MQTT msg sent, message_key = %s" % message_key)
-                # self.s3_storage.write_json(message_key, json.dumps(model_params_obj))
-                # model_uploaded = False
-                # for model_params_key_item in self.model_params_key_map:
-                #     if model_params_obj == model_params_key_item["obj"]:
-                #         model_uploaded = True
-                #         model_params_key_url = model_params_key_item
-                #         break
-                # if not model_uploaded:
-                model_url = self.s3_storage.write_model(message_key, model_params_obj)
-                model_params_key_url = {"key": message_key, "url": model_url, "obj": model_params_obj}
-                #self.model_params_key_map.append(model_params_key_url)
-                payload[Message.MSG_ARG_KEY_MODEL_PARAMS] = model_params_key_url["key"]
-                payload[Message.MSG_ARG_KEY_MODEL_PARAMS_URL] = model_params_key_url["url"]
+                message_key, model_url, model_hash = self._upload_model(message_key, model_params_obj, model_chunks)
+                payload[Message.MSG_ARG_KEY_MODEL_PARAMS] = message_key
+                payload[Message.MSG_ARG_KEY_MODEL_PARAMS_URL] = model_url
+                payload[Message.MSG_ARG_KEY_MODEL_PARAMS_HASH] = model_hash
                 self._client.publish(topic, payload=json.dumps(payload))
             else:
                 logging.info("mqtt_s3.send_message: MQTT msg sent")
                 self._client.publish(topic, payload=json.dumps(payload))
+        return msg
+
+    def broadcast_message(self, msg: Message, receiver_ids, receiver_params=None):
+        """
+        [server]
+        the model params are uploaded to S3 once; every client receives a control message on
+        fedml_runid_serverID_clientID holding its own params plus the shared S3 key and url.
+        """
+        model_params_obj = msg.get_params().get(Message.MSG_ARG_KEY_MODEL_PARAMS, "")
+        if self.client_id != 0 or model_params_obj == "":
+            # one send_message per receiver, queued in order when async_upload is on
+            super().broadcast_message(msg, receiver_ids, receiver_params)
+            if self._send_executor is None:
+                return self._completed_future(msg)
+            # the executor runs tasks in order, so this completes after the sends queued above
+            return self._submit(lambda: msg)
+        if self._send_executor is None:
+            self._broadcast_message_impl(msg, receiver_ids, receiver_params)
+            return self._completed_future(msg)
+        return self._submit(self._broadcast_message_impl, msg, receiver_ids, receiver_params,
+                            self._snapshot_model(msg))
+
+    def _broadcast_message_impl(self, msg: Message, receiver_ids, receiver_params=None, model_chunks=None):
+        payload = msg.get_params()
+        model_params_obj = payload.get(Message.MSG_ARG_KEY_MODEL_PARAMS, "")
+        message_key = self._topic + str(0) + "_broadcast_" + str(uuid.uuid4())
+        logging.info("mqtt_s3.broadcast_message: S3+MQTT msg broadcast, s3 message key = %s" % message_key)
+        message_key, model_url, model_hash = self._upload_model(message_key, model_params_obj, model_chunks)
+        # like send_message, the key and url replace the model in `msg` so that callers can read the url back
+        payload[Message.MSG_ARG_KEY_MODEL_PARAMS] = message_key
+        payload[Message.MSG_ARG_KEY_MODEL_PARAMS_URL] = model_url
+        payload[Message.MSG_ARG_KEY_MODEL_PARAMS_HASH] = model_hash
+        for i, receiver_id in enumerate(receiver_ids):
+            topic = self._topic + str(0) + "_" + str(receiver_id)
+            receiver_payload = dict(payload)
+            receiver_payload[Message.MSG_ARG_KEY_RECEIVER] = receiver_id
+            if receiver_params is not None:
+                receiver_payload.update(receiver_params[i])
+            self._client.publish(topic, payload=json.dumps(receiver_payload))
+        return msg
+
+    def _submit(self, fn, *args):
+        # blocks while upload_queue_size messages are still pending (backpressure on the training loop)
+        self._send_slots.acquire()
+        future = self._send_executor.submit(fn, *args)
+        future.add_done_callback(self._on_send_done)
+        return future
+
+    def _on_send_done(self, future):
+        self._send_slots.release()
+        if future.exception() is not None:
+            logging.error("mqtt_s3: sending message failed: %s" % str(future.exception()))
+
+    @staticmethod
+    def _completed_future(msg):
+        future = Future()
+        future.set_result(msg)
+        return future
+
+    @staticmethod
+    def _snapshot_model(msg):
+        # the upload runs after send_message returned and the trainer may update the same tensors in place
+        # meanwhile, so the model is serialized (copied) on the caller's thread
+        model_params_obj = msg.get_params().get(Message.MSG_ARG_KEY_MODEL_PARAMS, "")
+        if model_params_obj == "":
+            return None
+        return [tensor_serializer.dumps(model_params_obj)]
+
+    def _upload_model(self, message_key, model_params_obj, chunks=None):
+        """Upload the serialized model unless an identical payload was uploaded recently.
+
+        Returns the S3 key and url to announce (those of the earlier upload for a duplicate) and the payload hash.
+        """
+        if chunks is None:
+            chunks = tensor_serializer.dumps_chunks(model_params_obj)
+        model_hash = payload_hash(chunks)
+        if model_hash in self._uploaded_models:
+            self._uploaded_models.move_to_end(model_hash)
+            message_key, model_url = self._uploaded_models[model_hash]
+            logging.info("mqtt_s3: identical model already uploaded as %s, skip uploading" % message_key)
+            return message_key, model_url, model_hash
+
+        model_url = self.s3_storage.write_payload(message_key, chunks)
+        self._uploaded_models[model_hash] = (message_key, model_url)
+        if len(self._uploaded_models) > UPLOADED_MODEL_HISTORY_SIZE:
+            self._uploaded_models.popitem(last=False)
+        return message_key, model_url, model_hash
+
+    def _download_model(self, message_key, model_hash):
+        if self.model_cache is None or not is_sha256_digest(model_hash):
+            if model_hash:
+                logging.warning("mqtt_s3: ignoring the malformed model hash %r" % (model_hash,))
+            return self.s3_storage.read_model(message_key)
+        payload = self.model_cache.get(model_hash)
+        if payload is None:
+            # cached decompressed, so that the cache can check every entry against its hash
+            payload = S3Storage.decompress_payload(self.s3_storage.read_payload(message_key))
+            self.model_cache.put(model_hash, payload)
+        return S3Storage.decode_model(payload)
 
     def send_message_json(self, topic_name, json_message):
         self._client.publish(topic_name, payload=json_message)
@@ -255,6 +366,9 @@ class MqttS3CommManager(BaseCommunicationManager):
 
     def stop_receive_message(self):
         logging.info("mqtt_s3.stop_receive_message: stopping...")
+        if self._send_executor is not None:
+            # let the pending uploads finish before disconnecting
+            self._send_executor.shutdown(wait=True)
         self._client.loop_stop()
         self._client.disconnect()
 
@@ -1,26 +1,79 @@
+import io
 import os
-import tempfile
 import uuid
+import zlib
 
 import joblib
 import yaml
 import boto3
+from boto3.s3.transfer import TransferConfig
 from botocore.retries import bucket
 from loguru import logger
 import logging
 import json
 
+from fedml_core.distributed.communication import tensor_serializer
+
+# prefix of model objects whose payload is zlib-compressed
+COMPRESSED_MAGIC = b"FMLZ"
+
+
+class _ChunkStreamReader(io.RawIOBase):
+    """Read-only, non-seekable file object over an iterator of byte buffers.
+
+    boto3 reads it part by part, so a serialized (and optionally compressed) model is uploaded without being
+    joined into one contiguous buffer first. `read(n)` only returns fewer than n bytes at the end of the stream,
+    which keeps every multipart part but the last at the configured chunk size.
+    """
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._current = memoryview(b"")
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        view = memoryview(b).cast("B")
+        size = 0
+        while size < len(view):
+            if len(self._current) == 0:
+                chunk = next(self._chunks, None)
+                if chunk is None:
+                    break
+                self._current = memoryview(chunk).cast("B")
+                continue
+            take = min(len(self._current), len(view) - size)
+            view[size:size + take] = self._current[:take]
+            self._current = self._current[take:]
+            size += take
+        return size
+
+
+def _compress_chunks(chunks, level):
+    compressor = zlib.compressobj(level)
+    yield COMPRESSED_MAGIC
+    for chunk in chunks:
+        yield compressor.compress(chunk)
+    yield compressor.flush()
+
 
 class S3Storage():
     def __init__(self, s3_config_path):
 
         self.set_config_from_file(s3_config_path)
-        self.s3 = boto3.client('s3', region_name=self.cn_region_name,
+        self.s3 = boto3.client('s3', region_name=self.cn_region_name, endpoint_url=self.endpoint_url,
                                aws_access_key_id=self.cn_s3_aki, aws_secret_access_key=self.cn_s3_sak)
 
-        self.s3_resource = boto3.resource('s3', region_name=self.cn_region_name,
+        self.s3_resource = boto3.resource('s3', region_name=self.cn_region_name, endpoint_url=self.endpoint_url,
                                           aws_access_key_id=self.cn_s3_aki, aws_secret_access_key=self.cn_s3_sak)
 
+        # large models are split into parts that are uploaded / downloaded (ranged GETs) by parallel threads
+        self.transfer_config = TransferConfig(
+            multipart_threshold=self.multipart_chunksize, multipart_chunksize=self.multipart_chunksize,
+            max_concurrency=self.max_concurrency, use_threads=self.max_concurrency > 1
+        )
+
     def write_json(self, message_key, payload):
         obj = self.s3_resource.Object(self.bucket_name, message_key)
         obj.put(Body=payload)
@@ -31,29 +84,48 @@ class S3Storage():
         return payload
 
     def write_model(self, message_key, model):
-        # obj = self.s3_resource.Object(self.bucket_name, message_key)
-        # obj.put(Body=model)
-        with tempfile.TemporaryFile() as fp:
-            joblib.dump(model, fp)
-            fp.seek(0)
-            self.s3.put_object(Body=fp.read(), Bucket=self.bucket_name, Key=message_key, ACL='public-read')
-            model_url = self.s3.generate_presigned_url(
-                "get_object", ExpiresIn=60*60*24*5, Params={"Bucket": self.bucket_name, "Key": message_key}
-            )
-            return model_url
-        # self.upload_file(model, message_key)
+        # the binary tensor format is streamed from memory into a (multipart) upload: no temp file, no pickle
+        return self.write_payload(message_key, tensor_serializer.dumps_chunks(model))
+
+    def write_payload(self, message_key, chunks):
+        """Upload a serialized model given as a list of buffers and return its presigned url."""
+        if self.compression == "zlib":
+            chunks = _compress_chunks(chunks, self.compression_level)
+        self.s3.upload_fileobj(_ChunkStreamReader(chunks), self.bucket_name, message_key,
+                               ExtraArgs={'ACL': 'public-read'}, Config=self.transfer_config)
+        model_url = self.s3.generate_presigned_url(
+            "get_object", ExpiresIn=60*60*24*5, Params={"Bucket": self.bucket_name, "Key": message_key}
+        )
+        return model_url
 
     def read_model(self, message_key):
-        with tempfile.TemporaryFile() as fp:
-            self.s3.download_fileobj(Fileobj=fp, Bucket=self.bucket_name, Key=message_key)
-            fp.seek(0)
-            try:
-                model = joblib.load(fp)
-            except Exception as e:
-                print("Exception "+str(e))
-        # local_path = "./" + str(uuid.uuid4()) + ".ckpt"
-        # self.download_file(message_key, local_path)
-        # return local_path
+        return self.decode_model(self.read_payload(message_key))
+
+    def read_payload(self, message_key):
+        """Download a model object as stored (possibly compressed) into a writable in-memory buffer."""
+        download_buffer = io.BytesIO()
+        self.s3.download_fileobj(self.bucket_name, message_key, download_buffer, Config=self.transfer_config)
+        return download_buffer.getbuffer()
+
+    @staticmethod
+    def decompress_payload(payload):
+        """The serialized model of a downloaded payload, i.e. the chunks passed to `write_payload`, joined."""
+        if bytes(payload[:len(COMPRESSED_MAGIC)]) == COMPRESSED_MAGIC:
+            return zlib.decompress(payload[len(COMPRESSED_MAGIC):])
+        return payload
+
+    @staticmethod
+    def decode_model(payload):
+        model = None
+        try:
+            payload = S3Storage.decompress_payload(payload)
+            if tensor_serializer.is_binary(payload):
+                model = tensor_serializer.loads(payload)
+            else:
+                # objects written by older versions are joblib dumps
+                model = joblib.load(io.BytesIO(payload))
+        except Exception as e:
+            print("Exception "+str(e))
         return model
 
     @logger.catch
@@ -118,6 +190,12 @@ class S3Storage():
             self.cn_s3_sak = config['CN_S3_SAK']
             self.cn_region_name = config['CN_REGION_NAME']
             self.bucket_name = config['BUCKET_NAME']
+            # optional transfer settings
+            self.endpoint_url = config.get('S3_ENDPOINT_URL', None)
+            self.max_concurrency = int(config.get('S3_MAX_CONCURRENCY', 10))
+            self.multipart_chunksize = int(config.get('S3_MULTIPART_CHUNKSIZE_MB', 8)) * 1024 * 1024
+            self.compression = config.get('S3_COMPRESSION', None)
+            self.compression_level = int(config.get('S3_COMPRESSION_LEVEL', 1))
 
 # if __name__ == "__main__":
 #     upload_file("./s3_test_file", "run_id_000001/client_id_s3_test_file")
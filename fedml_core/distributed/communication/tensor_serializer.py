@@ -0,0 +1,174 @@
+"""
+Binary wire format for message payloads that carry tensors (e.g. model state_dicts).
+
+    | MAGIC (4 bytes) | header length (uint32, little endian) | JSON header | padding | raw tensor buffers |
+
+The JSON header holds the payload with every torch.Tensor / numpy.ndarray replaced by a placeholder
+{"__tensor__": index} plus one (kind, dtype, shape, offset, nbytes) record per tensor. Tensor buffers are
+written back-to-back (64-byte aligned) in their native memory layout, so decoding is a zero-copy
+numpy.frombuffer / torch.from_numpy view over the received buffer instead of a JSON/list round trip.
+"""
+
+import json
+import struct
+
+import numpy as np
+
+try:
+    import torch
+except ImportError:
+    torch = None
+
+
+MAGIC = b"FMLT"
+_PREFIX = struct.Struct("<4sI")
+_ALIGNMENT = 64
+_TENSOR_PLACEHOLDER = "__tensor__"
+
+
+def _align(offset):
+    return (offset + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+
+def _is_tensor(obj):
+    return isinstance(obj, np.ndarray) or (torch is not None and isinstance(obj, torch.Tensor))
+
+
+def _to_byte_array(obj):
+    """Return (kind, dtype name, shape, flat uint8 numpy view) of a tensor without copying when possible."""
+    if isinstance(obj, np.ndarray):
+        array = np.ascontiguousarray(obj)
+        return "numpy", array.dtype.str, list(array.shape), array.reshape(-1).view(np.uint8)
+    tensor = obj.detach().cpu().contiguous()
+    dtype = str(tensor.dtype).replace("torch.", "")
+    return "torch", dtype, list(tensor.shape), tensor.reshape(-1).view(torch.uint8).numpy()
+
+
+def _from_byte_array(kind, dtype, shape, data):
+    if kind == "numpy":
+        return data.view(np.dtype(dtype)).reshape(shape)
+    if data.size == 0:
+        # a freshly allocated empty array may have stride 0, which torch refuses to view as another dtype
+        return torch.empty(shape, dtype=getattr(torch, dtype))
+    return torch.from_numpy(data).view(getattr(torch, dtype)).reshape(shape)
+
+
+def _encode(obj, tensors):
+    if _is_tensor(obj):
+        tensors.append(obj)
+        return {_TENSOR_PLACEHOLDER: len(tensors) - 1}
+    if isinstance(obj, dict):
+        return {k: _encode(v, tensors) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_encode(v, tensors) for v in obj]
+    if isinstance(obj, np.generic):
+        return obj.item()
+    return obj
+
+
+def _decode(obj, tensors):
+    if isinstance(obj, dict):
+        if len(obj) == 1 and _TENSOR_PLACEHOLDER in obj:
+            return tensors[obj[_TENSOR_PLACEHOLDER]]
+        return {k: _decode(v, tensors) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_decode(v, tensors) for v in obj]
+    return obj
+
+
+def has_tensors(obj):
+    if _is_tensor(obj):
+        return True
+    if isinstance(obj, dict):
+        return any(has_tensors(v) for v in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return any(has_tensors(v) for v in obj)
+    return False
+
+
+def is_binary(buf):
+    return isinstance(buf, (bytes, bytearray, memoryview)) and bytes(buf[:len(MAGIC)]) == MAGIC
+
+
+def dumps_chunks(obj):
+    """Serialize `obj` into a list of byte buffers (prefix+header, then padding and one buffer per tensor).
+
+    The tensor buffers are views of the tensors' own memory, so a caller that writes or streams the
+    chunks one by one never needs one contiguous copy of the whole payload.
+    """
+    tensors = []
+    encoded = _encode(obj, tensors)
+    byte_arrays = [_to_byte_array(t) for t in tensors]
+
+    # the header length depends on the offsets, so lay the tensors out relative to the data section first
+    tensor_meta = []
+    offset = 0
+    for kind, dtype, shape, data in byte_arrays:
+        offset = _align(offset)
+        tensor_meta.append([kind, dtype, shape, offset, int(data.nbytes)])
+        offset += data.nbytes
+    header = json.dumps({"obj": encoded, "tensors": tensor_meta}).encode("utf-8")
+
+    chunks = [_PREFIX.pack(MAGIC, len(header)) + header]
+    chunks.append(bytes(_align(len(chunks[0])) - len(chunks[0])))
+    data_position = 0
+    for (_, _, _, data), (_, _, _, tensor_offset, nbytes) in zip(byte_arrays, tensor_meta):
+        if tensor_offset > data_position:
+            chunks.append(bytes(tensor_offset - data_position))
+        chunks.append(memoryview(data))
+        data_position = tensor_offset + nbytes
+    return chunks
+
+
+def dumps(obj):
+    return b"".join(dumps_chunks(obj))
+
+
+def loads(buf):
+    """Deserialize a buffer produced by `dumps`.
+
+    Tensors are views into the buffer. A read-only buffer (e.g. `bytes` from a socket) is copied once into a
+    bytearray first so that the returned tensors are writable.
+    """
+    view = memoryview(buf)
+    if view.readonly:
+        view = memoryview(bytearray(view))
+    magic, header_len = _PREFIX.unpack_from(view, 0)
+    if magic != MAGIC:
+        raise ValueError("buffer is not a FedML binary message")
+    header_end = _PREFIX.size + header_len
+    header = json.loads(bytes(view[_PREFIX.size:header_end]).decode("utf-8"))
+    data_start = _align(header_end)
+
+    raw = np.frombuffer(view, dtype=np.uint8)
+    tensors = []
+    for kind, dtype, shape, offset, nbytes in header["tensors"]:
+        data = raw[data_start + offset:data_start + offset + nbytes]
+        tensors.append(_from_byte_array(kind, dtype, shape, data))
+    return _decode(header["obj"], tensors)
+
+
+def split_tensors(obj):
+    """Split `obj` into a small header (the payload with tensor placeholders plus one (kind, dtype, shape, nbytes)
+    record per tensor) and the list of flat uint8 views of the tensors, for transports that move the header and
+    the raw tensor buffers separately (e.g. MPI Send/Bcast)."""
+    tensors = []
+    encoded = _encode(obj, tensors)
+    tensor_meta = []
+    buffers = []
+    for kind, dtype, shape, data in [_to_byte_array(t) for t in tensors]:
+        tensor_meta.append([kind, dtype, shape, int(data.nbytes)])
+        buffers.append(data)
+    return {"obj": encoded, "tensors": tensor_meta}, buffers
+
+
+def empty_buffers(header):
+    """Allocate the receive buffers for the tensors described by a `split_tensors` header."""
+    return [np.empty(nbytes, dtype=np.uint8) for _, _, _, nbytes in header["tensors"]]
+
+
+def join_tensors(header, buffers):
+    """Inverse of `split_tensors`; the returned tensors are views of `buffers`."""
+    tensors = [_from_byte_array(kind, dtype, shape, data)
+               for (kind, dtype, shape, _), data in zip(header["tensors"], buffers)]
+    return _decode(header["obj"], tensors)
@@ -0,0 +1,96 @@
+import pickle
+
+import numpy as np
+import torch
+
+from fedml_core.distributed.communication import tensor_serializer
+
+
+def sample_payload():
+    return {
+        "model_params": {
+            "conv.weight": torch.randn(4, 3, 3, 3),
+            "bn.num_batches_tracked": torch.tensor(7),
+            "half": torch.randn(5).half(),
+            "bf16": torch.randn(3, 2).bfloat16(),
+            "mask": torch.rand(6) > 0.5,
+            "index": torch.arange(10, dtype=torch.int64),
+            "transposed": torch.randn(3, 5).t(),
+            "strided": torch.arange(20, dtype=torch.float32)[::3],
+            "empty": torch.zeros(0, 4),
+        },
+        "numpy": [np.arange(6, dtype=np.float64).reshape(2, 3), np.uint8(3), {"deep": [np.ones((2, 2), np.int32)]}],
+        "client_idx": "5",
+        "num_samples": 120,
+        "lr": 0.1,
+        "flags": [True, None, "x"],
+    }
+
+
+def assert_same(expected, actual):
+    if isinstance(expected, torch.Tensor):
+        assert isinstance(actual, torch.Tensor)
+        assert actual.dtype == expected.dtype and actual.shape == expected.shape
+        assert torch.equal(actual, expected)
+    elif isinstance(expected, np.ndarray):
+        assert isinstance(actual, np.ndarray)
+        assert actual.dtype == expected.dtype and actual.shape == expected.shape
+        assert np.array_equal(actual, expected)
+    elif isinstance(expected, np.generic):
+        # numpy scalars travel as plain python numbers
+        assert actual == expected.item()
+    elif isinstance(expected, dict):
+        assert set(actual) == set(expected)
+        for k in expected:
+            assert_same(expected[k], actual[k])
+    elif isinstance(expected, (list, tuple)):
+        assert isinstance(actual, list) and len(actual) == len(expected)
+        for e, a in zip(expected, actual):
+            assert_same(e, a)
+    else:
+        assert actual == expected
+
+
+def test_dumps_loads_round_trip():
+    payload = sample_payload()
+    buf = tensor_serializer.dumps(payload)
+    assert tensor_serializer.is_binary(buf)
+    assert_same(payload, tensor_serializer.loads(buf))
+    # the chunked form concatenates to the same payload
+    assert b"".join(tensor_serializer.dumps_chunks(payload)) == buf
+
+
+def test_loads_read_only_buffer_gives_writable_tensors():
+    payload = {"w": torch.randn(3, 3)}
+    loaded = tensor_serializer.loads(bytes(tensor_serializer.dumps(payload)))
+    loaded["w"].add_(1)
+    assert torch.allclose(loaded["w"], payload["w"] + 1)
+
+
+def test_split_join_round_trip():
+    payload = sample_payload()
+    header, buffers = tensor_serializer.split_tensors(payload)
+    # as after a transfer: the receiver allocates its own buffers from the header
+    received = tensor_serializer.empty_buffers(header)
+    for src, dst in zip(buffers, received):
+        dst[:] = src
+    assert_same(payload, tensor_serializer.join_tensors(header, received))
+
+
+def test_is_binary():
+    payload = sample_payload()
+    buf = tensor_serializer.dumps(payload)
+    assert tensor_serializer.is_binary(bytearray(buf))
+    assert tensor_serializer.is_binary(memoryview(buf))
+    # payloads of older versions are pickles
+    assert not tensor_serializer.is_binary(pickle.dumps(payload))
+    assert not tensor_serializer.is_binary(b"")
+    assert not tensor_serializer.is_binary("FMLT")
+
+
+if __name__ == "__main__":
+    test_dumps_loads_round_trip()
+    test_loads_read_only_buffer_gives_writable_tensors()
+    test_split_join_round_trip()
+    test_is_binary()
+    print("tensor_serializer round trips ok")
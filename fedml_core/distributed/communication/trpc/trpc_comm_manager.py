@@ -127,16 +127,19 @@ class TRPCCommManager(BaseCommunicationManager):
 
     def message_handling_subroutine(self):
         while self.is_running:
-            if self.trpc_servicer.message_q.qsize() > 0:
-                lock.acquire()
-                msg = self.trpc_servicer.message_q.get()
-                self.notify(msg)
-                lock.release()
+            # blocks until the servicer queues a message (or stop_receive_message queues the None sentinel)
+            msg = self.trpc_servicer.message_q.get()
+            if msg is None:
+                break
+            lock.acquire()
+            self.notify(msg)
+            lock.release()
         return
 
     def stop_receive_message(self):
         rpc.shutdown()
         self.is_running = False
+        self.trpc_servicer.message_q.put(None)
 
     def notify(self, message: Message):
         msg_type = message.get_type()
@@ -7,12 +7,18 @@ from ..communication.mqtt_s3 import MqttS3CommManager
 from ..communication.mqtt_s3.mqtt_s3_status_manager import MqttS3StatusManager
 from ..communication.trpc.trpc_comm_manager import TRPCCommManager
 from ..communication.gRPC.grpc_comm_manager import GRPCCommManager
+from ..communication.message import Message
 from ..communication.mpi.com_manager import MpiCommunicationManager
 from ..communication.mqtt.mqtt_comm_manager import MqttCommManager
 from ..communication.observer import Observer
 
 
 class ServerManager(Observer):
+    # message types and client index key of the global model broadcasts, set from the algorithm's message_define
+    init_config_msg_type = None
+    sync_model_msg_type = None
+    client_index_key = None
+
     def __init__(self, args, comm=None, rank=0, size=0, backend="MPI"):
         self.args = args
         self.size = size
@@ -60,7 +66,29 @@ class ServerManager(Observer):
         handler_callback_func(msg_params)
 
     def send_message(self, message):
-        self.com_manager.send_message(message)
+        return self.com_manager.send_message(message)
+
+    def broadcast_message(self, message, receiver_ids, receiver_params=None):
+        return self.com_manager.broadcast_message(message, receiver_ids, receiver_params)
+
+    def send_message_init_config_to_all_clients(self, global_model_params, client_indexes, receiver_ids=None):
+        message = Message(self.init_config_msg_type, self.get_sender_id(), 0)
+        message.add_params(Message.MSG_ARG_KEY_MODEL_PARAMS, global_model_params)
+        return self._broadcast_to_clients(message, client_indexes, receiver_ids)
+
+    def send_message_sync_model_to_all_clients(self, global_model_params, client_indexes, receiver_ids=None):
+        logging.info("send_message_sync_model_to_all_clients. client_indexes = %s" % str(client_indexes))
+        message = Message(self.sync_model_msg_type, self.get_sender_id(), 0)
+        message.add_params(Message.MSG_ARG_KEY_MODEL_PARAMS, global_model_params)
+        return self._broadcast_to_clients(message, client_indexes, receiver_ids)
+
+    def _broadcast_to_clients(self, message, client_indexes, receiver_ids=None):
+        # receiver_ids[i] (rank i + 1 by default) gets client_indexes[i]; the global model is serialized/uploaded
+        # once and each client only gets its own client index
+        if receiver_ids is None:
+            receiver_ids = list(range(1, self.size))
+        receiver_params = [{self.client_index_key: str(client_indexes[i])} for i in range(len(receiver_ids))]
+        return self.broadcast_message(message, receiver_ids, receiver_params)
 
     @abstractmethod
     def register_message_receive_handlers(self) -> None:
@@ -33,44 +33,29 @@ def non_iid_partition_with_dirichlet_distribution(label_list,
             samples : ndarray,
                 The drawn samples, of shape ``(size, k)``.
     """
-    net_dataidx_map = {}
-    K = classes
-
     # For multiclass labels, the list is ragged and not a numpy array
     N = len(label_list) if task == 'segmentation' else label_list.shape[0]
 
-    # guarantee the minimum number of sample in each client
-    min_size = 0
-    while min_size < 10:
-        idx_batch = [[] for _ in range(client_num)]
-
-        if task == 'segmentation':
-            # Unlike classification tasks, here, one instance may have multiple categories/classes
-            for c, cat in enumerate(classes):
-                if c > 0:
-                    idx_k = np.asarray([np.any(label_list[i] == cat) and not np.any(
-                        np.in1d(label_list[i], classes[:c])) for i in
-                                        range(len(label_list))])
-                else:
-                    idx_k = np.asarray(
-                        [np.any(label_list[i] == cat) for i in range(len(label_list))])
-
-                # Get the indices of images that have category = c
-                idx_k = np.where(idx_k)[0]
-                idx_batch, min_size = partition_class_samples_with_dirichlet_distribution(N, alpha, client_num,
-                                                                                          idx_batch, idx_k)
-        else:
-            # for each classification in the dataset
-            for k in range(K):
-                # get a list of batch indexes which are belong to label k
-                idx_k = np.where(label_list == k)[0]
-                idx_batch, min_size = partition_class_samples_with_dirichlet_distribution(N, alpha, client_num,
-                                                                                          idx_batch, idx_k)
-    for i in range(client_num):
-        np.random.shuffle(idx_batch[i])
-        net_dataidx_map[i] = idx_batch[i]
+    if task == 'segmentation':
+        # Unlike classification tasks, here, one instance may have multiple categories/classes
+        class_idxs = []
+        for c, cat in enumerate(classes):
+            if c > 0:
+                idx_k = np.asarray([np.any(label_list[i] == cat) and not np.any(
+                    np.in1d(label_list[i], classes[:c])) for i in
+                                    range(len(label_list))])
+            else:
+                idx_k = np.asarray(
+                    [np.any(label_list[i] == cat) for i in range(len(label_list))])
+
+            # Get the indices of images that have category = c
+            class_idxs.append(np.where(idx_k)[0])
+    else:
+        class_idxs = class_indices(label_list, classes)
 
-    return net_dataidx_map
+    # guarantee the minimum number of sample in each client
+    offsets, indices = dirichlet_partition(class_idxs, N, client_num, alpha, min_require_size=10)
+    return csr_to_dataidx_map(offsets, indices)
 
 
 def partition_class_samples_with_dirichlet_distribution(N, alpha, client_num, idx_batch, idx_k):
@@ -91,6 +76,103 @@ def partition_class_samples_with_dirichlet_distribution(N, alpha, client_num, id
     return idx_batch, min_size
 
 
+def class_indices(label_list, class_num):
+    """Sample indexes of each label 0 .. class_num - 1, in ascending order (like np.where(label_list == k)[0])."""
+    label_list = np.asarray(label_list).reshape(-1)
+    valid = np.nonzero((label_list >= 0) & (label_list < class_num))[0]
+    labels = label_list[valid].astype(np.int64)
+    order = valid[np.argsort(labels, kind='stable')]
+    return np.split(order, np.cumsum(np.bincount(labels, minlength=class_num))[:-1])
+
+
+def _group_by_client(client_ids, sample_idxs, client_num):
+    # CSR (offsets, indices) of the samples of each client, keeping the order of the pieces within a client
+    client_ids = np.concatenate(client_ids) if client_ids else np.zeros(0, dtype=np.int64)
+    sample_idxs = np.concatenate(sample_idxs) if sample_idxs else np.zeros(0, dtype=np.int64)
+    order = np.argsort(client_ids, kind='stable')
+    offsets = np.zeros(client_num + 1, dtype=np.int64)
+    np.cumsum(np.bincount(client_ids, minlength=client_num), out=offsets[1:])
+    return offsets, sample_idxs[order].astype(np.int64)
+
+
+def dirichlet_partition(class_idxs, sample_num, client_num, alpha, min_require_size=0, rng=np.random):
+    """Vectorized LDA partition (see `non_iid_partition_with_dirichlet_distribution`) of the samples listed per class
+    in `class_idxs`; resampled until every client has `min_require_size` samples.
+
+    Draws the same random numbers from `rng` as the per-client list implementation, so a seed gives the same
+    partition. Returns the CSR (offsets, indices): client i holds indices[offsets[i]:offsets[i + 1]].
+    """
+    if min_require_size * client_num > sum(len(idx_k) for idx_k in class_idxs):
+        raise ValueError("%d clients can not hold %d samples each" % (client_num, min_require_size))
+    min_size = -1
+    while min_size < min_require_size:
+        sizes = np.zeros(client_num, dtype=np.int64)
+        client_ids = []
+        sample_idxs = []
+        for idx_k in class_idxs:
+            idx_k = np.array(idx_k)
+            rng.shuffle(idx_k)
+            proportions = rng.dirichlet(np.repeat(alpha, client_num))
+            # Balance: clients which already hold N / client_num samples get no more
+            proportions = proportions * (sizes < sample_num / client_num)
+            proportions = proportions / proportions.sum()
+            cuts = (np.cumsum(proportions) * len(idx_k)).astype(int)[:-1]
+            counts = np.diff(np.concatenate(([0], cuts, [len(idx_k)])))
+            sizes += counts
+            client_ids.append(np.repeat(np.arange(client_num), counts))
+            sample_idxs.append(idx_k)
+        min_size = sizes.min()
+    offsets, indices = _group_by_client(client_ids, sample_idxs, client_num)
+    for i in range(client_num):
+        rng.shuffle(indices[offsets[i]:offsets[i + 1]])
+    return offsets, indices
+
+
+def label_k_partition(class_idxs, client_num, label_num, rng=np.random):
+    """Each client gets the samples of `label_num` random labels, every label split evenly among the clients that
+    drew it (all labels, each split among all clients, if `label_num` is the number of classes). Returns the CSR
+    (offsets, indices)."""
+    class_num = len(class_idxs)
+    client_ids = []
+    sample_idxs = []
+    if label_num == class_num:
+        for idx_k in class_idxs:
+            idx_k = np.array(idx_k)
+            rng.shuffle(idx_k)
+            counts = [len(split) for split in np.array_split(idx_k, client_num)]
+            client_ids.append(np.repeat(np.arange(client_num), counts))
+            sample_idxs.append(idx_k)
+    else:
+        has_class = np.zeros((client_num, class_num), dtype=bool)
+        for i in range(client_num):
+            has_class[i, rng.choice(class_num, size=label_num, replace=False, p=None)] = True
+        for k in range(class_num):
+            nets = np.nonzero(has_class[:, k])[0]
+            if len(nets) == 0:
+                continue
+            idx_k = np.array(class_idxs[k])
+            rng.shuffle(idx_k)
+            counts = [len(split) for split in np.array_split(idx_k, len(nets))]
+            client_ids.append(np.repeat(nets, counts))
+            sample_idxs.append(idx_k)
+    return _group_by_client(client_ids, sample_idxs, client_num)
+
+
+def homo_partition(sample_num, client_num, rng=np.random):
+    """IID partition: a random permutation split into client_num nearly equal parts. Returns the CSR
+    (offsets, indices)."""
+    indices = rng.permutation(sample_num).astype(np.int64)
+    counts = [len(split) for split in np.array_split(np.arange(sample_num), client_num)]
+    offsets = np.zeros(client_num + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    return offsets, indices
+
+
+def csr_to_dataidx_map(offsets, indices):
+    """net_dataidx_map {client index: sample indexes} of views into the CSR indices."""
+    return {i: indices[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)}
+
+
 def record_data_stats(y_train, net_dataidx_map, task='classification'):
     net_cls_counts = {}
 
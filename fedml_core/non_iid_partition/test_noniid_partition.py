@@ -0,0 +1,137 @@
+import numpy as np
+
+from fedml_core.non_iid_partition.noniid_partition import class_indices, csr_to_dataidx_map, dirichlet_partition, \
+    homo_partition, label_k_partition, non_iid_partition_with_dirichlet_distribution
+
+
+# the per-client list implementations the vectorized engine replaced; a seed must give the same partition
+
+
+def reference_dirichlet(y_train, client_num, class_num, alpha, min_require_size):
+    N = y_train.shape[0]
+    min_size = -1
+    while min_size < min_require_size:
+        idx_batch = [[] for _ in range(client_num)]
+        for k in range(class_num):
+            idx_k = np.where(y_train == k)[0]
+            np.random.shuffle(idx_k)
+            proportions = np.random.dirichlet(np.repeat(alpha, client_num))
+            proportions = np.array([p * (len(idx_j) < N / client_num) for p, idx_j in zip(proportions, idx_batch)])
+            proportions = proportions / proportions.sum()
+            proportions = (np.cumsum(proportions) * len(idx_k)).astype(int)[:-1]
+            idx_batch = [idx_j + idx.tolist() for idx_j, idx in zip(idx_batch, np.split(idx_k, proportions))]
+            min_size = min([len(idx_j) for idx_j in idx_batch])
+    for j in range(client_num):
+        np.random.shuffle(idx_batch[j])
+    return {j: idx_batch[j] for j in range(client_num)}
+
+
+def reference_label_k(y_train, client_num, class_num, num):
+    net_dataidx_map = {i: np.ndarray(0, dtype=np.int64) for i in range(client_num)}
+    if num == class_num:
+        for i in range(class_num):
+            idx_k = np.where(y_train == i)[0]
+            np.random.shuffle(idx_k)
+            split = np.array_split(idx_k, client_num)
+            for j in range(client_num):
+                net_dataidx_map[j] = np.append(net_dataidx_map[j], split[j])
+        return net_dataidx_map
+    classes_nets = []
+    classes_count = [0] * class_num
+    for i in range(client_num):
+        temp = np.random.choice(class_num, size=num, replace=False, p=None)
+        for j in temp:
+            classes_count[j] += 1
+        classes_nets.append(temp)
+    for index, clss_partition in enumerate(classes_count):
+        if clss_partition == 0:
+            continue
+        idx_k = np.where(y_train == index)[0]
+        np.random.shuffle(idx_k)
+        split = np.array_split(idx_k, clss_partition)
+        index_in = 0
+        for net_idx in range(client_num):
+            if index in classes_nets[net_idx]:
+                net_dataidx_map[net_idx] = np.append(net_dataidx_map[net_idx], split[index_in])
+                index_in += 1
+    return net_dataidx_map
+
+
+def reference_homo(sample_num, client_num):
+    batch_idxs = np.array_split(np.random.permutation(sample_num), client_num)
+    return {i: batch_idxs[i] for i in range(client_num)}
+
+
+def assert_same_partition(expected, actual):
+    assert sorted(expected) == sorted(actual)
+    for i in expected:
+        assert np.array_equal(np.asarray(expected[i], dtype=np.int64), actual[i]), "client %d differs" % i
+
+
+def labels(sample_num=5000, class_num=10, seed=1):
+    return np.random.RandomState(seed).randint(0, class_num, size=sample_num)
+
+
+def test_dirichlet_partition_matches_reference():
+    y_train = labels()
+    # alpha 0.1 and a minimum size of 64 force several resampling rounds
+    for client_num, alpha, min_require_size in [(10, 0.5, 0), (20, 0.1, 64), (100, 1.0, 10)]:
+        np.random.seed(0)
+        expected = reference_dirichlet(y_train, client_num, 10, alpha, min_require_size)
+        np.random.seed(0)
+        offsets, indices = dirichlet_partition(class_indices(y_train, 10), len(y_train), client_num, alpha,
+                                               min_require_size=min_require_size)
+        assert_same_partition(expected, csr_to_dataidx_map(offsets, indices))
+
+
+def test_dirichlet_partition_rng():
+    y_train = labels()
+    np.random.seed(3)
+    expected = reference_dirichlet(y_train, 10, 10, 0.5, 10)
+    offsets, indices = dirichlet_partition(class_indices(y_train, 10), len(y_train), 10, 0.5, min_require_size=10,
+                                           rng=np.random.RandomState(3))
+    assert_same_partition(expected, csr_to_dataidx_map(offsets, indices))
+
+
+def test_non_iid_partition_with_dirichlet_distribution():
+    y_train = labels()
+    np.random.seed(0)
+    expected = reference_dirichlet(y_train, 10, 10, 0.5, 10)
+    np.random.seed(0)
+    assert_same_partition(expected, non_iid_partition_with_dirichlet_distribution(y_train, 10, 10, 0.5))
+
+
+def test_dirichlet_partition_impossible_minimum():
+    try:
+        dirichlet_partition(class_indices(labels(100), 10), 100, 10, 0.5, min_require_size=11)
+    except ValueError:
+        return
+    assert False, "expected a ValueError"
+
+
+def test_label_k_partition_matches_reference():
+    y_train = labels()
+    for num in [2, 3, 10]:
+        np.random.seed(0)
+        expected = reference_label_k(y_train, 10, 10, num)
+        np.random.seed(0)
+        offsets, indices = label_k_partition(class_indices(y_train, 10), 10, num)
+        assert_same_partition(expected, csr_to_dataidx_map(offsets, indices))
+
+
+def test_homo_partition_matches_reference():
+    np.random.seed(0)
+    expected = reference_homo(5003, 7)
+    np.random.seed(0)
+    offsets, indices = homo_partition(5003, 7)
+    assert_same_partition(expected, csr_to_dataidx_map(offsets, indices))
+
+
+if __name__ == "__main__":
+    test_dirichlet_partition_matches_reference()
+    test_dirichlet_partition_rng()
+    test_non_iid_partition_with_dirichlet_distribution()
+    test_dirichlet_partition_impossible_minimum()
+    test_label_k_partition_matches_reference()
+    test_homo_partition_matches_reference()
+    print("partitions match the reference implementations")
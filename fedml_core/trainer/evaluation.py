@@ -0,0 +1,124 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+from torch.utils import data
+
+DEFAULT_EVAL_BATCH_SIZE = 1024
+
+
+def classification_sample_metrics(pred, target):
+    """Per-sample terms of the metrics of a classification `ModelTrainer.test` (cross entropy and top-1)."""
+    return {
+        'test_correct': pred.argmax(-1).eq(target),
+        'test_loss': F.cross_entropy(pred, target, reduction='none'),
+        'test_total': torch.ones_like(target),
+    }
+
+
+class BatchedEvaluator(object):
+    """Evaluates a model on the data of many clients in one pass of large batches.
+
+    The datasets of the clients' DataLoaders are concatenated, and every sample's metric terms are added to its
+    client by the index range the client occupies, so the per-client metrics are those of evaluating each loader
+    with `ModelTrainer.test` (up to float summation order) at a fraction of the model calls.
+    """
+
+    def __init__(self, sample_metrics_fn, batch_size=DEFAULT_EVAL_BATCH_SIZE, num_workers=0):
+        self.sample_metrics_fn = sample_metrics_fn
+        self.batch_size = batch_size
+        self.num_workers = num_workers
+
+    def _batches(self, dataloaders):
+        datasets = [dl.dataset for dl in dataloaders]
+        collate_fn = dataloaders[0].collate_fn
+        if collate_fn is data.dataloader.default_collate and \
+                all(isinstance(ds, data.TensorDataset) and len(ds.tensors) == 2 for ds in datasets):
+            # in-memory clients (the h5 loaders): slice the concatenated tensors instead of collating samples
+            x = torch.cat([ds.tensors[0] for ds in datasets])
+            target = torch.cat([ds.tensors[1] for ds in datasets])
+            return ((x[start:start + self.batch_size], target[start:start + self.batch_size])
+                    for start in range(0, len(target), self.batch_size))
+        # the clients of one dataset share their collate_fn, e.g. the batch transforms of fed_cifar100
+        return data.DataLoader(data.ConcatDataset(datasets), batch_size=self.batch_size, shuffle=False,
+                               collate_fn=collate_fn, num_workers=self.num_workers)
+
+    def evaluate(self, model, dataloaders, device):
+        """List of the metrics of `model` on each of `dataloaders`, in their order."""
+        datasets = [dl.dataset for dl in dataloaders]
+        client_of_sample = torch.from_numpy(np.repeat(np.arange(len(datasets)), [len(ds) for ds in datasets]))
+        client_of_sample = client_of_sample.to(device)
+
+        model.to(device)
+        model.eval()
+        sums = {}
+        start = 0
+        with torch.no_grad():
+            for x, target in self._batches(dataloaders):
+                x = x.to(device)
+                target = target.to(device)
+                sample_metrics = self.sample_metrics_fn(model(x), target)
+                clients = client_of_sample[start:start + target.size(0)]
+                for key, values in sample_metrics.items():
+                    if key not in sums:
+                        sums[key] = torch.zeros(len(datasets), dtype=torch.float64, device=device)
+                    sums[key].index_add_(0, clients, values.to(torch.float64))
+                start += target.size(0)
+        sums = {key: values.cpu().tolist() for key, values in sums.items()}
+        return [{key: sums[key][idx] for key in sums} for idx in range(len(datasets))]
+
+
+def evaluate_clients(model_trainer, dataloaders, device, args):
+    """Metrics of `model_trainer.test` on each of `dataloaders`.
+
+    With args.batched_evaluation == 1 and a trainer that defines `sample_metrics(pred, target)`, all loaders are
+    evaluated in one pass of `BatchedEvaluator`; otherwise one `test` call per loader.
+    """
+    if not dataloaders:
+        return []
+    if getattr(args, "batched_evaluation", 0) == 1:
+        if hasattr(model_trainer, "sample_metrics"):
+            evaluator = BatchedEvaluator(model_trainer.sample_metrics,
+                                         getattr(args, "eval_batch_size", DEFAULT_EVAL_BATCH_SIZE))
+            return evaluator.evaluate(model_trainer.model, dataloaders, device)
+        logging.warning("%s has no sample_metrics, evaluating the clients one by one"
+                        % model_trainer.__class__.__name__)
+    return [model_trainer.test(dl, device, args) for dl in dataloaders]
+
+
+def stratified_client_sample(client_idxs, sample_nums, fraction, seed=0, strata_num=10):
+    """A `fraction` of `client_idxs`, drawn from `strata_num` equally large strata by local sample number with
+    proportional allocation (at least one client per stratum), so small and large clients stay represented."""
+    client_idxs = np.asarray(client_idxs)
+    if fraction >= 1 or len(client_idxs) == 0:
+        return client_idxs.tolist()
+    rng = np.random.RandomState(seed)
+    by_size = client_idxs[np.argsort([sample_nums[client_idx] for client_idx in client_idxs], kind='stable')]
+    sampled = []
+    for stratum in np.array_split(by_size, min(strata_num, len(by_size))):
+        sampled.append(rng.choice(stratum, max(1, int(round(len(stratum) * fraction))), replace=False))
+    return np.sort(np.concatenate(sampled)).tolist()
+
+
+class BackgroundEvaluation(object):
+    """Runs evaluation jobs one at a time in a background thread, so they overlap with the next training round.
+    The jobs must use their own copy of the model."""
+
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._futures = []
+
+    def submit(self, fn, *args):
+        # the exception of a finished job is raised at the next submission
+        for future in [future for future in self._futures if future.done()]:
+            self._futures.remove(future)
+            future.result()
+        self._futures.append(self._executor.submit(fn, *args))
+
+    def wait(self):
+        """Wait for the submitted jobs and raise the first exception of one of them."""
+        futures, self._futures = self._futures, []
+        for future in futures:
+            future.result()
@@ -1,21 +1,56 @@
 from abc import ABC, abstractmethod
 
+import torch
+
+try:
+    from fedml_core.aggregation.flat_aggregation import FlatModelLayout, unflatten_state_dict
+except ImportError:
+    from FedML.fedml_core.aggregation.flat_aggregation import FlatModelLayout, unflatten_state_dict
+
 
 class ModelTrainer(ABC):
     """Abstract base class for federated learning trainer.
        1. The goal of this abstract class is to be compatible to
        any deep learning frameworks such as PyTorch, TensorFlow, Keras, MXNET, etc.
        2. This class can be used in both server and client side
-       3. This class is an operator which does not cache any states inside.
+       3. This class is an operator whose only cached state is the flat buffer reused by `snapshot_model_params`;
+       the state_dict a snapshot returns is a view of that buffer and is overwritten by the next snapshot.
     """
     def __init__(self, model, args=None):
         self.model = model
         self.id = 0
         self.args = args
+        self._snapshot_layout = None
+        self._snapshot_buffer = None
 
     def set_id(self, trainer_id):
         self.id = trainer_id
 
+    def load_model_params(self, model_parameters, device):
+        """Like `set_model_params`, for a model kept resident on `device`: the model only moves if it is elsewhere,
+        and each entry of `model_parameters` is copied in place into the model's own tensors."""
+        self.model.to(device)
+        with torch.no_grad():
+            for k, v in self.model.state_dict(keep_vars=True).items():
+                v.copy_(model_parameters[k], non_blocking=True)
+
+    def snapshot_model_params(self):
+        """The current weights of the model copied into one flat cpu buffer (pinned when the model is on a gpu), as
+        a state_dict of views into it. The buffer is reused by the next snapshot, so the result must be consumed
+        (e.g. added to an aggregator) before then."""
+        state = self.model.state_dict()
+        if self._snapshot_layout is None or not self._snapshot_layout.matches(state):
+            self._snapshot_layout = FlatModelLayout(state)
+            pin_memory = torch.cuda.is_available() and any(v.is_cuda for v in state.values())
+            self._snapshot_buffer = torch.empty(self._snapshot_layout.numel, dtype=self._snapshot_layout.dtype,
+                                                pin_memory=pin_memory)
+        layout = self._snapshot_layout
+        for k, numel, offset in zip(layout.keys, layout.numels, layout.offsets):
+            self._snapshot_buffer[offset:offset + numel].copy_(state[k].reshape(-1), non_blocking=True)
+        if self._snapshot_buffer.is_pinned():
+            torch.cuda.synchronize()
+        return unflatten_state_dict(self._snapshot_buffer, layout)
+
     @abstractmethod
     def get_model_params(self):
         pass
@@ -28,6 +28,7 @@ from fedml_api.data_preprocessing.ImageNet.data_loader import load_partition_dat
 from fedml_api.data_preprocessing.Landmarks.data_loader import load_partition_data_landmarks
 
 from fedml_api.data_preprocessing.cifar10.data_loader import load_partition_data_cifar10
+from fedml_api.data_preprocessing import dataset_store, lazy_client_dict, partition_cache
 from fedml_api.data_preprocessing.cifar100.data_loader import load_partition_data_cifar100
 from fedml_api.data_preprocessing.cinic10.data_loader import load_partition_data_cinic10
 
@@ -95,6 +96,13 @@ def add_args(parser):
 
     parser.add_argument("--frequency_of_the_test", type=int, default=1, help="the frequency of the algorithms")
 
+    parser.add_argument(
+        "--streaming_aggregation",
+        type=int,
+        default=0,
+        help="whether the server folds each client model into a running weighted sum on arrival (O(1) model memory)",
+    )
+
     parser.add_argument("--gpu_server_num", type=int, default=1, help="gpu_server_num")
 
     parser.add_argument("--gpu_num_per_server", type=int, default=4, help="gpu_num_per_server")
@@ -125,12 +133,118 @@ def add_args(parser):
         help="config indicating ip address and port of the master (rank 0) node",
     )
 
+    parser.add_argument(
+        "--dataset_mmap_dir",
+        type=str,
+        default="",
+        help="Directory of memory-mapped .npy copies of the base datasets shared by the processes on one host "
+        "(cifar10, cifar100, emnist); empty keeps them in process memory.",
+    )
+
+    parser.add_argument(
+        "--partition_cache_dir",
+        type=str,
+        default="",
+        help="Directory caching the client partitions (cifar10, cifar100, cinic10, ImageNet) as memory-mapped CSR "
+        ".npy files, so later launches and all ranks reuse them; empty partitions on every launch.",
+    )
+
+    parser.add_argument(
+        "--landmarks_shard_dir",
+        type=str,
+        default="",
+        help="Directory of the decoded, memory-mapped gld23k/gld160k image shards, built on the first launch; "
+        "empty decodes the JPEG files in every epoch.",
+    )
+
+    parser.add_argument(
+        "--max_cached_clients",
+        type=int,
+        default=0,
+        help="Number of clients whose DataLoaders are kept after their first use; least recently used ones are "
+        "rebuilt on their next access. 0 keeps all.",
+    )
+
+    parser.add_argument(
+        "--batched_evaluation",
+        type=int,
+        default=0,
+        help="Evaluate all clients on the server in one pass of large batches with per-client metrics "
+        "(classification trainers).",
+    )
+
+    parser.add_argument("--eval_batch_size", type=int, default=1024, help="Batch size of the batched evaluation.")
+
+    parser.add_argument(
+        "--eval_client_fraction",
+        type=float,
+        default=1.0,
+        help="Fraction of the clients evaluated in a test round, sampled stratified by local sample number.",
+    )
+
+    parser.add_argument(
+        "--async_evaluation",
+        type=int,
+        default=0,
+        help="Evaluate a copy of the global model in a background thread while the clients train the next round.",
+    )
+
+    parser.add_argument(
+        "--async_aggregation",
+        type=int,
+        default=0,
+        help="Buffered asynchronous aggregation (FedBuff): update the global model once async_buffer_size uploads "
+        "arrive and immediately give the idle worker a new client; comm_round counts global model updates.",
+    )
+
+    parser.add_argument(
+        "--async_buffer_size",
+        type=int,
+        default=0,
+        help="Uploads per asynchronous global model update; 0 uses half of the workers.",
+    )
+
+    parser.add_argument(
+        "--async_staleness_exponent",
+        type=float,
+        default=0.5,
+        help="An upload trained on a global model that is s updates old is weighted by (1 + s)^-exponent.",
+    )
+
+    parser.add_argument(
+        "--async_server_lr", type=float, default=1.0, help="Server learning rate of the asynchronous updates."
+    )
+
+    parser.add_argument(
+        "--round_deadline",
+        type=float,
+        default=0,
+        help="Seconds after which a synchronous round aggregates the models that have arrived; 0 waits for all.",
+    )
+
+    parser.add_argument(
+        "--over_selection_rate",
+        type=float,
+        default=0,
+        help="Sample this fraction more clients than needed and aggregate once the first ones have reported.",
+    )
+
+    parser.add_argument(
+        "--latency_bias",
+        type=float,
+        default=0,
+        help="Sample clients with probability proportional to latency^-latency_bias; 0 samples uniformly.",
+    )
+
     parser.add_argument("--ci", type=int, default=0, help="CI")
     args = parser.parse_args()
     return args
 
 
 def load_data(args, dataset_name):
+    dataset_store.set_mmap_dir(args.dataset_mmap_dir or None)
+    partition_cache.set_cache_dir(args.partition_cache_dir or None)
+    lazy_client_dict.set_max_clients(args.max_cached_clients)
     if dataset_name == "mnist":
         logging.info("load_data. dataset_name = %s" % dataset_name)
         (
@@ -282,6 +396,7 @@ def load_data(args, dataset_name):
             partition_alpha=None,
             client_number=args.client_num_in_total,
             batch_size=args.batch_size,
+            shard_dir=args.landmarks_shard_dir or None,
         )
 
     elif dataset_name == "gld160k":
@@ -309,6 +424,7 @@ def load_data(args, dataset_name):
             partition_alpha=None,
             client_number=args.client_num_in_total,
             batch_size=args.batch_size,
+            shard_dir=args.landmarks_shard_dir or None,
         )
 
     else:
@@ -27,6 +27,7 @@ from fedml_api.data_preprocessing.cifar10.data_loader_cross_silo import (
     load_partition_data_cifar10 as load_partition_data_cifar10_cross_silo,
 )
 from fedml_api.data_preprocessing.cifar10.data_loader import load_partition_data_cifar10
+from fedml_api.data_preprocessing import dataset_store, partition_cache
 from fedml_api.data_preprocessing.Landmarks.data_loader import load_partition_data_landmarks
 from fedml_api.data_preprocessing.ImageNet.data_loader import load_partition_data_ImageNet
 from fedml_api.data_preprocessing.MNIST.data_loader import load_partition_data_mnist
@@ -218,6 +219,35 @@ def add_args(parser):
         type=str,
         help="Path of config for S3 server.",
     )
+
+    parser.add_argument(
+        "--model_cache_dir",
+        type=str,
+        default="",
+        help="Directory of the local content-addressed cache of downloaded models "
+        "(default: ~/.cache/fedml_model_cache).",
+    )
+
+    parser.add_argument(
+        "--model_cache_size_mb",
+        type=int,
+        default=1024,
+        help="Size limit of the local model cache in MB; 0 disables the cache.",
+    )
+
+    parser.add_argument(
+        "--async_upload",
+        type=int,
+        default=1,
+        help="Upload models to S3 on a background thread so that training overlaps with the upload.",
+    )
+
+    parser.add_argument(
+        "--upload_queue_size",
+        type=int,
+        default=2,
+        help="Maximum number of pending background uploads before sending blocks.",
+    )
     # --------------------------
 
     parser.add_argument(
@@ -246,12 +276,30 @@ def add_args(parser):
         help="Log file directory.",
     )
 
+    parser.add_argument(
+        "--dataset_mmap_dir",
+        type=str,
+        default="",
+        help="Directory of memory-mapped .npy copies of the base datasets shared by the processes on one host "
+        "(cifar10, cifar100, emnist); empty keeps them in process memory.",
+    )
+
+    parser.add_argument(
+        "--partition_cache_dir",
+        type=str,
+        default="",
+        help="Directory caching the client partitions (cifar10, cifar100, cinic10, ImageNet) as memory-mapped CSR "
+        ".npy files, so later launches and all ranks reuse them; empty partitions on every launch.",
+    )
+
     parser.add_argument("--ci", type=int, default=0, help="CI")
     args = parser.parse_args()
     return args
 
 
 def load_synthetic_data(args, dataset_name):
+    dataset_store.set_mmap_dir(args.dataset_mmap_dir or None)
+    partition_cache.set_cache_dir(args.partition_cache_dir or None)
     if dataset_name == "synthetic_1_1":
         (
             silo_num,
@@ -10,6 +10,7 @@ import wandb
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.getcwd(), "../../../")))
 
+from fedml_api.data_preprocessing import lazy_client_dict
 from fedml_api.data_preprocessing.cifar10.data_loader import load_partition_data_cifar10
 from fedml_api.data_preprocessing.cifar100.data_loader import load_partition_data_cifar100
 from fedml_api.data_preprocessing.cinic10.data_loader import load_partition_data_cinic10
@@ -86,12 +87,50 @@ def add_args(parser):
     parser.add_argument('--gpu', type=int, default=0,
                         help='gpu')
 
+    parser.add_argument('--sparse_input', type=int, default=0,
+                        help='stackoverflow_lr only: feed the bag-of-words inputs to the model as sparse tensors')
+
+    parser.add_argument('--batch_augmentation', type=int, default=0,
+                        help='cifar10/cifar100/cinic10 only: augment the uint8 images per batch in the DataLoader '
+                             'collate_fn instead of per image with PIL')
+
+    parser.add_argument('--landmarks_shard_dir', type=str, default='',
+                        help='gld23k/gld160k only: directory of the decoded, memory-mapped image shards (built on the '
+                             'first run); empty decodes the JPEG files in every epoch')
+
+    parser.add_argument('--max_cached_clients', type=int, default=0,
+                        help='number of clients whose DataLoaders are kept after their first use (least recently '
+                             'used ones are rebuilt on the next access); 0 keeps all')
+
+    parser.add_argument('--batched_evaluation', type=int, default=0,
+                        help='evaluate all clients in one pass of large batches with per-client metrics '
+                             '(classification trainers)')
+
+    parser.add_argument('--eval_batch_size', type=int, default=1024,
+                        help='batch size of the batched evaluation')
+
+    parser.add_argument('--eval_client_fraction', type=float, default=1.0,
+                        help='fraction of the clients evaluated in a test round, sampled stratified by local '
+                             'sample number')
+
+    parser.add_argument('--async_evaluation', type=int, default=0,
+                        help='evaluate a copy of the global model in a background thread during the next round')
+
+    parser.add_argument('--client_process_num', type=int, default=0,
+                        help='number of forked worker processes training the clients of a round in parallel on the '
+                             'cpu; 0 trains them one by one')
+
+    parser.add_argument('--vectorized_client_num', type=int, default=0,
+                        help='number of clients trained at once as one vmapped model with stacked parameters (sgd, '
+                             'small classification models without buffers); 0 trains them one by one')
+
     parser.add_argument('--ci', type=int, default=0,
                         help='CI')
     return parser
 
 
 def load_data(args, dataset_name):
+    lazy_client_dict.set_max_clients(getattr(args, "max_cached_clients", 0))
     # check if the centralized training is enabled
     centralized = True if args.client_num_in_total == 1 else False
 
@@ -145,7 +184,8 @@ def load_data(args, dataset_name):
         logging.info("load_data. dataset_name = %s" % dataset_name)
         client_num, train_data_num, test_data_num, train_data_global, test_data_global, \
         train_data_local_num_dict, train_data_local_dict, test_data_local_dict, \
-        class_num = load_partition_data_federated_stackoverflow_lr(args.dataset, args.data_dir)
+        class_num = load_partition_data_federated_stackoverflow_lr(args.dataset, args.data_dir,
+                                                                   sparse=getattr(args, "sparse_input", 0) == 1)
         args.client_num_in_total = client_num
     elif dataset_name == "stackoverflow_nwp":
         logging.info("load_data. dataset_name = %s" % dataset_name)
@@ -174,7 +214,8 @@ def load_data(args, dataset_name):
                                                   fed_train_map_file=fed_train_map_file,
                                                   fed_test_map_file=fed_test_map_file,
                                                   partition_method=None, partition_alpha=None,
-                                                  client_number=args.client_num_in_total, batch_size=args.batch_size)
+                                                  client_number=args.client_num_in_total, batch_size=args.batch_size,
+                                                  shard_dir=getattr(args, "landmarks_shard_dir", "") or None)
 
     elif dataset_name == "gld160k":
         logging.info("load_data. dataset_name = %s" % dataset_name)
@@ -188,7 +229,8 @@ def load_data(args, dataset_name):
                                                   fed_train_map_file=fed_train_map_file,
                                                   fed_test_map_file=fed_test_map_file,
                                                   partition_method=None, partition_alpha=None,
-                                                  client_number=args.client_num_in_total, batch_size=args.batch_size)
+                                                  client_number=args.client_num_in_total, batch_size=args.batch_size,
+                                                  shard_dir=getattr(args, "landmarks_shard_dir", "") or None)
 
     else:
         if dataset_name == "cifar10":
@@ -202,7 +244,8 @@ def load_data(args, dataset_name):
         train_data_num, test_data_num, train_data_global, test_data_global, \
         train_data_local_num_dict, train_data_local_dict, test_data_local_dict, \
         class_num = data_loader(args.dataset, args.data_dir, args.partition_method,
-                                args.partition_alpha, args.client_num_in_total, args.batch_size)
+                                args.partition_alpha, args.client_num_in_total, args.batch_size,
+                                batch_transform=getattr(args, "batch_augmentation", 0) == 1)
 
     if centralized:
         train_data_local_num_dict = {